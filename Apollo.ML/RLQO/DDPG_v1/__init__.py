@@ -9,9 +9,14 @@ __version__ = '1.0.0'
 __author__ = 'Apollo Team'
 __description__ = 'DDPG-based Query Plan Optimization with Continuous Actions'
 
-from .config.action_decoder import ContinuousActionDecoder
-from .env.ddpg_sim_env import QueryPlanSimEnvDDPGv1
-from .env.ddpg_db_env import QueryPlanRealDBEnvDDPGv1
+from RLQO.lazy_imports import lazy_exports
+
+# 환경은 pandas/joblib/gymnasium을 로드하므로 처음 접근할 때 import
+__getattr__, __dir__ = lazy_exports(__name__, {
+    'ContinuousActionDecoder': '.config.action_decoder',
+    'QueryPlanSimEnvDDPGv1': '.env.ddpg_sim_env',
+    'QueryPlanRealDBEnvDDPGv1': '.env.ddpg_db_env',
+})
 
 __all__ = [
     'ContinuousActionDecoder',
@@ -3,8 +3,12 @@
 DDPG v1 Environment Module
 """
 
-from .ddpg_sim_env import QueryPlanSimEnvDDPGv1
-from .ddpg_db_env import QueryPlanRealDBEnvDDPGv1
+from RLQO.lazy_imports import lazy_exports
+
+__getattr__, __dir__ = lazy_exports(__name__, {
+    'QueryPlanSimEnvDDPGv1': '.ddpg_sim_env',
+    'QueryPlanRealDBEnvDDPGv1': '.ddpg_db_env',
+})
 
 __all__ = ['QueryPlanSimEnvDDPGv1', 'QueryPlanRealDBEnvDDPGv1']
 
@@ -77,13 +77,15 @@ class QueryPlanRealDBEnvDDPGv1(gym.Env):
                  query_list: list,
                  max_steps: int = 10,
                  timeout_seconds: int = 30,
-                 verbose: bool = True):
+                 verbose: bool = True,
+                 measurement_broker=None):
         """
         Args:
             query_list: 30개 쿼리 리스트
             max_steps: 에피소드당 최대 스텝
             timeout_seconds: 쿼리 타임아웃
             verbose: 로그 출력
+            measurement_broker: 공유 측정기 (Ensemble 평가용, None이면 자체 연결)
         """
         super().__init__()
         
@@ -104,7 +106,11 @@ class QueryPlanRealDBEnvDDPGv1(gym.Env):
         config_path = os.path.join(apollo_ml_dir_abs, 'config.yaml')
         
         self.config = load_config(config_path)
-        self.conn = connect(self.config.db, max_retries=3, retry_delay=5)
+        self.measurement_broker = measurement_broker
+        if measurement_broker is not None:
+            self.conn = measurement_broker.conn
+        else:
+            self.conn = connect(self.config.db, max_retries=3, retry_delay=5)
         
         # Gym spaces
         self.action_space = spaces.Box(
@@ -238,7 +244,10 @@ class QueryPlanRealDBEnvDDPGv1(gym.Env):
         """
         try:
             # db.py의 get_query_statistics 사용 (DQN v3 방식)
-            stats_io, stats_time = get_query_statistics(self.conn, sql)
+            if self.measurement_broker is not None:
+                _, stats_io, stats_time = self.measurement_broker.measure(sql, with_plan=False)
+            else:
+                stats_io, stats_time = get_query_statistics(self.conn, sql)
             
             # Parse statistics
             elapsed_time_ms = 0.0
@@ -407,7 +416,8 @@ class QueryPlanRealDBEnvDDPGv1(gym.Env):
     
     def close(self):
         """환경 종료"""
-        if self.conn:
+        # 공유 측정기의 연결은 측정기가 닫음
+        if self.conn and self.measurement_broker is None:
             self.conn.close()
             if self.verbose:
                 print("[INFO] DB 연결 종료")
@@ -11,10 +11,8 @@ DDPG v1: Simulation Environment with Continuous Action Space
 
 import os
 import sys
-import pickle
 import json
 import numpy as np
-import joblib
 import gymnasium as gym
 from gymnasium import spaces
 
@@ -29,7 +27,9 @@ sys.path.insert(0, rlqo_dir)
 from RLQO.DDPG_v1.config.action_decoder import ContinuousActionDecoder
 from RLQO.PPO_v3.env.v3_actionable_state import ActionableStateEncoderV3
 from RLQO.PPO_v3.env.v3_normalized_reward import calculate_reward_v3_normalized
-from RLQO.DQN_v1.features.phase2_features import XGB_EXPECTED_FEATURES
+from RLQO.DQN_v1.features.phase2_features import extract_features, XGB_EXPECTED_FEATURES
+from RLQO.plan_cache import PlanCache, DEFAULT_CACHE_PATH, DEFAULT_SNAPSHOT_ID
+from RLQO.xgb_surrogate import XGBSurrogate, read_model_version
 
 
 class QueryPlanSimEnvDDPGv1(gym.Env):
@@ -79,12 +79,22 @@ class QueryPlanSimEnvDDPGv1(gym.Env):
     def __init__(self,
                  query_list: list,
                  max_steps: int = 10,
-                 verbose: bool = True):
+                 verbose: bool = True,
+                 plan_cache_path: str = DEFAULT_CACHE_PATH,
+                 plan_cache_readonly: bool = False,
+                 plan_cache_snapshot_id: str = DEFAULT_SNAPSHOT_ID,
+                 prediction_table: dict = None,
+                 model_refresh: bool = False):
         """
         Args:
             query_list: 30개 쿼리 리스트 (constants2.py)
             max_steps: 에피소드당 최대 스텝
             verbose: 로그 출력 여부
+            plan_cache_path: 공유 SQLite 실행 계획 캐시 경로
+            plan_cache_readonly: True면 캐시를 읽기 전용으로 열기 (병렬 환경 복사본용, 부모가 미리 채움)
+            plan_cache_snapshot_id: 공유 캐시의 DB 스냅샷 ID (수집 스크립트의 --snapshot-id와 같은 값)
+            prediction_table: 미리 계산한 XGB 예측 테이블 (병렬 환경 복사본끼리 공유)
+            model_refresh: True면 에피소드 시작마다 모델 버전을 확인해 증분 학습된 새 모델을 적용
         """
         super().__init__()
         
@@ -102,18 +112,29 @@ class QueryPlanSimEnvDDPGv1(gym.Env):
         model_path = os.path.join(apollo_ml_dir, 'artifacts', 'model.joblib')
         if not os.path.exists(model_path):
             raise FileNotFoundError(f"XGB 모델을 찾을 수 없습니다: {model_path}")
+        self.model_path = model_path
+        self.model_refresh = model_refresh
+        import joblib
         self.xgb_model = joblib.load(model_path)
         
-        # 실행 계획 캐시 로드 (PPO v3 캐시 사용)
+        # 실행 계획 캐시 로드
+        # 공유 SQLite 캐시 사용, 기존 PPO v3 피클 캐시가 있으면 한 번 가져옴 (이미 있는 항목은 건너뜀)
+        self.plan_cache = PlanCache(plan_cache_path, snapshot_id=plan_cache_snapshot_id, readonly=plan_cache_readonly)
         cache_path = os.path.join(apollo_ml_dir, 'artifacts', 'RLQO', 'cache', 'v3_plan_cache_ppo.pkl')
-        if os.path.exists(cache_path):
-            with open(cache_path, 'rb') as f:
-                self.plan_cache = pickle.load(f)
-            if self.verbose:
-                print(f"[INFO] 캐시 로드 완료: {len(self.plan_cache)} entries")
+        if not plan_cache_readonly and os.path.exists(cache_path):
+            imported = self.plan_cache.import_pickle(cache_path)
+            if imported and self.verbose:
+                print(f"[INFO] 피클 캐시에서 {imported}개 항목을 가져왔습니다: {cache_path}")
+        elif len(self.plan_cache) == 0:
+            print(f"[WARN] 캐시가 비어 있습니다: {plan_cache_path}")
+        
+        # XGB 예측 조회 테이블 (쿼리 × MAXDOP × JOIN × FAST를 한 번에 배치 예측)
+        self.surrogate = XGBSurrogate(self.xgb_model, verbose=verbose,
+                                      model_version=read_model_version(model_path))
+        if prediction_table is not None:
+            self.surrogate.load_table(prediction_table)
         else:
-            print(f"[WARN] 캐시 파일이 없습니다: {cache_path}")
-            self.plan_cache = {}
+            self._precompute_predictions()
         
         # Gym spaces
         # Action space: 7차원 continuous [0, 1]
@@ -149,51 +170,43 @@ class QueryPlanSimEnvDDPGv1(gym.Env):
             print(f"  - Observation space: 18 dims")
     
     def _get_baseline_from_cache(self, sql: str) -> tuple:
-        """캐시에서 베이스라인 메트릭을 가져옵니다."""
-        cache_key = sql.strip()
-        
-        if cache_key in self.plan_cache:
-            cached_data = self.plan_cache[cache_key]
-            features = cached_data.get('observation', np.zeros(XGB_EXPECTED_FEATURES))
-            metrics = cached_data.get('metrics', {
-                'elapsed_time_ms': 100.0,
-                'logical_reads': 1000,
-                'cpu_time_ms': 70.0
-            }).copy()
-            
-            # 안전 장치
-            metrics['elapsed_time_ms'] = max(0.1, metrics['elapsed_time_ms'])
-            metrics['logical_reads'] = max(1, metrics['logical_reads'])
-            metrics['cpu_time_ms'] = max(0.1, metrics['cpu_time_ms'])
-            
-            return features, metrics
-        else:
-            # 기본값
-            if self.verbose:
-                print(f"[WARN] 캐시에 없는 쿼리: {sql[:50]}...")
-            features = np.zeros(XGB_EXPECTED_FEATURES, dtype=np.float32)
-            metrics = {
-                'elapsed_time_ms': 100.0,
-                'logical_reads': 1000,
-                'cpu_time_ms': 70.0
-            }
-            return features, metrics
+        """캐시에서 베이스라인 특징과 메트릭을 가져옵니다."""
+        cached_data = self.plan_cache.get(sql)
+        if cached_data is None:
+            # 가짜 기본값 대신 명시적으로 실패 (수집 스크립트로 캐시를 채워야 함)
+            raise KeyError(f"캐시에 없는 쿼리: {sql[:80]}...")
+        
+        metrics = cached_data['metrics'].copy()
+        features = cached_data['observation']
+        if features is None:
+            if cached_data['plan_xml']:
+                features = extract_features(cached_data['plan_xml'], metrics)
+            else:
+                features = np.zeros(XGB_EXPECTED_FEATURES, dtype=np.float32)
+        
+        # 안전 장치
+        metrics['elapsed_time_ms'] = max(0.1, metrics['elapsed_time_ms'])
+        metrics['logical_reads'] = max(1, metrics['logical_reads'])
+        metrics['cpu_time_ms'] = max(0.1, metrics['cpu_time_ms'])
+        
+        return features, metrics
     
-    def _simulate_query_with_hints(self, sql: str, hints: dict) -> dict:
-        """
-        XGB 모델을 사용하여 힌트 적용 후 성능을 시뮬레이션합니다.
-        
-        Args:
-            sql: SQL 쿼리
-            hints: 적용할 힌트들
-        
-        Returns:
-            metrics: 예측된 성능 메트릭
-        """
-        # 베이스라인 features 가져오기
-        baseline_features, _ = self._get_baseline_from_cache(sql)
-        
-        # 힌트에 따른 feature 수정
+    @staticmethod
+    def _surrogate_key(sql: str, hints: dict) -> tuple:
+        """XGB 입력 특징에 영향을 주는 힌트(MAXDOP, JOIN, FAST)만으로 조회 키를 만듭니다."""
+        maxdop = hints.get('maxdop', 0)
+        join_hint = hints.get('join_hint', 'none')
+        fast_n = hints.get('fast_n', 0)
+        return (
+            sql,
+            maxdop if maxdop > 0 else 0,
+            join_hint if join_hint in ('hash', 'loop', 'merge') else 'none',
+            fast_n if fast_n > 0 else 0
+        )
+    
+    @staticmethod
+    def _apply_hints_to_features(baseline_features: np.ndarray, hints: dict) -> np.ndarray:
+        """힌트에 따라 XGB 입력 특징을 수정합니다."""
         modified_features = baseline_features.copy()
         
         # Feature indices (phase2_features.py 기준):
@@ -226,9 +239,55 @@ class QueryPlanSimEnvDDPGv1(gym.Env):
         if fast_n > 0 and len(modified_features) > 0:
             modified_features[0] = min(modified_features[0], float(fast_n))
         
-        # XGB 예측
+        return modified_features
+    
+    def _precompute_predictions(self):
+        """
+        모든 쿼리 × (MAXDOP, JOIN, FAST) 조합의 XGB 예측값을 한 번에 배치로 계산합니다.
+        
+        나머지 힌트(ISOLATION, OPTIMIZER_HINT, RECOMPILE)는 예측 후 보정 계수로만 반영되므로
+        조회 키에 포함하지 않습니다.
+        """
+        ranges = self.action_decoder.action_ranges
+        maxdop_values = range(ranges['maxdop']['min'], ranges['maxdop']['max'] + 1)
+        join_values = ranges['join_hint']['values']
+        fast_values = ranges['fast_n']['values']
+        
+        keyed_features = {}
+        for sql in dict.fromkeys(self.query_list):
+            try:
+                baseline_features, _ = self._get_baseline_from_cache(sql)
+            except KeyError:
+                continue  # 캐시에 없는 쿼리는 reset 시점에 오류로 드러남
+            for maxdop in maxdop_values:
+                for join_hint in join_values:
+                    for fast_n in fast_values:
+                        hints = {'maxdop': maxdop, 'join_hint': join_hint, 'fast_n': fast_n}
+                        key = self._surrogate_key(sql, hints)
+                        if key not in keyed_features:
+                            keyed_features[key] = self._apply_hints_to_features(baseline_features, hints)
+        
+        self.surrogate.precompute(keyed_features)
+    
+    def _simulate_query_with_hints(self, sql: str, hints: dict) -> dict:
+        """
+        XGB 모델을 사용하여 힌트 적용 후 성능을 시뮬레이션합니다.
+        
+        Args:
+            sql: SQL 쿼리
+            hints: 적용할 힌트들
+        
+        Returns:
+            metrics: 예측된 성능 메트릭
+        """
+        # XGB 예측 (미리 계산된 조회 테이블 사용)
         try:
-            predicted_time = self.xgb_model.predict([modified_features])[0]
+            key = self._surrogate_key(sql, hints)
+            modified_features = None
+            if key not in self.surrogate:
+                baseline_features, _ = self._get_baseline_from_cache(sql)
+                modified_features = self._apply_hints_to_features(baseline_features, hints)
+            predicted_time = self.surrogate.predict(key, modified_features)
             predicted_time = max(0.1, predicted_time)
             
             # 추가 힌트에 따른 조정
@@ -275,10 +334,21 @@ class QueryPlanSimEnvDDPGv1(gym.Env):
                 'cpu_time_ms': 0
             }
     
+    def refresh_model(self) -> bool:
+        """증분 학습으로 모델 버전이 올라갔으면 새 모델로 예측 테이블을 다시 계산합니다."""
+        if not self.surrogate.reload_if_newer(self.model_path):
+            return False
+        self.xgb_model = self.surrogate.xgb_model
+        self._precompute_predictions()
+        return True
+
     def reset(self, seed=None, options=None):
         """에피소드 시작"""
         super().reset(seed=seed)
         
+        if self.model_refresh:
+            self.refresh_model()
+        
         # 쿼리 선택
         self.current_sql = self.query_list[self.current_query_ix]
         self.current_query_ix = (self.current_query_ix + 1) % len(self.query_list)
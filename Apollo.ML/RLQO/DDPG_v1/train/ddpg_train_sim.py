@@ -10,6 +10,7 @@ Stable-Baselines3 DDPG를 사용한 시뮬레이션 학습
 
 import os
 import sys
+import argparse
 from datetime import datetime
 import numpy as np
 
@@ -28,6 +29,7 @@ sys.path.insert(0, project_root)
 sys.path.insert(0, apollo_ml_dir)
 
 from RLQO.DDPG_v1.env.ddpg_sim_env import QueryPlanSimEnvDDPGv1
+from RLQO.vec_env import make_sim_vec_env
 
 # Load 30 queries
 sys.path.insert(0, os.path.join(apollo_ml_dir, 'RLQO'))
@@ -64,12 +66,15 @@ for directory in [SIM_LOG_DIR, SIM_CHECKPOINT_DIR, TB_LOG_DIR]:
     os.makedirs(directory, exist_ok=True)
 
 
-def make_env(verbose=False):
+def make_env(verbose=False, plan_cache_readonly=False, prediction_table=None, log_path=SIM_LOG_DIR):
     """
     Create Simulation environment
     
     Args:
         verbose: Whether to print progress
+        plan_cache_readonly: Open the shared plan cache read-only (parallel copies)
+        prediction_table: Precomputed XGB prediction table shared across parallel copies
+        log_path: Monitor log path
     
     Returns:
         env: Simulation environment
@@ -77,15 +82,36 @@ def make_env(verbose=False):
     env = QueryPlanSimEnvDDPGv1(
         query_list=SAMPLE_QUERIES,
         max_steps=10,
-        verbose=verbose
+        verbose=verbose,
+        plan_cache_readonly=plan_cache_readonly,
+        prediction_table=prediction_table
     )
     
-    env = Monitor(env, SIM_LOG_DIR)
+    env = Monitor(env, log_path)
     
     return env
 
 
-def train_simulation():
+def make_vec_env(n_envs, verbose=False):
+    """
+    Create N parallel simulation environments
+    
+    The template env fills the shared SQLite plan cache and computes the XGB prediction table once;
+    every copy opens the cache read-only and reuses the table instead of rebuilding it per process.
+    Each copy writes its own Monitor file.
+    """
+    template_env = make_env(verbose=verbose)
+    prediction_table = template_env.unwrapped.surrogate.export_table()
+    template_env.close()
+    
+    def env_fn(rank):
+        return make_env(plan_cache_readonly=True, prediction_table=prediction_table,
+                        log_path=os.path.join(SIM_LOG_DIR, str(rank)))
+    
+    return make_sim_vec_env(env_fn, n_envs=n_envs)
+
+
+def train_simulation(n_envs=1):
     """
     DDPG v1 Training in Simulation Environment
     
@@ -94,6 +120,9 @@ def train_simulation():
     - Off-policy learning with replay buffer
     - Ornstein-Uhlenbeck noise for exploration
     - Target networks with soft updates
+    
+    Args:
+        n_envs: Number of parallel simulation environments
     """
     print("=" * 80)
     print(" DDPG v1 Simulation Training Start")
@@ -104,6 +133,7 @@ def train_simulation():
     print(f"Environment: XGBoost Simulation")
     print(f"Timesteps: {SIM_TIMESTEPS:,}")
     print(f"Query Count: {len(SAMPLE_QUERIES)}")
+    print(f"Parallel Envs: {n_envs}")
     print(f"Estimated Time: 30-45 minutes")
     print("-" * 80)
     print(f"DDPG v1 Key Features:")
@@ -117,7 +147,7 @@ def train_simulation():
     
     # Create environment
     print("\n[1/4] Creating environment...")
-    env = make_env(verbose=True)
+    env = make_vec_env(n_envs, verbose=True) if n_envs > 1 else make_env(verbose=True)
     
     print(f"Action space: {env.action_space}")
     print(f"Observation space: {env.observation_space}")
@@ -160,7 +190,8 @@ def train_simulation():
     # Callbacks
     print("\n[4/4] Setting up callbacks...")
     checkpoint_callback = CheckpointCallback(
-        save_freq=10_000,  # Every 10K steps
+        # save_freq counts per-env steps, so divide by n_envs to keep every 10K total steps
+        save_freq=max(10_000 // n_envs, 1),  # Every 10K steps
         save_path=SIM_CHECKPOINT_DIR,
         name_prefix="ddpg_v1_sim"
     )
@@ -214,6 +245,11 @@ def train_simulation():
 
 
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='DDPG v1 Simulation Training')
+    parser.add_argument('--n-envs', type=int, default=1,
+                        help='Number of parallel simulation environments (SubprocVecEnv when > 1)')
+    args = parser.parse_args()
+    
     # Test environment first
     print("Testing environment...")
     test_env = make_env(verbose=False)
@@ -228,5 +264,5 @@ if __name__ == '__main__':
     input("Press Enter to start training (or Ctrl+C to cancel)...")
     print("=" * 80 + "\n")
     
-    train_simulation()
+    train_simulation(n_envs=args.n_envs)
 
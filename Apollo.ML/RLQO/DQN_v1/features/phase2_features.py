@@ -1,11 +1,21 @@
 import numpy as np
 from lxml import etree
 
+from plan_feature_store import PlanFeatureStore
+
 # 미리 학습된 XGBoost 모델이 기대하는 피처의 수
 XGB_EXPECTED_FEATURES = 79
 
 # XML 네임스페이스
 PLAN_NS = "{http://schemas.microsoft.com/sqlserver/2004/07/showplan}"
+RELOP_TAG = f"{PLAN_NS}RelOp"
+STMT_SIMPLE_TAG = f"{PLAN_NS}StmtSimple"
+MISSING_INDEXES_TAG = f"{PLAN_NS}MissingIndexes"
+MISSING_INDEX_GROUP_TAG = f"{PLAN_NS}MissingIndexGroup"
+WARNINGS_TAG = f"{PLAN_NS}Warnings"
+
+# 같은 실행 계획은 에피소드마다 반복되므로 plan XML 지문별로 파싱 결과를 재사용 (프로세스 내 메모리 전용)
+_PLAN_FEATURE_MEMO = PlanFeatureStore(path=None, namespace='phase2_v1', capacity=4096)
 
 def parse_plan_features(plan_xml: str) -> dict:
     """실행 계획 XML을 파싱하여 주요 특징을 딕셔너리로 추출합니다."""
@@ -36,90 +46,137 @@ def parse_plan_features(plan_xml: str) -> dict:
 
     try:
         root = etree.fromstring(plan_xml.encode('utf-8'))
-        # .xpath()를 사용하기 위한 네임스페이스 맵 정의
-        ns = {'sh': PLAN_NS.strip('{}')}
-        
-        # 전체 서브트리 비용 및 실제/예상 Rows
-        stmt = root.find(f".//{PLAN_NS}StmtSimple")
-        if stmt is not None:
-            features['estimated_cost'] = float(stmt.get('StatementSubTreeCost', 0))
-            
-        rel_op_root = root.find(f".//{PLAN_NS}RelOp")
-        if rel_op_root is not None:
-            features['estimated_rows'] = float(rel_op_root.get('EstimateRows', 0))
-            features['actual_rows'] = float(rel_op_root.get('ActualRows', 0))
-
-        # Cardinality 오차 계산
-        if features['estimated_rows'] > 0:
-            features['cardinality_error'] = features['actual_rows'] / features['estimated_rows']
-        else:
-            features['cardinality_error'] = 1.0 if features['actual_rows'] > 0 else 0.0
+    except etree.XMLSyntaxError:
+        print("Warning: Could not parse execution plan XML.")
+        return features
+
+    # 트리를 한 번만 순회하면서 모든 카운터를 채움 (연산자 종류별 xpath 반복 탐색 대신)
+    stmt = None
+    rel_op_root = None
+    join_count = hash_join_count = loop_join_count = 0
+    subquery_count = table_count = 0
+    index_scan_count = table_scan_count = 0
+    missing_index_count = warning_count = 0
+    parallel = False
+    most_expensive_op = None
+    max_cost = -1.0
+
+    for elem in root.iterdescendants(etree.Element):
+        tag = elem.tag
+        local_name = tag.rpartition('}')[2]
+        qualified_name = f"{elem.prefix}:{local_name}" if elem.prefix else local_name
 
         # 병렬 실행 여부 (DegreeOfParallelism > 0)
-        parallel_node = root.xpath(".//*[@DegreeOfParallelism > 0]", namespaces=ns)
-        if parallel_node:
-            features['parallelism_degree'] = 1
-
-        # 조인 타입 및 개수
-        joins = root.xpath(".//sh:RelOp[contains(@LogicalOp, 'Join')]", namespaces=ns)
-        features['join_count'] = len(joins)
-        hash_joins = root.xpath(".//sh:RelOp[contains(@LogicalOp, 'Join') and contains(@PhysicalOp, 'Hash')]", namespaces=ns)
-        loop_joins = root.xpath(".//sh:RelOp[contains(@LogicalOp, 'Join') and contains(@PhysicalOp, 'Nested Loops')]", namespaces=ns)
-        features['join_type_hash'] = 1 if len(hash_joins) > 0 else 0
-        features['join_type_loop'] = 1 if len(loop_joins) > 0 else 0
-
-        # 서브쿼리 개수 (Apply 연산자 기준)
-        subqueries = root.xpath(".//sh:RelOp[contains(@LogicalOp, 'Apply')]", namespaces=ns)
-        features['subquery_count'] = len(subqueries)
+        if not parallel:
+            dop = elem.get('DegreeOfParallelism')
+            if dop is not None:
+                try:
+                    parallel = float(dop) > 0
+                except ValueError:
+                    pass
 
         # 테이블 개수 (Table Scan, Index Scan/Seek 등 물리적 테이블 접근 연산자 기준)
-        table_access_ops = root.xpath(".//*[starts-with(name(), 'TableScan') or starts-with(name(), 'Index')]", namespaces=ns)
-        features['table_count'] = len(table_access_ops)
-        
-        # 스캔 타입
-        index_scans = root.xpath(".//sh:RelOp[contains(@PhysicalOp, 'Index Scan') or contains(@PhysicalOp, 'Index Seek')]", namespaces=ns)
-        table_scans = root.xpath(".//sh:RelOp[contains(@PhysicalOp, 'Table Scan')]", namespaces=ns)
-        features['scan_type_index'] = 1 if len(index_scans) > 0 else 0
-        features['scan_type_table'] = 1 if len(table_scans) > 0 else 0
-
-        # 누락된 인덱스 제안 개수
-        missing_indexes = root.xpath(".//sh:MissingIndexes/sh:MissingIndexGroup", namespaces=ns)
-        features['missing_index_count'] = len(missing_indexes)
-
-        # 가장 비용이 높은 연산자 찾기
-        all_ops = root.xpath(".//sh:RelOp", namespaces=ns)
-        most_expensive_op = None
-        max_cost = -1.0
-        for op in all_ops:
-            cost_str = op.get('EstimatedTotalSubtreeCost')
+        if qualified_name.startswith('TableScan') or qualified_name.startswith('Index'):
+            table_count += 1
+
+        if tag == RELOP_TAG:
+            if rel_op_root is None:
+                rel_op_root = elem
+
+            logical_op = elem.get('LogicalOp', '')
+            physical_op = elem.get('PhysicalOp', '')
+
+            # 조인 타입 및 개수
+            if 'Join' in logical_op:
+                join_count += 1
+                if 'Hash' in physical_op:
+                    hash_join_count += 1
+                if 'Nested Loops' in physical_op:
+                    loop_join_count += 1
+
+            # 서브쿼리 개수 (Apply 연산자 기준)
+            if 'Apply' in logical_op:
+                subquery_count += 1
+
+            # 스캔 타입
+            if 'Index Scan' in physical_op or 'Index Seek' in physical_op:
+                index_scan_count += 1
+            if 'Table Scan' in physical_op:
+                table_scan_count += 1
+
+            # 가장 비용이 높은 연산자
+            cost_str = elem.get('EstimatedTotalSubtreeCost')
             if cost_str:
                 cost = float(cost_str)
                 if cost > max_cost:
                     max_cost = cost
-                    most_expensive_op = op
-        
-        if most_expensive_op is not None:
-            features['most_expensive_op_cost'] = max_cost
-            logical_op = most_expensive_op.get('LogicalOp', '').lower()
-            if 'join' in logical_op:
-                features['most_expensive_op_is_join'] = 1
-            elif 'scan' in logical_op or 'seek' in logical_op:
-                features['most_expensive_op_is_scan'] = 1
-
-        # 계획 경고 개수
-        warnings = root.xpath(".//sh:Warnings", namespaces=ns)
-        features['plan_warning_count'] = len(warnings)
-
-    except etree.XMLSyntaxError:
-        print("Warning: Could not parse execution plan XML.")
+                    most_expensive_op = elem
+
+        elif tag == STMT_SIMPLE_TAG:
+            if stmt is None:
+                stmt = elem
+
+        elif tag == MISSING_INDEX_GROUP_TAG:
+            # 누락된 인덱스 제안 개수
+            parent = elem.getparent()
+            if parent is not None and parent.tag == MISSING_INDEXES_TAG:
+                missing_index_count += 1
+
+        elif tag == WARNINGS_TAG:
+            # 계획 경고 개수
+            warning_count += 1
+
+    # 전체 서브트리 비용 및 실제/예상 Rows
+    if stmt is not None:
+        features['estimated_cost'] = float(stmt.get('StatementSubTreeCost', 0))
+
+    if rel_op_root is not None:
+        features['estimated_rows'] = float(rel_op_root.get('EstimateRows', 0))
+        features['actual_rows'] = float(rel_op_root.get('ActualRows', 0))
+        # 실제 실행 계획(SET STATISTICS XML)은 스레드별 RunTimeCountersPerThread에 ActualRows를 기록
+        runtime_counters = rel_op_root.findall(f"{PLAN_NS}RunTimeInformation/{PLAN_NS}RunTimeCountersPerThread")
+        if runtime_counters:
+            features['actual_rows'] = sum(float(c.get('ActualRows', 0)) for c in runtime_counters)
+
+    # Cardinality 오차 계산
+    if features['estimated_rows'] > 0:
+        features['cardinality_error'] = features['actual_rows'] / features['estimated_rows']
+    else:
+        features['cardinality_error'] = 1.0 if features['actual_rows'] > 0 else 0.0
+
+    features['parallelism_degree'] = 1 if parallel else 0
+    features['join_count'] = join_count
+    features['join_type_hash'] = 1 if hash_join_count > 0 else 0
+    features['join_type_loop'] = 1 if loop_join_count > 0 else 0
+    features['subquery_count'] = subquery_count
+    features['table_count'] = table_count
+    features['scan_type_index'] = 1 if index_scan_count > 0 else 0
+    features['scan_type_table'] = 1 if table_scan_count > 0 else 0
+    features['missing_index_count'] = missing_index_count
+
+    if most_expensive_op is not None:
+        features['most_expensive_op_cost'] = max_cost
+        logical_op = most_expensive_op.get('LogicalOp', '').lower()
+        if 'join' in logical_op:
+            features['most_expensive_op_is_join'] = 1
+        elif 'scan' in logical_op or 'seek' in logical_op:
+            features['most_expensive_op_is_scan'] = 1
+
+    features['plan_warning_count'] = warning_count
 
     return features
 
+def parse_plan_features_cached(plan_xml: str) -> dict:
+    """parse_plan_features 결과를 plan XML 지문별로 재사용합니다 (호출자 수정에 대비해 사본 반환)."""
+    if not plan_xml:
+        return parse_plan_features(plan_xml)
+    return dict(_PLAN_FEATURE_MEMO.get_or_compute(plan_xml, parse_plan_features))
+
 def extract_features(plan_xml: str, metrics: dict) -> np.ndarray:
     """
     실행 계획 XML과 실행 통계(metrics)를 입력받아 최종 상태 벡터를 생성합니다.
     """
-    plan_features = parse_plan_features(plan_xml)
+    plan_features = parse_plan_features_cached(plan_xml)
     
     # 특징 벡터 생성 순서를 일관성 있게 유지
     feature_vector = [
@@ -10,6 +10,9 @@ SAMPLE_QUERIES의 실행 계획을 미리 수집하여 캐싱합니다.
 2. 각 액션 적용 버전 실행 계획 수집 (11 × 9 = 99개)
 3. pickle 파일로 저장
 4. 총 DB 접근: ~110번 (약 2-3분 소요)
+
+수집은 RLQO/plan_collector.py의 워커 풀로 실행합니다 (--workers N으로 병렬화, 기본 1 = 순차 측정).
+반복 실행마다 공유 캐시에 체크포인트하므로 중단되면 다시 실행해서 이어서 수집합니다.
 """
 
 import os
@@ -17,17 +20,20 @@ import sys
 import pickle
 from datetime import datetime
 import pandas as pd
-import numpy as np
 
 sys.path.append(os.path.join(os.getcwd(), 'Apollo.ML'))
 
 from RLQO.constants import SAMPLE_QUERIES
 from RLQO.DQN_v2.env.v2_db_env import apply_action_to_sql
 from RLQO.DQN_v1.features.phase2_features import extract_features
-from db import connect, get_execution_plan, get_query_statistics
 from config import load_config
+from RLQO.plan_cache import PlanCache, DEFAULT_CACHE_PATH, DEFAULT_SNAPSHOT_ID
+from RLQO.plan_collector import ParallelPlanCollector
 import json
 
+# 공유 캐시에 기록할 수집 스크립트 이름
+CACHE_SOURCE = 'v2_collect_plans'
+
 
 def parse_statistics(stats_io: str, stats_time: str) -> dict:
     """통계 파싱 (phase2_db_env.py와 동일)"""
@@ -63,21 +69,25 @@ def parse_statistics(stats_io: str, stats_time: str) -> dict:
     return metrics
 
 
-def collect_execution_plans():
+def collect_execution_plans(workers: int = 1, snapshot_id: str = DEFAULT_SNAPSHOT_ID):
     """
     SAMPLE_QUERIES의 모든 실행 계획을 수집합니다.
+    
+    Args:
+        workers: 동시 DB 연결 수 (1이면 순차 측정)
+        snapshot_id: 공유 캐시의 DB 스냅샷 ID
     """
     print("\n" + "="*80)
     print(" DQN v2: Execution Plan Pre-Collection")
     print("="*80)
     print(f"Start Time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
     print(f"Total Queries: {len(SAMPLE_QUERIES)}")
+    print(f"Workers: {workers}")
     
-    # 1. DB 연결
-    print("\n[1/4] Connecting to DB...")
+    # 1. DB 설정 로드 (연결은 수집 워커마다 생성)
+    print("\n[1/4] Loading DB Config...")
     config = load_config('Apollo.ML/config.yaml')
-    db_connection = connect(config.db)
-    print("[OK] DB Connected")
+    print("[OK] DB Config Loaded")
     
     # 2. 액션 로드
     print("\n[2/4] Loading Actions...")
@@ -85,123 +95,76 @@ def collect_execution_plans():
         actions = json.load(f)
     print(f"[OK] {len(actions)} Actions Loaded (v2.1)")
     
-    # 3. 실행 계획 수집
+    # 3. 실행 계획 수집 (5회 실행 후 중앙값, 공유 캐시에 체크포인트)
     print(f"\n[3/4] Collecting Execution Plans (Expected: {len(SAMPLE_QUERIES) * (len(actions) + 1)})...")
     
+    jobs = []
+    job_info = []  # (cache_key, query_id, action)
+    for q_idx, query in enumerate(SAMPLE_QUERIES):
+        jobs.append((f"Query {q_idx} baseline", query))
+        job_info.append((f"query_{q_idx}_baseline", q_idx, None, query))
+        
+        for action in actions:
+            try:
+                modified_sql = apply_action_to_sql(query, action)
+            except Exception:
+                # 잘못된 액션일 수 있음
+                continue
+            
+            # 원본과 동일하면 스킵
+            if modified_sql == query:
+                continue
+            
+            jobs.append((f"Query {q_idx} {action['name']}", modified_sql))
+            job_info.append((f"query_{q_idx}_action_{action['id']}", q_idx, action, modified_sql))
+    
+    shared_cache = PlanCache(DEFAULT_CACHE_PATH, snapshot_id=snapshot_id)
+    collector = ParallelPlanCollector(config.db, shared_cache, parse_statistics,
+                                      num_runs=5, workers=workers, source=CACHE_SOURCE)
+    results = collector.collect(jobs)
+    
     plan_cache = {}
     total_collected = 0
     failed_queries = []
     
-    for q_idx, query in enumerate(SAMPLE_QUERIES):
-        print(f"\nQuery {q_idx + 1}/{len(SAMPLE_QUERIES)}")
-        print(f"  SQL: {query[:100]}...")
+    for cache_key, q_idx, action, sql in job_info:
+        action_name = action['name'] if action else 'baseline'
+        entry = results.get(sql)
         
-        # 3-1. 원본 쿼리 실행 계획 수집 (5회 실행 후 중앙값)
-        try:
-            elapsed_times = []
-            logical_reads_list = []
-            cpu_times = []
-            plan_xml = None
-            
-            # 5회 실행하여 안정적인 메트릭 수집
-            for run in range(5):
-                stats_io, stats_time = get_query_statistics(db_connection, query)
-                if stats_io and stats_time:
-                    metrics_run = parse_statistics(stats_io, stats_time)
-                    elapsed_times.append(metrics_run.get('elapsed_time_ms', 0))
-                    logical_reads_list.append(metrics_run.get('logical_reads', 0))
-                    cpu_times.append(metrics_run.get('cpu_time_ms', 0))
-            
-            # 마지막 실행의 plan_xml 수집
-            plan_xml = get_execution_plan(db_connection, query)
-            
-            if plan_xml and elapsed_times:
-                # 중앙값 사용
-                metrics = {
-                    'elapsed_time_ms': float(np.median(elapsed_times)),
-                    'logical_reads': int(np.median(logical_reads_list)),
-                    'cpu_time_ms': float(np.median(cpu_times))
-                }
-                features = extract_features(plan_xml, metrics)
-                
-                plan_cache[f"query_{q_idx}_baseline"] = {
-                    'query_text': query,
-                    'query_id': q_idx,
-                    'action_id': None,
-                    'action_name': 'baseline',
-                    'plan_xml': plan_xml,
-                    'features': features,
-                    'metrics': metrics
-                }
-                total_collected += 1
-                print(f"  [OK] Baseline: {metrics['elapsed_time_ms']:.2f} ms (median of 5 runs)")
-            else:
-                print(f"  [WARN] Baseline: No execution plan")
-                failed_queries.append((q_idx, 'baseline', query[:50]))
+        if entry is None or not entry['plan_xml']:
+            if action is None:
+                print(f"  [WARN] Query {q_idx} Baseline: No execution plan")
+                failed_queries.append((q_idx, 'baseline', sql[:50]))
+            continue
         
-        except Exception as e:
-            print(f"  [ERROR] Baseline: {e}")
-            failed_queries.append((q_idx, 'baseline', str(e)))
+        metrics = {
+            'elapsed_time_ms': float(entry['metrics']['elapsed_time_ms']),
+            'logical_reads': int(entry['metrics']['logical_reads']),
+            'cpu_time_ms': float(entry['metrics']['cpu_time_ms'])
+        }
+        features = entry['observation']
+        if features is None:
+            features = extract_features(entry['plan_xml'], metrics)
         
-        # 3-2. 각 액션 적용 버전 수집 (5회 실행 후 중앙값)
-        for action in actions:
-            action_id = action['id']
-            action_name = action['name']
-            
-            try:
-                modified_sql = apply_action_to_sql(query, action)
-                
-                # 원본과 동일하면 스킵
-                if modified_sql == query:
-                    continue
-                
-                elapsed_times = []
-                logical_reads_list = []
-                cpu_times = []
-                plan_xml = None
-                
-                # 5회 실행하여 안정적인 메트릭 수집
-                for run in range(5):
-                    stats_io, stats_time = get_query_statistics(db_connection, modified_sql)
-                    if stats_io and stats_time:
-                        metrics_run = parse_statistics(stats_io, stats_time)
-                        elapsed_times.append(metrics_run.get('elapsed_time_ms', 0))
-                        logical_reads_list.append(metrics_run.get('logical_reads', 0))
-                        cpu_times.append(metrics_run.get('cpu_time_ms', 0))
-                
-                # 마지막 실행의 plan_xml 수집
-                plan_xml = get_execution_plan(db_connection, modified_sql)
-                
-                if plan_xml and elapsed_times:
-                    # 중앙값 사용
-                    metrics = {
-                        'elapsed_time_ms': float(np.median(elapsed_times)),
-                        'logical_reads': int(np.median(logical_reads_list)),
-                        'cpu_time_ms': float(np.median(cpu_times))
-                    }
-                    features = extract_features(plan_xml, metrics)
-                    
-                    plan_cache[f"query_{q_idx}_action_{action_id}"] = {
-                        'query_text': modified_sql,
-                        'query_id': q_idx,
-                        'action_id': action_id,
-                        'action_name': action_name,
-                        'plan_xml': plan_xml,
-                        'features': features,
-                        'metrics': metrics
-                    }
-                    total_collected += 1
-                    
-                    # 개선도 계산
-                    baseline_time = plan_cache[f"query_{q_idx}_baseline"]['metrics']['elapsed_time_ms']
-                    improvement = (baseline_time - metrics['elapsed_time_ms']) / baseline_time * 100
-                    print(f"  [OK] {action_name}: {metrics['elapsed_time_ms']:.2f} ms ({improvement:+.1f}%)")
-                else:
-                    print(f"  [WARN] {action_name}: No execution plan")
-            
-            except Exception as e:
-                # 실패는 조용히 넘어감 (잘못된 액션일 수 있음)
-                pass
+        plan_cache[cache_key] = {
+            'query_text': sql,
+            'query_id': q_idx,
+            'action_id': action['id'] if action else None,
+            'action_name': action_name,
+            'plan_xml': entry['plan_xml'],
+            'features': features,
+            'metrics': metrics
+        }
+        total_collected += 1
+        
+        baseline = plan_cache.get(f"query_{q_idx}_baseline")
+        if action is None:
+            print(f"  [OK] Query {q_idx} Baseline: {metrics['elapsed_time_ms']:.2f} ms (median of 5 runs)")
+        elif baseline:
+            # 개선도 계산
+            baseline_time = baseline['metrics']['elapsed_time_ms']
+            improvement = (baseline_time - metrics['elapsed_time_ms']) / baseline_time * 100
+            print(f"  [OK] Query {q_idx} {action_name}: {metrics['elapsed_time_ms']:.2f} ms ({improvement:+.1f}%)")
     
     # 4. 저장
     print(f"\n[4/4] Saving Results...")
@@ -232,8 +195,8 @@ def collect_execution_plans():
     stats_df.to_csv(stats_path, index=False, encoding='utf-8-sig')
     print(f"[OK] Stats Saved: {stats_path}")
     
-    # DB 연결 종료
-    db_connection.close()
+    shared_cache.print_stats()
+    shared_cache.close()
     
     # 5. 요약
     print("\n" + "="*80)
@@ -259,8 +222,17 @@ def collect_execution_plans():
 
 
 if __name__ == '__main__':
+    import argparse
+    
+    parser = argparse.ArgumentParser(description='DQN v2 Execution Plan Pre-Collection')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='동시 DB 연결 수 (기본 1: 순차 측정, 늘리면 빠르지만 측정 간섭 증가)')
+    parser.add_argument('--snapshot-id', default=DEFAULT_SNAPSHOT_ID,
+                        help=f'공유 캐시의 DB 스냅샷 ID (기본값: RLQO_SNAPSHOT_ID 환경 변수 또는 default, 현재 {DEFAULT_SNAPSHOT_ID})')
+    args = parser.parse_args()
+    
     try:
-        cache, stats = collect_execution_plans()
+        cache, stats = collect_execution_plans(workers=args.workers, snapshot_id=args.snapshot_id)
         print("\n[SUCCESS] Execution Plan Collection Complete!")
         print(f"Total Items: {len(cache)}")
         print("\nKey Statistics:")
@@ -12,7 +12,6 @@ import os
 import re
 import time
 import gymnasium as gym
-import joblib
 import numpy as np
 from gymnasium import spaces
 
@@ -28,7 +27,7 @@ sys.path.append(rlqo_dir)
 
 from RLQO.DQN_v1.features.phase2_features import extract_features, XGB_EXPECTED_FEATURES
 from RLQO.DQN_v3.env.v3_reward import calculate_reward_v3
-from db import connect, get_execution_plan, get_query_statistics
+from db import connect, get_execution_plan, get_query_statistics, get_plan_and_statistics
 from config import load_config
 
 # --- Helper Functions ---
@@ -134,7 +133,9 @@ class QueryPlanDBEnvV3(gym.Env):
                  action_space_path='Apollo.ML/artifacts/RLQO/configs/v3_action_space.json',
                  compatibility_path='Apollo.ML/artifacts/RLQO/configs/v3_query_action_compatibility.json',
                  curriculum_mode=False,
-                 verbose=True):
+                 verbose=True,
+                 use_actual_plan=False,
+                 measurement_broker=None):
         super().__init__()
         
         # 1. DB 연결 및 모델/설정 로드
@@ -145,7 +146,13 @@ class QueryPlanDBEnvV3(gym.Env):
         model_path = os.path.join(apollo_ml_dir, 'artifacts', 'model.joblib')
         
         self.config = load_config(config_path)
-        self.db_connection = connect(self.config.db, max_retries=3, retry_delay=5)
+        # 공유 측정기(Ensemble 평가 등)가 있으면 그 연결과 에피소드 캐시를 사용
+        self.measurement_broker = measurement_broker
+        if measurement_broker is not None:
+            self.db_connection = measurement_broker.conn
+        else:
+            self.db_connection = connect(self.config.db, max_retries=3, retry_delay=5)
+        import joblib
         self.xgb_model = joblib.load(model_path)
         
         # 2. Action Space 로드 (v3: 19개 액션)
@@ -160,6 +167,8 @@ class QueryPlanDBEnvV3(gym.Env):
         self.curriculum_mode = curriculum_mode
         self.query_list_original = query_list
         self.verbose = verbose
+        # True: SET STATISTICS XML로 1회 실행하여 실제 계획 + 통계를 함께 측정
+        self.use_actual_plan = use_actual_plan
         
         if curriculum_mode:
             # 베이스라인 시간 측정하여 난이도 순 정렬
@@ -224,8 +233,13 @@ class QueryPlanDBEnvV3(gym.Env):
         """SQL을 실행하고 DB에서 관측값(State)과 통계(Metrics)를 가져옵니다. 재시도 로직 포함."""
         for attempt in range(max_retries):
             try:
-                plan_xml = get_execution_plan(self.db_connection, sql)
-                stats_io, stats_time = get_query_statistics(self.db_connection, sql)
+                if self.measurement_broker is not None:
+                    plan_xml, stats_io, stats_time = self.measurement_broker.measure(sql)
+                elif self.use_actual_plan:
+                    plan_xml, stats_io, stats_time = get_plan_and_statistics(self.db_connection, sql)
+                else:
+                    plan_xml = get_execution_plan(self.db_connection, sql)
+                    stats_io, stats_time = get_query_statistics(self.db_connection, sql)
                 
                 if not plan_xml:
                     if self.verbose:
@@ -403,7 +417,8 @@ class QueryPlanDBEnvV3(gym.Env):
         return self.current_obs, reward, terminated, truncated, info
 
     def close(self):
-        if self.db_connection:
+        # 공유 측정기의 연결은 측정기가 닫음
+        if self.db_connection and self.measurement_broker is None:
             self.db_connection.close()
 
 
@@ -8,9 +8,7 @@ DQN v3: XGBoost 시뮬레이션 환경
 
 import json
 import os
-import pickle
 import gymnasium as gym
-import joblib
 import numpy as np
 from gymnasium import spaces
 
@@ -24,7 +22,8 @@ rlqo_dir = os.path.abspath(os.path.join(current_dir, '..', '..'))
 sys.path.append(apollo_ml_dir)
 sys.path.append(rlqo_dir)
 
-from RLQO.DQN_v1.features.phase2_features import XGB_EXPECTED_FEATURES
+from RLQO.DQN_v1.features.phase2_features import extract_features, XGB_EXPECTED_FEATURES
+from RLQO.plan_cache import PlanCache, DEFAULT_CACHE_PATH, DEFAULT_SNAPSHOT_ID
 from RLQO.DQN_v3.env.v3_reward import calculate_reward_v3
 
 
@@ -164,7 +163,10 @@ class QueryPlanSimEnvV3(gym.Env):
                  compatibility_path='Apollo.ML/artifacts/RLQO/configs/v3_query_action_compatibility.json',
                  cache_path='Apollo.ML/artifacts/RLQO/cache/v2_plan_cache.pkl',
                  curriculum_mode=False,
-                 verbose=True):
+                 verbose=True,
+                 plan_cache_path=DEFAULT_CACHE_PATH,
+                 plan_cache_readonly=False,
+                 plan_cache_snapshot_id=DEFAULT_SNAPSHOT_ID):
         super().__init__()
         
         # 1. 액션 스페이스 로드
@@ -179,17 +181,21 @@ class QueryPlanSimEnvV3(gym.Env):
         
         # 3. XGB 모델 로드
         model_path = os.path.join(apollo_ml_dir, 'artifacts/model.joblib')
+        import joblib
         self.xgb_model = joblib.load(model_path)
         
         # 4. 실행 계획 캐시 로드
+        # 공유 SQLite 캐시 사용, 기존 피클 캐시가 있으면 한 번 가져옴 (이미 있는 항목은 건너뜀)
+        # plan_cache_readonly=True: 병렬 환경 복사본용 (부모 프로세스가 캐시를 미리 채움)
+        # plan_cache_snapshot_id: 수집 스크립트의 --snapshot-id와 같은 DB 스냅샷 ID
+        self.plan_cache = PlanCache(plan_cache_path, snapshot_id=plan_cache_snapshot_id, readonly=plan_cache_readonly)
         cache_full_path = os.path.join(apollo_ml_dir, cache_path.replace('Apollo.ML/', ''))
-        if os.path.exists(cache_full_path):
-            with open(cache_full_path, 'rb') as f:
-                self.plan_cache = pickle.load(f)
-        else:
-            print(f"[WARN] 캐시 파일이 없습니다: {cache_full_path}")
-            print(f"[INFO] 캐시 없이 기본값으로 실행합니다.")
-            self.plan_cache = {}
+        if not plan_cache_readonly and os.path.exists(cache_full_path):
+            imported = self.plan_cache.import_pickle(cache_full_path)
+            if imported and verbose:
+                print(f"[INFO] 피클 캐시에서 {imported}개 항목을 가져왔습니다: {cache_full_path}")
+        elif len(self.plan_cache) == 0:
+            print(f"[WARN] 캐시가 비어 있습니다: {plan_cache_path}")
         
         # 5. Curriculum Learning 설정
         self.curriculum_mode = curriculum_mode
@@ -234,29 +240,31 @@ class QueryPlanSimEnvV3(gym.Env):
 
     def _get_obs_from_cache(self, sql: str) -> tuple[np.ndarray, dict]:
         """캐시에서 실행 계획과 메트릭을 가져옵니다."""
-        cache_key = sql.strip()
-        
-        if cache_key in self.plan_cache:
-            cached_data = self.plan_cache[cache_key]
-            observation = cached_data['observation']
-            metrics = cached_data['metrics'].copy()
-            
-            # 안전성을 위해 0 이하 값 방지
-            metrics['elapsed_time_ms'] = max(0.1, metrics['elapsed_time_ms'])
-            metrics['logical_reads'] = max(1, metrics['logical_reads'])
-            metrics['cpu_time_ms'] = max(0.1, metrics['cpu_time_ms'])
-            
-            return observation, metrics
-        else:
-            print(f"[WARN] 캐시에 없는 쿼리: {sql[:50]}...")
-            # 기본값 반환
-            observation = np.zeros(XGB_EXPECTED_FEATURES, dtype=np.float32)
-            metrics = {
-                'elapsed_time_ms': 100.0,
-                'logical_reads': 1000,
-                'cpu_time_ms': 70.0
-            }
-            return observation, metrics
+        cached_data, is_fallback = self.plan_cache.get_with_fallback(sql)
+        
+        if cached_data is None:
+            # 가짜 기본값 대신 명시적으로 실패 (수집 스크립트로 캐시를 채워야 함)
+            raise KeyError(f"캐시에 없는 쿼리 (베이스 쿼리도 없음): {sql[:80]}...")
+        
+        if is_fallback and self.verbose:
+            print(f"[WARN] 캐시에 없는 액션 조합 - 베이스 쿼리 실측값 사용: {sql[:50]}...")
+        # 'fallback'이면 힌트 효과가 반영되지 않은 베이스 실측값 (보상 해석 시 구분용)
+        self.last_cache_source = cached_data['source']
+        
+        metrics = cached_data['metrics'].copy()
+        observation = cached_data['observation']
+        if observation is None:
+            if cached_data['plan_xml']:
+                observation = extract_features(cached_data['plan_xml'], metrics)
+            else:
+                observation = np.zeros(XGB_EXPECTED_FEATURES, dtype=np.float32)
+        
+        # 안전성을 위해 0 이하 값 방지
+        metrics['elapsed_time_ms'] = max(0.1, metrics['elapsed_time_ms'])
+        metrics['logical_reads'] = max(1, metrics['logical_reads'])
+        metrics['cpu_time_ms'] = max(0.1, metrics['cpu_time_ms'])
+        
+        return observation, metrics
 
     def reset(self, seed=None, options=None):
         super().reset(seed=seed)
@@ -373,7 +381,7 @@ class QueryPlanSimEnvV3(gym.Env):
         return self.current_obs, reward, terminated, truncated, info
 
     def close(self):
-        pass
+        self.plan_cache.close()
 
 
 if __name__ == '__main__':
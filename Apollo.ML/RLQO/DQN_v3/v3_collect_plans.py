@@ -10,7 +10,7 @@ SAMPLE_QUERIES의 실행 계획을 미리 수집하여 캐싱합니다.
 실행 순서:
 1. 원본 쿼리 9개 실행 계획 수집
 2. 각 쿼리별 호환 액션만 적용 버전 실행 계획 수집
-3. pickle 파일로 저장
+3. pickle 파일 + 공유 SQLite 캐시(RLQO/plan_cache.py)에 저장 (이미 공유 캐시에 있는 조합은 재사용)
 4. 총 DB 접근: ~100번 (약 1-2시간 소요)
 """
 
@@ -35,6 +35,10 @@ from RLQO.DQN_v3.env.v3_db_env import apply_action_to_sql
 from RLQO.DQN_v1.features.phase2_features import extract_features
 from db import connect, get_execution_plan, get_query_statistics
 from config import load_config
+from RLQO.plan_cache import PlanCache, DEFAULT_CACHE_PATH, DEFAULT_SNAPSHOT_ID
+
+# 공유 캐시에 기록할 수집 스크립트 이름
+CACHE_SOURCE = 'v3_collect_plans'
 
 
 def parse_statistics(stats_io: str, stats_time: str) -> dict:
@@ -136,12 +140,44 @@ def collect_query_plan_with_median(conn, sql: str, num_runs: int = 5) -> dict:
         'observation': observation,
         'metrics': median_metrics,
         'plan_xml': plan_xml,
-        'runs': len(all_metrics)
+        'runs': len(all_metrics),
+        'all_metrics': all_metrics
     }
 
 
-def main():
-    """메인 실행 함수"""
+def collect_with_shared_cache(conn, shared_cache: PlanCache, sql: str, num_runs: int = 5) -> dict:
+    """
+    공유 캐시(PlanCache)에 같은 쿼리+힌트 조합이 있으면 재사용하고,
+    없으면 DB에서 수집한 뒤 공유 캐시에 저장합니다.
+    """
+    cached = shared_cache.get(sql)
+    if cached is not None and cached['observation'] is not None:
+        return {
+            'observation': cached['observation'],
+            'metrics': cached['metrics'],
+            'plan_xml': cached['plan_xml'],
+            'runs': cached['runs'] or 0,
+            'all_metrics': [],
+            'reused': True
+        }
+
+    result = collect_query_plan_with_median(conn, sql, num_runs=num_runs)
+    if result:
+        shared_cache.put(sql,
+                         runs=result['all_metrics'],
+                         plan_xml=result['plan_xml'],
+                         observation=result['observation'],
+                         source=CACHE_SOURCE)
+    return result
+
+
+def main(snapshot_id: str = DEFAULT_SNAPSHOT_ID):
+    """
+    메인 실행 함수
+
+    Args:
+        snapshot_id: 공유 캐시의 DB 스냅샷 ID
+    """
     print("=== DQN v3 실행 계획 수집 시작 ===\n")
     
     # 1. 설정 로드
@@ -160,6 +196,7 @@ def main():
     
     # 3. 캐시 딕셔너리 초기화
     plan_cache = {}
+    shared_cache = PlanCache(DEFAULT_CACHE_PATH, snapshot_id=snapshot_id)
     query_difficulties = {}
     
     # 4. 원본 쿼리 실행 계획 수집
@@ -168,7 +205,7 @@ def main():
         print(f"\n쿼리 {i} 수집 중...")
         print(f"SQL: {sql[:100]}...")
         
-        result = collect_query_plan_with_median(conn, sql, num_runs=5)
+        result = collect_with_shared_cache(conn, shared_cache, sql, num_runs=5)
         if result:
             plan_cache[sql.strip()] = result
             query_difficulties[i] = result['metrics']['elapsed_time_ms']
@@ -207,7 +244,7 @@ def main():
                 continue
             
             print(f"  {action_name} 수집 중...")
-            result = collect_query_plan_with_median(conn, modified_sql, num_runs=5)
+            result = collect_with_shared_cache(conn, shared_cache, modified_sql, num_runs=5)
             
             if result:
                 plan_cache[cache_key] = result
@@ -247,9 +284,18 @@ def main():
     for i, (query_idx, difficulty) in enumerate(sorted_difficulties):
         print(f"{i+1}. 쿼리 {query_idx}: {difficulty:.1f}ms")
     
+    shared_cache.print_stats()
+    shared_cache.close()
     conn.close()
     print(f"\n[SUCCESS] 모든 작업 완료!")
 
 
 if __name__ == "__main__":
-    main()
+    import argparse
+
+    parser = argparse.ArgumentParser(description='DQN v3 실행 계획 수집')
+    parser.add_argument('--snapshot-id', default=DEFAULT_SNAPSHOT_ID,
+                        help=f'공유 캐시의 DB 스냅샷 ID (기본값: RLQO_SNAPSHOT_ID 환경 변수 또는 default, 현재 {DEFAULT_SNAPSHOT_ID})')
+    args = parser.parse_args()
+
+    main(snapshot_id=args.snapshot_id)
@@ -13,7 +13,6 @@ import os
 import re
 import time
 import gymnasium as gym
-import joblib
 import numpy as np
 from gymnasium import spaces
 
@@ -29,7 +28,8 @@ sys.path.append(rlqo_dir)
 
 from RLQO.DQN_v1.features.phase2_features import extract_features, XGB_EXPECTED_FEATURES
 from RLQO.DQN_v4.env.v4_reward import calculate_reward_v4
-from db import connect, get_execution_plan, get_query_statistics
+from RLQO.action_masks import compile_compatibility_matrix
+from db import connect, get_execution_plan, get_query_statistics, get_plan_and_statistics
 from config import load_config
 
 # --- Helper Functions ---
@@ -184,7 +184,9 @@ class QueryPlanDBEnvV4(gym.Env):
                  action_space_path='Apollo.ML/artifacts/RLQO/configs/v4_action_space.json',
                  compatibility_path='Apollo.ML/artifacts/RLQO/configs/v4_query_action_compatibility.json',
                  curriculum_mode=False,
-                 verbose=True):
+                 verbose=True,
+                 use_actual_plan=False,
+                 measurement_broker=None):
         super().__init__()
         
         # 1. DB 연결 및 모델/설정 로드
@@ -195,7 +197,13 @@ class QueryPlanDBEnvV4(gym.Env):
         model_path = os.path.join(apollo_ml_dir, 'artifacts', 'model.joblib')
         
         self.config = load_config(config_path)
-        self.db_connection = connect(self.config.db, max_retries=3, retry_delay=5)
+        # 공유 측정기(Ensemble 평가 등)가 있으면 그 연결과 에피소드 캐시를 사용
+        self.measurement_broker = measurement_broker
+        if measurement_broker is not None:
+            self.db_connection = measurement_broker.conn
+        else:
+            self.db_connection = connect(self.config.db, max_retries=3, retry_delay=5)
+        import joblib
         self.xgb_model = joblib.load(model_path)
         
         # 2. Action Space 로드 (v3: 19개 액션)
@@ -210,6 +218,8 @@ class QueryPlanDBEnvV4(gym.Env):
         self.curriculum_mode = curriculum_mode
         self.query_list_original = query_list
         self.verbose = verbose
+        # True: SET STATISTICS XML로 1회 실행하여 실제 계획 + 통계를 함께 측정
+        self.use_actual_plan = use_actual_plan
         
         if curriculum_mode:
             # 베이스라인 시간 측정하여 난이도 순 정렬
@@ -231,6 +241,11 @@ class QueryPlanDBEnvV4(gym.Env):
             self.query_list = query_list
             self.original_indices = list(range(len(query_list)))
         
+        # 호환성 맵을 (쿼리 × 액션) bool 행렬로 한 번만 컴파일
+        self.action_mask_matrix = compile_compatibility_matrix(
+            self.actions, self.compatibility_map, self.original_indices
+        )
+        
         # 5. 에피소드 변수
         self.current_query_ix = 0
         self.current_sql = ""
@@ -274,8 +289,13 @@ class QueryPlanDBEnvV4(gym.Env):
         """SQL을 실행하고 DB에서 관측값(State)과 통계(Metrics)를 가져옵니다. 재시도 로직 포함."""
         for attempt in range(max_retries):
             try:
-                plan_xml = get_execution_plan(self.db_connection, sql)
-                stats_io, stats_time = get_query_statistics(self.db_connection, sql)
+                if self.measurement_broker is not None:
+                    plan_xml, stats_io, stats_time = self.measurement_broker.measure(sql)
+                elif self.use_actual_plan:
+                    plan_xml, stats_io, stats_time = get_plan_and_statistics(self.db_connection, sql)
+                else:
+                    plan_xml = get_execution_plan(self.db_connection, sql)
+                    stats_io, stats_time = get_query_statistics(self.db_connection, sql)
                 
                 if not plan_xml:
                     if self.verbose:
@@ -324,16 +344,8 @@ class QueryPlanDBEnvV4(gym.Env):
                     return observation, metrics
 
     def get_action_mask(self) -> np.ndarray:
-        """현재 쿼리에 호환되는 액션 마스크를 반환합니다."""
-        current_query_idx = self.original_indices[self.current_query_ix]
-        compatible_actions = self.compatibility_map[str(current_query_idx)]
-        
-        mask = np.zeros(len(self.actions), dtype=np.float32)
-        for i, action in enumerate(self.actions):
-            if action['name'] in compatible_actions:
-                mask[i] = 1.0
-        
-        return mask
+        """현재 쿼리에 호환되는 액션 마스크를 반환합니다 (컴파일된 행렬의 읽기 전용 행 view)."""
+        return self.action_mask_matrix[self.current_query_ix]
 
     def reset(self, seed=None, options=None):
         super().reset(seed=seed)
@@ -453,7 +465,8 @@ class QueryPlanDBEnvV4(gym.Env):
         return self.current_obs, reward, terminated, truncated, info
 
     def close(self):
-        if self.db_connection:
+        # 공유 측정기의 연결은 측정기가 닫음
+        if self.db_connection and self.measurement_broker is None:
             self.db_connection.close()
 
 
@@ -9,9 +9,7 @@ DQN v4: XGBoost 시뮬레이션 환경 (constants2.py 기반 30개 쿼리)
 
 import json
 import os
-import pickle
 import gymnasium as gym
-import joblib
 import numpy as np
 from gymnasium import spaces
 
@@ -25,23 +23,24 @@ rlqo_dir = os.path.abspath(os.path.join(current_dir, '..', '..'))
 sys.path.append(apollo_ml_dir)
 sys.path.append(rlqo_dir)
 
-from RLQO.DQN_v1.features.phase2_features import XGB_EXPECTED_FEATURES
+from RLQO.DQN_v1.features.phase2_features import extract_features, XGB_EXPECTED_FEATURES
+from RLQO.plan_cache import PlanCache, DEFAULT_CACHE_PATH, DEFAULT_SNAPSHOT_ID
+from RLQO.xgb_surrogate import XGBSurrogate, read_model_version
+from RLQO.action_masks import compile_compatibility_matrix
 from RLQO.DQN_v4.env.v4_reward import calculate_reward_v4
 
 
-def simulate_query_execution(xgb_model, current_features, action_features):
+def apply_action_features(current_features, action_features):
     """
-    XGB 모델을 사용하여 액션 적용 후 쿼리 실행 시간을 예측합니다.
+    액션으로 인한 특징 변화를 적용한 특징 벡터를 만듭니다.
     
     Args:
-        xgb_model: 학습된 XGBoost 모델
         current_features: 현재 상태의 특징 벡터 (79차원)
         action_features: 액션으로 인한 특징 변화
     
     Returns:
-        predicted_metrics: 예측된 실행 메트릭 (elapsed_time_ms, logical_reads, cpu_time_ms)
+        modified_features: 액션 적용 후 특징 벡터
     """
-    # 액션 적용 후 특징 벡터 생성
     modified_features = current_features.copy()
     
     # === 액션별 특징 수정 ===
@@ -73,22 +72,43 @@ def simulate_query_execution(xgb_model, current_features, action_features):
     if 'scan_type_table' in action_features:
         modified_features[6] = action_features['scan_type_table']
     
+    return modified_features
+
+
+def metrics_from_predicted_time(predicted_time: float) -> dict:
+    """예측 실행 시간으로 메트릭을 만듭니다."""
+    predicted_time = max(0.1, predicted_time)  # 0 이하 방지
+    
+    # 논리적 읽기와 CPU 시간 추정 (간단한 비례 관계 가정)
+    estimated_logical_reads = max(1, int(predicted_time * 10))
+    estimated_cpu_time = max(0.1, predicted_time * 0.7)
+    
+    return {
+        'elapsed_time_ms': predicted_time,
+        'logical_reads': estimated_logical_reads,
+        'cpu_time_ms': estimated_cpu_time
+    }
+
+
+def simulate_query_execution(xgb_model, current_features, action_features):
+    """
+    XGB 모델을 사용하여 액션 적용 후 쿼리 실행 시간을 예측합니다.
+    
+    Args:
+        xgb_model: 학습된 XGBoost 모델
+        current_features: 현재 상태의 특징 벡터 (79차원)
+        action_features: 액션으로 인한 특징 변화
+    
+    Returns:
+        predicted_metrics: 예측된 실행 메트릭 (elapsed_time_ms, logical_reads, cpu_time_ms)
+    """
+    # 액션 적용 후 특징 벡터 생성
+    modified_features = apply_action_features(current_features, action_features)
+    
     # 예측 실행
     try:
         predicted_time = xgb_model.predict([modified_features])[0]
-        predicted_time = max(0.1, predicted_time)  # 0 이하 방지
-        
-        # 논리적 읽기와 CPU 시간 추정 (간단한 비례 관계 가정)
-        estimated_logical_reads = max(1, int(predicted_time * 10))
-        estimated_cpu_time = max(0.1, predicted_time * 0.7)
-        
-        predicted_metrics = {
-            'elapsed_time_ms': predicted_time,
-            'logical_reads': estimated_logical_reads,
-            'cpu_time_ms': estimated_cpu_time
-        }
-        
-        return predicted_metrics
+        return metrics_from_predicted_time(predicted_time)
         
     except Exception as e:
         print(f"XGB 예측 실패: {e}")
@@ -166,7 +186,12 @@ class QueryPlanSimEnvV4(gym.Env):
                  compatibility_path='Apollo.ML/artifacts/RLQO/configs/v4_query_action_compatibility.json',
                  cache_path='Apollo.ML/artifacts/RLQO/cache/v4_plan_cache.pkl',
                  curriculum_mode=False,
-                 verbose=True):
+                 verbose=True,
+                 plan_cache_path=DEFAULT_CACHE_PATH,
+                 plan_cache_readonly=False,
+                 plan_cache_snapshot_id=DEFAULT_SNAPSHOT_ID,
+                 prediction_table=None,
+                 model_refresh=False):
         super().__init__()
         
         # 1. 액션 스페이스 로드
@@ -180,18 +205,25 @@ class QueryPlanSimEnvV4(gym.Env):
             self.compatibility_map = json.load(f)
         
         # 3. XGB 모델 로드
+        # model_refresh=True: 에피소드 시작마다 모델 버전을 확인해 증분 학습된 새 모델 적용
         model_path = os.path.join(apollo_ml_dir, 'artifacts/model.joblib')
+        self.model_path = model_path
+        self.model_refresh = model_refresh
+        import joblib
         self.xgb_model = joblib.load(model_path)
         
         # 4. 실행 계획 캐시 로드
+        # 공유 SQLite 캐시 사용, 기존 피클 캐시가 있으면 한 번 가져옴 (이미 있는 항목은 건너뜀)
+        # plan_cache_readonly=True: 병렬 환경 복사본용 (부모 프로세스가 캐시를 미리 채움)
+        # plan_cache_snapshot_id: 수집 스크립트의 --snapshot-id와 같은 DB 스냅샷 ID
+        self.plan_cache = PlanCache(plan_cache_path, snapshot_id=plan_cache_snapshot_id, readonly=plan_cache_readonly)
         cache_full_path = os.path.join(apollo_ml_dir, cache_path.replace('Apollo.ML/', ''))
-        if os.path.exists(cache_full_path):
-            with open(cache_full_path, 'rb') as f:
-                self.plan_cache = pickle.load(f)
-        else:
-            print(f"[WARN] 캐시 파일이 없습니다: {cache_full_path}")
-            print(f"[INFO] 캐시 없이 기본값으로 실행합니다.")
-            self.plan_cache = {}
+        if not plan_cache_readonly and os.path.exists(cache_full_path):
+            imported = self.plan_cache.import_pickle(cache_full_path)
+            if imported and verbose:
+                print(f"[INFO] 피클 캐시에서 {imported}개 항목을 가져왔습니다: {cache_full_path}")
+        elif len(self.plan_cache) == 0:
+            print(f"[WARN] 캐시가 비어 있습니다: {plan_cache_path}")
         
         # 5. Curriculum Learning 설정
         self.curriculum_mode = curriculum_mode
@@ -206,6 +238,11 @@ class QueryPlanSimEnvV4(gym.Env):
             self.query_list = query_list
             self.original_indices = list(range(len(query_list)))
         
+        # 호환성 맵을 (쿼리 × 액션) bool 행렬로 한 번만 컴파일
+        self.action_mask_matrix = compile_compatibility_matrix(
+            self.actions, self.compatibility_map, self.original_indices
+        )
+        
         # 6. 에피소드 변수
         self.current_query_ix = 0
         self.current_sql = ""
@@ -221,48 +258,77 @@ class QueryPlanSimEnvV4(gym.Env):
         self.observation_space = spaces.Box(
             low=-np.inf, high=np.inf, shape=(XGB_EXPECTED_FEATURES,), dtype=np.float32
         )
-
-    def get_action_mask(self) -> np.ndarray:
-        """현재 쿼리에 호환되는 액션 마스크를 반환합니다."""
-        current_query_idx = self.original_indices[self.current_query_ix]
-        compatible_actions = self.compatibility_map[str(current_query_idx)]
         
-        mask = np.zeros(len(self.actions), dtype=np.float32)
-        for i, action in enumerate(self.actions):
-            if action['name'] in compatible_actions:
-                mask[i] = 1.0
+        # 8. XGB 예측 조회 테이블 (모든 쿼리 × 호환 액션을 한 번에 배치 예측)
+        # prediction_table: 병렬 환경 복사본용 (부모 프로세스에서 계산한 테이블 공유)
+        self.surrogate = XGBSurrogate(self.xgb_model, verbose=verbose,
+                                      model_version=read_model_version(model_path))
+        if prediction_table is not None:
+            self.surrogate.load_table(prediction_table)
+        else:
+            self._precompute_predictions()
+
+    def _precompute_predictions(self):
+        """호환성 맵의 모든 (쿼리, 액션) 조합 예측값을 미리 계산합니다."""
+        keyed_features = {}
+        for query_pos, sql in enumerate(self.query_list):
+            try:
+                baseline_obs, _ = self._get_obs_from_cache(sql)
+            except KeyError:
+                continue  # 캐시에 없는 쿼리는 reset 시점에 오류로 드러남
+            
+            for action_id in np.flatnonzero(self.action_mask_matrix[query_pos]).tolist():
+                action = self.actions[action_id]
+                modified_features = apply_action_features(baseline_obs, map_action_to_features(action))
+                keyed_features[(sql, action_id)] = modified_features
         
-        return mask
+        if keyed_features:
+            self.surrogate.precompute(keyed_features)
+
+    def get_action_mask(self) -> np.ndarray:
+        """현재 쿼리에 호환되는 액션 마스크를 반환합니다 (컴파일된 행렬의 읽기 전용 행 view)."""
+        return self.action_mask_matrix[self.current_query_ix]
 
     def _get_obs_from_cache(self, sql: str) -> tuple[np.ndarray, dict]:
         """캐시에서 실행 계획과 메트릭을 가져옵니다."""
-        cache_key = sql.strip()
+        cached_data, is_fallback = self.plan_cache.get_with_fallback(sql)
         
-        if cache_key in self.plan_cache:
-            cached_data = self.plan_cache[cache_key]
-            observation = cached_data['observation']
-            metrics = cached_data['metrics'].copy()
-            
-            # 안전성을 위해 0 이하 값 방지
-            metrics['elapsed_time_ms'] = max(0.1, metrics['elapsed_time_ms'])
-            metrics['logical_reads'] = max(1, metrics['logical_reads'])
-            metrics['cpu_time_ms'] = max(0.1, metrics['cpu_time_ms'])
-            
-            return observation, metrics
-        else:
-            print(f"[WARN] 캐시에 없는 쿼리: {sql[:50]}...")
-            # 기본값 반환
-            observation = np.zeros(XGB_EXPECTED_FEATURES, dtype=np.float32)
-            metrics = {
-                'elapsed_time_ms': 100.0,
-                'logical_reads': 1000,
-                'cpu_time_ms': 70.0
-            }
-            return observation, metrics
+        if cached_data is None:
+            # 가짜 기본값 대신 명시적으로 실패 (수집 스크립트로 캐시를 채워야 함)
+            raise KeyError(f"캐시에 없는 쿼리 (베이스 쿼리도 없음): {sql[:80]}...")
+        
+        if is_fallback and self.verbose:
+            print(f"[WARN] 캐시에 없는 액션 조합 - 베이스 쿼리 실측값 사용: {sql[:50]}...")
+        
+        metrics = cached_data['metrics'].copy()
+        observation = cached_data['observation']
+        if observation is None:
+            if cached_data['plan_xml']:
+                observation = extract_features(cached_data['plan_xml'], metrics)
+            else:
+                observation = np.zeros(XGB_EXPECTED_FEATURES, dtype=np.float32)
+        
+        # 안전성을 위해 0 이하 값 방지
+        metrics['elapsed_time_ms'] = max(0.1, metrics['elapsed_time_ms'])
+        metrics['logical_reads'] = max(1, metrics['logical_reads'])
+        metrics['cpu_time_ms'] = max(0.1, metrics['cpu_time_ms'])
+        
+        return observation, metrics
+
+    def refresh_model(self) -> bool:
+        """증분 학습으로 모델 버전이 올라갔으면 새 모델로 예측 테이블을 다시 계산합니다."""
+        if not self.surrogate.reload_if_newer(self.model_path):
+            return False
+        self.xgb_model = self.surrogate.xgb_model
+        self._precompute_predictions()
+        return True
 
     def reset(self, seed=None, options=None):
         super().reset(seed=seed)
         
+        if self.model_refresh:
+            self.refresh_model()
+        
         # 다음 쿼리 선택
         self.current_sql = self.query_list[self.current_query_ix]
         self.current_query_ix = (self.current_query_ix + 1) % len(self.query_list)
@@ -332,13 +398,14 @@ class QueryPlanSimEnvV4(gym.Env):
         # 3. 액션을 특징 변화로 매핑
         action_features = map_action_to_features(action)
         
-        # 4. XGB 모델로 시뮬레이션 실행
+        # 4. XGB 예측 조회 (reset 이후 관찰값이 고정이므로 (쿼리, 액션)으로 결정됨)
         metrics_before = self.current_metrics.copy()
-        predicted_metrics = simulate_query_execution(
-            self.xgb_model, 
-            self.current_obs, 
-            action_features
-        )
+        surrogate_key = (self.current_sql, action_id)
+        modified_features = None
+        if surrogate_key not in self.surrogate:
+            modified_features = apply_action_features(self.current_obs, action_features)
+        predicted_time = self.surrogate.predict(surrogate_key, modified_features)
+        predicted_metrics = metrics_from_predicted_time(predicted_time)
         
         # 5. 보상 계산 (v4)
         reward = calculate_reward_v4(
@@ -375,7 +442,7 @@ class QueryPlanSimEnvV4(gym.Env):
         return self.current_obs, reward, terminated, truncated, info
 
     def close(self):
-        pass
+        self.plan_cache.close()
 
 
 if __name__ == '__main__':
@@ -30,6 +30,7 @@ sys.path.append(os.path.join(os.getcwd(), 'Apollo.ML', 'RLQO'))
 from RLQO.DQN_v4.env.v4_sim_env import QueryPlanSimEnvV4
 from RLQO.DQN_v4.env.v4_db_env import QueryPlanDBEnvV4
 from RLQO.constants2 import SAMPLE_QUERIES
+from RLQO.vec_env import make_sim_vec_env
 
 # ============================================================================
 # Phase SimulXGB: 시뮬레이션 학습 설정
@@ -121,12 +122,47 @@ class InvalidActionMaskingWrapper(gym.Env):
         return self.env.get_action_mask()
 
 
-def train_phase_simulxgb():
+def make_sim_env(**env_kwargs):
+    """시뮬레이션 환경 1개 생성 (Invalid Action Masking Wrapper 적용 전)"""
+    return QueryPlanSimEnvV4(
+        query_list=SAMPLE_QUERIES,
+        max_steps=10,
+        cache_path='Apollo.ML/artifacts/RLQO/cache/v4_plan_cache.pkl',  # v4 캐시 사용
+        curriculum_mode=True,  # 베이스라인 시간 기반 Curriculum Learning
+        verbose=False,  # 학습 중에는 출력 최소화
+        **env_kwargs
+    )
+
+
+def make_sim_vec_env_v4(n_envs: int):
+    """
+    시뮬레이션 환경 N개를 병렬로 생성합니다.
+    
+    부모 프로세스에서 캐시 준비와 XGB 배치 예측을 한 번만 하고,
+    각 복사본은 캐시를 읽기 전용으로 열고 예측 테이블을 공유합니다.
+    """
+    template_env = make_sim_env()
+    prediction_table = template_env.surrogate.export_table()
+    template_env.close()
+    
+    def env_fn(rank):
+        env = make_sim_env(plan_cache_readonly=True, prediction_table=prediction_table)
+        env = InvalidActionMaskingWrapper(env)
+        env = Monitor(env, os.path.join(SIM_LOG_DIR, str(rank)))
+        return env
+    
+    return make_sim_vec_env(env_fn, n_envs=n_envs)
+
+
+def train_phase_simulxgb(n_envs: int = 1):
     """
     Phase SimulXGB: 시뮬레이션 환경에서 기본 정책 학습
     - 빠른 학습 속도 (실제 DB의 100배 이상)
     - 액션 호환성 체크 및 마스킹
     - 200K 타임스텝: 약 6,000 에피소드 (30개 쿼리 기준)
+    
+    Args:
+        n_envs: 병렬 시뮬레이션 환경 수 (1보다 크면 SubprocVecEnv 사용)
     """
     print("=" * 80)
     print(" Phase SimulXGB: 시뮬레이션 학습 시작")
@@ -134,22 +170,23 @@ def train_phase_simulxgb():
     print(f"타임스텝: {SIM_TIMESTEPS:,}")
     print(f"예상 소요 시간: 1-2시간")
     print(f"쿼리 개수: {len(SAMPLE_QUERIES)} (constants2.py 기반)")
+    print(f"병렬 환경 수: {n_envs}")
     print("-" * 80)
     
     # 1. 시뮬레이션 환경 생성
     print("\n[1/4] 시뮬레이션 환경 생성 중...")
     try:
-        env = QueryPlanSimEnvV4(
-            query_list=SAMPLE_QUERIES,
-            max_steps=10,
-            cache_path='Apollo.ML/artifacts/RLQO/cache/v4_plan_cache.pkl',  # v4 캐시 사용
-            curriculum_mode=True,  # 베이스라인 시간 기반 Curriculum Learning
-            verbose=False  # 학습 중에는 출력 최소화
-        )
-        
-        # Invalid Action Masking Wrapper 적용
-        env = InvalidActionMaskingWrapper(env)
-        env = Monitor(env, SIM_LOG_DIR)
+        if n_envs > 1:
+            env = make_sim_vec_env_v4(n_envs)
+            # 평가는 학습 환경과 분리된 단일 환경에서 수행
+            eval_env = Monitor(InvalidActionMaskingWrapper(make_sim_env()), os.path.join(SIM_LOG_DIR, 'eval'))
+        else:
+            env = make_sim_env()
+            
+            # Invalid Action Masking Wrapper 적용
+            env = InvalidActionMaskingWrapper(env)
+            env = Monitor(env, SIM_LOG_DIR)
+            eval_env = env
         print("[OK] 환경 생성 완료")
     except Exception as e:
         print(f"[ERROR] 환경 생성 실패: {e}")
@@ -180,17 +217,18 @@ def train_phase_simulxgb():
     # 3. 콜백 설정
     print("\n[3/4] 콜백 설정 중...")
     try:
+        # 콜백 주기는 환경당 스텝 기준이므로 n_envs로 나눠 전체 스텝 기준 주기를 유지
         checkpoint_callback = CheckpointCallback(
-            save_freq=20_000,
+            save_freq=max(20_000 // n_envs, 1),
             save_path=SIM_CHECKPOINT_DIR,
             name_prefix="dqn_v4_sim"
         )
         
         eval_callback = EvalCallback(
-            env,
+            eval_env,
             best_model_save_path=SIM_CHECKPOINT_DIR,
             log_path=SIM_LOG_DIR,
-            eval_freq=10_000,
+            eval_freq=max(10_000 // n_envs, 1),
             deterministic=True,
             render=False
         )
@@ -374,6 +412,8 @@ def main():
                        help='학습 단계 선택')
     parser.add_argument('--skip-sim', action='store_true',
                        help='시뮬레이션 단계 건너뛰기 (RealDB만 실행)')
+    parser.add_argument('--n-envs', type=int, default=1,
+                       help='병렬 시뮬레이션 환경 수 (Simul 단계, 1보다 크면 SubprocVecEnv 사용)')
     parser.add_argument('--checkpoint', type=str, default=None,
                        help='이어서 훈련할 체크포인트 경로 (예: Apollo.ML/artifacts/RLQO/models/checkpoints/dqn_v4_real/dqn_v4_real_500_steps.zip)')
     
@@ -393,7 +433,7 @@ def main():
             print("[INFO] 시뮬레이션 단계를 건너뛰고 RealDB로 진행합니다.")
             model = train_phase_realdb_finetuning(checkpoint_path=args.checkpoint)
         else:
-            model = train_phase_simulxgb()
+            model = train_phase_simulxgb(n_envs=args.n_envs)
             if model:
                 print("\n[INFO] 시뮬레이션 학습 완료!")
                 print("[INFO] RealDB 단계를 실행하려면 다음 명령어를 사용하세요:")
@@ -10,8 +10,12 @@ constants2.py의 SAMPLE_QUERIES의 실행 계획을 미리 수집하여 캐싱
 실행 순서:
 1. 원본 쿼리 30개 실행 계획 수집
 2. 각 쿼리별 호환 액션만 적용 버전 실행 계획 수집
-3. pickle 파일로 저장
-4. 총 DB 접근: ~300번 이상 (약 3-4시간 소요 예상)
+3. pickle 파일 + 공유 SQLite 캐시(RLQO/plan_cache.py)에 저장 (이미 공유 캐시에 있는 조합은 재사용)
+4. 총 DB 접근: ~300번 이상 (순차 수집 시 약 3-4시간)
+
+수집은 RLQO/plan_collector.py의 워커 풀로 병렬 실행합니다.
+- --workers N: 동시 DB 연결 수 (기본 1: 기존처럼 순차 측정, 늘리면 병렬 수집)
+- 반복 실행마다 체크포인트 저장 → 중단되면 같은 명령으로 다시 실행해서 이어서 수집
 """
 
 import os
@@ -32,9 +36,12 @@ sys.path.append(rlqo_dir)
 
 from RLQO.constants2 import SAMPLE_QUERIES
 from RLQO.DQN_v4.env.v4_db_env import apply_action_to_sql
-from RLQO.DQN_v1.features.phase2_features import extract_features
-from db import connect, get_execution_plan, get_query_statistics
 from config import load_config
+from RLQO.plan_cache import PlanCache, DEFAULT_CACHE_PATH, DEFAULT_SNAPSHOT_ID
+from RLQO.plan_collector import ParallelPlanCollector
+
+# 공유 캐시에 기록할 수집 스크립트 이름
+CACHE_SOURCE = 'v4_collect_plans'
 
 
 def parse_statistics(stats_io: str, stats_time: str) -> dict:
@@ -76,77 +83,31 @@ def parse_statistics(stats_io: str, stats_time: str) -> dict:
     return metrics
 
 
-def collect_query_plan_with_median(conn, sql: str, num_runs: int = 5) -> dict:
-    """
-    쿼리를 여러 번 실행하여 중앙값을 계산합니다.
-    
-    Args:
-        conn: DB 연결
-        sql: 실행할 SQL
-        num_runs: 실행 횟수
-        
-    Returns:
-        중앙값 기반 메트릭과 실행 계획
-    """
-    all_metrics = []
-    plan_xml = None
-    
-    for run in range(num_runs):
-        try:
-            # 실행 계획 수집 (첫 번째 실행에서만)
-            if run == 0:
-                plan_xml = get_execution_plan(conn, sql)
-            
-            # 통계 수집
-            stats_io, stats_time = get_query_statistics(conn, sql)
-            metrics = parse_statistics(stats_io, stats_time)
-            
-            # 안전성을 위해 0 이하 값 방지
-            metrics['elapsed_time_ms'] = max(0.1, metrics['elapsed_time_ms'])
-            metrics['logical_reads'] = max(1, metrics['logical_reads'])
-            metrics['cpu_time_ms'] = max(0.1, metrics['cpu_time_ms'])
-            
-            all_metrics.append(metrics)
-            
-        except Exception as e:
-            print(f"    실행 {run+1} 실패: {e}")
-            continue
-    
-    if not all_metrics:
-        print(f"    모든 실행 실패!")
-        return None
-    
-    # 중앙값 계산
-    median_metrics = {}
-    for key in ['elapsed_time_ms', 'logical_reads', 'cpu_time_ms']:
-        values = [m[key] for m in all_metrics]
-        median_metrics[key] = np.median(values)
-    
-    # 실행 계획에서 특징 추출
-    if plan_xml:
-        try:
-            observation = extract_features(plan_xml, median_metrics)
-        except Exception as e:
-            print(f"    특징 추출 실패: {e}")
-            observation = np.zeros(79, dtype=np.float32)
-    else:
+def to_legacy_entry(entry: dict) -> dict:
+    """공유 캐시 항목을 기존 v4_plan_cache.pkl 형식으로 변환합니다."""
+    observation = entry['observation']
+    if observation is None:
         observation = np.zeros(79, dtype=np.float32)
-    
     return {
         'observation': observation,
-        'metrics': median_metrics,
-        'plan_xml': plan_xml,
-        'runs': len(all_metrics)
+        'metrics': entry['metrics'],
+        'plan_xml': entry['plan_xml'],
+        'runs': entry['runs'] or 0
     }
 
 
-def main():
-    """메인 실행 함수"""
+def main(workers: int = 1, snapshot_id: str = DEFAULT_SNAPSHOT_ID):
+    """
+    메인 실행 함수
+    
+    Args:
+        workers: 동시 DB 연결 수 (1이면 순차 측정)
+        snapshot_id: 공유 캐시의 DB 스냅샷 ID
+    """
     print("=== DQN v4 실행 계획 수집 시작 (constants2.py 기반 30개 쿼리) ===\n")
     
     # 1. 설정 로드
     config = load_config('Apollo.ML/config.yaml')
-    conn = connect(config.db)
     
     # 2. 액션 스페이스와 호환성 매핑 로드
     # v4는 v3의 액션 스페이스와 호환성 매핑을 재사용하되, 30개 쿼리를 위해 재생성 필요
@@ -159,35 +120,14 @@ def main():
     print(f"총 쿼리 수: {len(SAMPLE_QUERIES)}")
     print(f"총 액션 수: {len(actions)}")
     
-    # 3. 캐시 딕셔너리 초기화
-    plan_cache = {}
-    query_difficulties = {}
-    
-    # 4. 원본 쿼리 실행 계획 수집
-    print("\n[Step 1] 원본 쿼리 실행 계획 수집...")
+    # 3. 수집 작업 목록 생성 (원본 쿼리 + 호환 액션 적용 버전)
+    jobs = []
+    query_jobs = []  # (쿼리 번호, 액션 이름, SQL)
     for i, sql in enumerate(SAMPLE_QUERIES):
-        print(f"\n쿼리 {i} 수집 중...")
-        print(f"SQL: {sql[:100]}...")
+        jobs.append((f"Q{i} baseline", sql))
+        query_jobs.append((i, None, sql))
         
-        result = collect_query_plan_with_median(conn, sql, num_runs=5)
-        if result:
-            plan_cache[sql.strip()] = result
-            query_difficulties[i] = result['metrics']['elapsed_time_ms']
-            print(f"  완료: {result['metrics']['elapsed_time_ms']:.1f}ms, "
-                  f"{result['metrics']['logical_reads']} reads, "
-                  f"{result['runs']}회 실행")
-        else:
-            print(f"  실패!")
-    
-    # 5. 호환 액션 적용 버전 수집
-    print(f"\n[Step 2] 호환 액션 적용 버전 수집...")
-    total_combinations = 0
-    
-    for i, sql in enumerate(SAMPLE_QUERIES):
-        compatible_actions = compatibility_map[str(i)]
-        print(f"\n쿼리 {i}: {len(compatible_actions)}개 호환 액션")
-        
-        for action_name in compatible_actions:
+        for action_name in compatibility_map[str(i)]:
             # 액션 찾기
             action = None
             for a in actions:
@@ -201,22 +141,36 @@ def main():
             
             # 액션 적용된 SQL 생성
             modified_sql = apply_action_to_sql(sql, action)
-            cache_key = modified_sql.strip()
-            
-            if cache_key in plan_cache:
-                print(f"  {action_name}: 이미 캐시됨")
-                continue
-            
-            print(f"  {action_name} 수집 중...")
-            result = collect_query_plan_with_median(conn, modified_sql, num_runs=5)
-            
-            if result:
-                plan_cache[cache_key] = result
-                total_combinations += 1
-                print(f"    완료: {result['metrics']['elapsed_time_ms']:.1f}ms, "
-                      f"{result['metrics']['logical_reads']} reads")
-            else:
-                print(f"    실패!")
+            jobs.append((f"Q{i} {action_name}", modified_sql))
+            query_jobs.append((i, action_name, modified_sql))
+    
+    # 4. 병렬 수집 (공유 캐시에 체크포인트, 중단 후 재실행 시 이어서 수집)
+    print(f"\n[Step 1-2] 원본 + 호환 액션 적용 버전 수집 (워커 {workers}개)...")
+    shared_cache = PlanCache(DEFAULT_CACHE_PATH, snapshot_id=snapshot_id)
+    collector = ParallelPlanCollector(config.db, shared_cache, parse_statistics,
+                                      num_runs=5, workers=workers, source=CACHE_SOURCE)
+    results = collector.collect(jobs)
+    
+    # 5. 기존 피클 캐시 형식으로 정리
+    plan_cache = {}
+    query_difficulties = {}
+    total_combinations = 0
+    
+    for i, action_name, sql in query_jobs:
+        entry = results.get(sql)
+        if entry is None:
+            print(f"  쿼리 {i} {action_name or 'baseline'}: 실패!")
+            continue
+        
+        cache_key = sql.strip()
+        if cache_key in plan_cache:
+            continue
+        plan_cache[cache_key] = to_legacy_entry(entry)
+        
+        if action_name is None:
+            query_difficulties[i] = entry['metrics']['elapsed_time_ms']
+        else:
+            total_combinations += 1
     
     # 6. 결과 저장
     print(f"\n[Step 3] 결과 저장...")
@@ -248,9 +202,19 @@ def main():
     for i, (query_idx, difficulty) in enumerate(sorted_difficulties):
         print(f"{i+1}. 쿼리 {query_idx}: {difficulty:.1f}ms")
     
-    conn.close()
+    shared_cache.print_stats()
+    shared_cache.close()
     print(f"\n[SUCCESS] 모든 작업 완료!")
 
 
 if __name__ == "__main__":
-    main()
+    import argparse
+    
+    parser = argparse.ArgumentParser(description='DQN v4 실행 계획 수집')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='동시 DB 연결 수 (기본 1: 순차 측정, 늘리면 빠르지만 측정 간섭 증가)')
+    parser.add_argument('--snapshot-id', default=DEFAULT_SNAPSHOT_ID,
+                        help=f'공유 캐시의 DB 스냅샷 ID (기본값: RLQO_SNAPSHOT_ID 환경 변수 또는 default, 현재 {DEFAULT_SNAPSHOT_ID})')
+    args = parser.parse_args()
+    
+    main(workers=args.workers, snapshot_id=args.snapshot_id)
@@ -17,8 +17,9 @@ from typing import Dict, Any
 current_dir = os.path.dirname(os.path.abspath(__file__))
 rlqo_dir = os.path.abspath(os.path.join(current_dir, '..'))
 apollo_ml_dir = os.path.abspath(os.path.join(current_dir, '..', '..'))
-sys.path.insert(0, apollo_ml_dir)
-sys.path.insert(0, rlqo_dir)
+for path in (apollo_ml_dir, rlqo_dir):
+    if path not in sys.path:
+        sys.path.insert(0, path)
 
 from RLQO.DDPG_v1.config.action_decoder import ContinuousActionDecoder
 
@@ -6,10 +6,13 @@ Ensemble v2: Action Validator
 과거 실패 패턴을 학습하여 동일한 실패를 반복하지 않습니다.
 """
 
-from typing import Dict, Optional, Tuple
+from typing import TYPE_CHECKING, Dict, Optional, Sequence, Tuple
 import json
 import os
 
+if TYPE_CHECKING:
+    import numpy as np
+
 
 class ActionValidator:
     """
@@ -141,6 +144,71 @@ class ActionValidator:
         
         return filtered_predictions, filtered_confidences
     
+    def filter_unsafe_actions_batch(
+        self,
+        predictions: 'np.ndarray',
+        confidences: 'np.ndarray',
+        valid: 'np.ndarray',
+        query_infos: Sequence[Optional[Dict]]
+    ) -> Tuple['np.ndarray', 'np.ndarray']:
+        """
+        filter_unsafe_actions의 배치 버전 (쿼리 N개 × 모델 M개)
+        
+        Args:
+            predictions: (N, M) 액션 ID
+            confidences: (N, M) confidence
+            valid: (N, M) 검증 대상 여부 (threshold 통과)
+            query_infos: 길이 N 쿼리 정보 (비어 있으면 해당 쿼리는 검증 생략)
+        
+        Returns:
+            filtered_predictions: (N, M) 불안전한 액션이 NO_ACTION으로 바뀐 예측
+            filtered_confidences: (N, M) 불안전한 액션의 confidence × 0.3
+        """
+        import numpy as np
+
+        has_info = np.array([bool(info) for info in query_infos], dtype=bool)
+        checked = valid & has_info[:, None]
+        self.validation_stats['total_validations'] += int(checked.sum())
+        
+        query_types = [info.get('type', 'UNKNOWN') if info else 'UNKNOWN' for info in query_infos]
+        baseline_ms = np.array([info.get('baseline_ms', 0) if info else 0 for info in query_infos], dtype=float)
+        
+        # 규칙 1: Baseline < min_baseline → MAXDOP 계열 제외 (Baseline이 유효할 때만)
+        too_fast = (baseline_ms > 0) & (baseline_ms < self.min_baseline_for_maxdop)
+        maxdop_rejected = checked & too_fast[:, None] & np.isin(predictions, [0, 1, 2])
+        
+        # 규칙 4: 과거 실패율 > threshold → 제외 ((쿼리 타입, 액션) 조회 테이블)
+        failure_rejected = np.zeros_like(checked)
+        if self.enable_failure_tracking and self.failure_history:
+            type_names, type_index = np.unique(query_types, return_inverse=True)
+            n_actions = max(int(predictions.max()), max(action_id for _, action_id in self.failure_history)) + 1
+            high_failure = np.zeros((len(type_names), n_actions), dtype=bool)
+            for (query_type, action_id), history in self.failure_history.items():
+                if history['failure_rate'] > self.failure_rate_threshold and query_type in type_names:
+                    high_failure[np.searchsorted(type_names, query_type), action_id] = True
+            failure_rejected = checked & ~maxdop_rejected & high_failure[type_index[:, None], predictions]
+        
+        rejected = maxdop_rejected | failure_rejected
+        
+        # 거부 사유 통계 (거부된 항목만 순회)
+        for i, j in zip(*np.nonzero(rejected)):
+            action_id = int(predictions[i, j])
+            if maxdop_rejected[i, j]:
+                reason = f"Baseline too fast ({baseline_ms[i]:.1f}ms) for MAXDOP"
+            else:
+                failure_rate = self.failure_history[(query_types[i], action_id)]['failure_rate']
+                reason = f"High failure rate ({failure_rate:.1%}) for {query_types[i]} + Action {action_id}"
+            self._record_rejection(reason)
+            
+            if self.verbose:
+                print(f"[Validator] query {i}, model {j}: Action {action_id} rejected ({reason}), "
+                      f"replaced with NO_ACTION")
+        
+        # 불안전한 액션 → NO_ACTION으로 대체, Confidence 크게 감소
+        filtered_predictions = np.where(rejected, 18, predictions)
+        filtered_confidences = np.where(rejected, confidences * 0.3, confidences)
+        return filtered_predictions, filtered_confidences
+    
     def record_action_result(
         self,
         query_type: str,
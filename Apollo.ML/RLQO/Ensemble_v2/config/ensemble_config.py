@@ -20,6 +20,9 @@ MODEL_PATHS = {
     'sac_v1': os.path.join(ARTIFACTS_DIR, 'sac_v1_realdb_50k.zip'),
 }
 
+# 추론 전용 policy artifact (policy_artifacts.py로 내보냄, SB3 없이 로드)
+POLICY_ARTIFACTS_DIR = os.path.join(ARTIFACTS_DIR, 'inference')
+
 # 모델별 환경 타입 (각 모델이 사용하는 환경)
 MODEL_ENV_TYPES = {
     'dqn_v4': 'dqn_v4',  # QueryPlanDBEnvV4 (79-dim observation, 30 queries)
@@ -15,7 +15,7 @@ v2 주요 개선사항:
 import os
 import sys
 import numpy as np
-from typing import Dict, List, Tuple, Optional
+from typing import Dict, List, Tuple, Optional, Sequence
 
 # Path setup
 current_dir = os.path.dirname(os.path.abspath(__file__))
@@ -23,27 +23,32 @@ project_root = os.path.abspath(os.path.join(current_dir, '..', '..', '..'))
 apollo_ml_dir = os.path.join(project_root, 'Apollo.ML')
 rlqo_dir = os.path.join(apollo_ml_dir, 'RLQO')
 
-sys.path.insert(0, project_root)
-sys.path.insert(0, apollo_ml_dir)
-sys.path.insert(0, rlqo_dir)
-
-from stable_baselines3 import DQN, DDPG, SAC
-from sb3_contrib import MaskablePPO
+for path in (project_root, apollo_ml_dir, rlqo_dir):
+    if path not in sys.path:
+        sys.path.insert(0, path)
 
 from RLQO.Ensemble_v2.config.ensemble_config import (
-    MODEL_PATHS, MODEL_TYPES, PERFORMANCE_WEIGHTS,
-    QUERY_TYPE_WEIGHTS, CONFIDENCE_THRESHOLD,
+    MODEL_PATHS, MODEL_TYPES, PERFORMANCE_WEIGHTS, POLICY_ARTIFACTS_DIR,
+    QUERY_TYPE_WEIGHTS, CONFIDENCE_THRESHOLD, NO_ACTION_PENALTY,
     SAFETY_CONFIG, TOP_QUERY_CONFIG, ACTION_VALIDATOR_CONFIG
 )
 from RLQO.Ensemble_v2.voting_strategies import (
     majority_vote, weighted_vote, equal_weighted_vote,
-    performance_based_vote, query_type_based_vote, safety_first_vote
+    performance_based_vote, query_type_based_vote, safety_first_vote,
+    weighted_vote_batch, safety_first_vote_batch
 )
 from RLQO.Ensemble_v2.action_converter import ContinuousToDiscreteConverter
 from RLQO.Ensemble_v2.query_type_router import QueryTypeRouter
 from RLQO.Ensemble_v2.action_validator import ActionValidator
 from RLQO.Ensemble_v2.ppo_action_mapper import PPOToDQNActionMapper
 
+MODEL_LABELS = {
+    'dqn_v4': 'DQN v4',
+    'ppo_v3': 'PPO v3',
+    'ddpg_v1': 'DDPG v1',
+    'sac_v1': 'SAC v1',
+}
+
 
 class VotingEnsembleV2:
     """
@@ -60,6 +65,8 @@ class VotingEnsembleV2:
         confidence_threshold: float = CONFIDENCE_THRESHOLD,
         use_action_validator: bool = True,
         use_query_router: bool = True,
+        critic_confidence: bool = False,
+        policy_artifact_dir: Optional[str] = POLICY_ARTIFACTS_DIR,
         verbose: bool = True
     ):
         """
@@ -69,6 +76,8 @@ class VotingEnsembleV2:
             confidence_threshold: Confidence threshold
             use_action_validator: Action validator 사용 여부
             use_query_router: Query type router 사용 여부
+            critic_confidence: DDPG/SAC confidence를 critic Q값으로 계산 (기본값: 0.5 고정)
+            policy_artifact_dir: 추론 artifact 경로 (최신 artifact가 있으면 SB3 체크포인트 대신 로드, None이면 사용 안 함)
             verbose: 로깅 여부
         """
         self.model_paths = model_paths or MODEL_PATHS
@@ -76,6 +85,8 @@ class VotingEnsembleV2:
         self.confidence_threshold = confidence_threshold
         self.use_action_validator = use_action_validator
         self.use_query_router = use_query_router
+        self.critic_confidence = critic_confidence
+        self.policy_artifact_dir = policy_artifact_dir
         self.verbose = verbose
         
         self.models = {}
@@ -96,69 +107,42 @@ class VotingEnsembleV2:
         
         # 로드 성공 여부 추적
         self.loaded_models = []
+        self.inference = None
         
     def load_models(self):
-        """4개 모델을 로드합니다."""
+        """4개 모델을 로드합니다 (최신 추론 artifact가 있으면 SB3 체크포인트 대신 사용)."""
+        # torch는 모델을 로드할 때 import (router/validator만 쓰는 경우 로드하지 않음)
+        from RLQO.Ensemble_v2.fused_inference import FusedPolicyInference
+        from RLQO.Ensemble_v2.policy_artifacts import (
+            InferencePolicy, is_artifact_current, manifest_path, sb3_model_classes
+        )
+        
         if self.verbose:
             print("=" * 80)
             print("Loading Ensemble v2 Models")
             print("=" * 80)
         
-        # DQN v4
-        try:
-            if os.path.exists(self.model_paths['dqn_v4']):
-                self.models['dqn_v4'] = DQN.load(self.model_paths['dqn_v4'])
-                self.loaded_models.append('dqn_v4')
-                if self.verbose:
-                    print(f"[OK] DQN v4 loaded: {self.model_paths['dqn_v4']}")
-            else:
-                if self.verbose:
-                    print(f"[X] DQN v4 not found: {self.model_paths['dqn_v4']}")
-        except Exception as e:
-            if self.verbose:
-                print(f"[X] DQN v4 load failed: {e}")
-        
-        # PPO v3
-        try:
-            if os.path.exists(self.model_paths['ppo_v3']):
-                self.models['ppo_v3'] = MaskablePPO.load(self.model_paths['ppo_v3'])
-                self.loaded_models.append('ppo_v3')
-                if self.verbose:
-                    print(f"[OK] PPO v3 loaded: {self.model_paths['ppo_v3']}")
-            else:
-                if self.verbose:
-                    print(f"[X] PPO v3 not found: {self.model_paths['ppo_v3']}")
-        except Exception as e:
-            if self.verbose:
-                print(f"[X] PPO v3 load failed: {e}")
-        
-        # DDPG v1
-        try:
-            if os.path.exists(self.model_paths['ddpg_v1']):
-                self.models['ddpg_v1'] = DDPG.load(self.model_paths['ddpg_v1'])
-                self.loaded_models.append('ddpg_v1')
-                if self.verbose:
-                    print(f"[OK] DDPG v1 loaded: {self.model_paths['ddpg_v1']}")
-            else:
-                if self.verbose:
-                    print(f"[X] DDPG v1 not found: {self.model_paths['ddpg_v1']}")
-        except Exception as e:
-            if self.verbose:
-                print(f"[X] DDPG v1 load failed: {e}")
-        
-        # SAC v1
-        try:
-            if os.path.exists(self.model_paths['sac_v1']):
-                self.models['sac_v1'] = SAC.load(self.model_paths['sac_v1'])
-                self.loaded_models.append('sac_v1')
+        for model_name, label in MODEL_LABELS.items():
+            model_path = self.model_paths[model_name]
+            try:
+                if self.policy_artifact_dir and is_artifact_current(model_name, model_path, self.policy_artifact_dir):
+                    # 추론 head만 로드 (torch만 필요)
+                    self.models[model_name] = InferencePolicy.load(model_name, self.policy_artifact_dir)
+                    source = manifest_path(model_name, self.policy_artifact_dir)
+                elif os.path.exists(model_path):
+                    self.models[model_name] = sb3_model_classes()[model_name].load(model_path)
+                    source = model_path
+                else:
+                    if self.verbose:
+                        print(f"[X] {label} not found: {model_path}")
+                    continue
+                
+                self.loaded_models.append(model_name)
                 if self.verbose:
-                    print(f"[OK] SAC v1 loaded: {self.model_paths['sac_v1']}")
-            else:
+                    print(f"[OK] {label} loaded: {source}")
+            except Exception as e:
                 if self.verbose:
-                    print(f"[X] SAC v1 not found: {self.model_paths['sac_v1']}")
-        except Exception as e:
-            if self.verbose:
-                print(f"[X] SAC v1 load failed: {e}")
+                    print(f"[X] {label} load failed: {e}")
         
         if self.verbose:
             print("=" * 80)
@@ -167,6 +151,9 @@ class VotingEnsembleV2:
         
         if len(self.loaded_models) == 0:
             raise RuntimeError("No models loaded successfully!")
+        
+        # 모델당 forward 1회로 액션 + confidence 계산
+        self.inference = FusedPolicyInference(self.models, critic_confidence=self.critic_confidence)
     
     def predict_with_multi_env(
         self,
@@ -197,43 +184,25 @@ class VotingEnsembleV2:
                 continue
             
             try:
-                model = self.models[model_name]
                 model_type = self.model_types[model_name]
                 observation = observations[model_name]
                 action_mask = action_masks.get(model_name, None)
                 
+                # 액션 + Confidence (모델당 forward 1회)
+                action, confidence = self.inference.infer(model_name, observation, action_mask)
+                
                 if model_type == 'discrete':
-                    # DQN, PPO: discrete action
-                    if model_name == 'ppo_v3' and action_mask is not None:
-                        action, _ = model.predict(observation, action_masks=action_mask, deterministic=True)
-                    else:
-                        action, _ = model.predict(observation, deterministic=True)
-                    
-                    # Confidence 계산
-                    confidence = self._get_discrete_confidence(model, observation, action, model_name, action_mask)
-                    
                     # v2: PPO v3의 44개 액션을 DQN v4의 19개 액션으로 매핑
                     if model_name == 'ppo_v3':
-                        original_action = int(action)
-                        mapped_action = self.ppo_action_mapper.convert(original_action)
-                        predictions[model_name] = mapped_action
+                        predictions[model_name] = self.ppo_action_mapper.convert(int(action))
                     else:
                         predictions[model_name] = int(action)
-                    
-                    confidences[model_name] = confidence
                 
                 elif model_type == 'continuous':
                     # DDPG, SAC: continuous action → discrete action으로 변환 (v2 개선)
-                    action, _ = model.predict(observation, deterministic=True)
-                    
-                    # v2: 개선된 변환 로직 사용
-                    discrete_action = self.action_converter.convert(action)
-                    
-                    # Confidence 계산
-                    confidence = self._get_continuous_confidence(model, observation, action, model_name)
-                    
-                    predictions[model_name] = discrete_action
-                    confidences[model_name] = confidence
+                    predictions[model_name] = self.action_converter.convert(action)
+                
+                confidences[model_name] = confidence
                     
             except Exception as e:
                 if self.verbose:
@@ -316,34 +285,20 @@ class VotingEnsembleV2:
         # 1. 각 모델로부터 예측 수집
         for model_name in self.loaded_models:
             try:
-                model = self.models[model_name]
                 model_type = self.model_types[model_name]
                 
+                # 액션 + Confidence (모델당 forward 1회)
+                action, confidence = self.inference.infer(model_name, observation, action_mask)
+                
                 if model_type == 'discrete':
                     # DQN, PPO: discrete action
-                    if model_name == 'ppo_v3' and action_mask is not None:
-                        action, _ = model.predict(observation, action_masks=action_mask, deterministic=True)
-                    else:
-                        action, _ = model.predict(observation, deterministic=True)
-                    
-                    # Confidence 계산
-                    confidence = self._get_discrete_confidence(model, observation, action, model_name, action_mask)
-                    
                     predictions[model_name] = int(action)
-                    confidences[model_name] = confidence
                 
                 elif model_type == 'continuous':
                     # DDPG, SAC: continuous action → discrete action으로 변환 (v2 개선)
-                    action, _ = model.predict(observation, deterministic=True)
-                    
-                    # v2: 개선된 변환 로직 사용
-                    discrete_action = self.action_converter.convert(action)
-                    
-                    # Confidence 계산
-                    confidence = self._get_continuous_confidence(model, observation, action, model_name)
-                    
-                    predictions[model_name] = discrete_action
-                    confidences[model_name] = confidence
+                    predictions[model_name] = self.action_converter.convert(action)
+                
+                confidences[model_name] = confidence
                     
             except Exception as e:
                 if self.verbose:
@@ -400,81 +355,109 @@ class VotingEnsembleV2:
         
         return final_action, info
     
-    def _get_discrete_confidence(
+    def predict_batch(
         self,
-        model,
-        observation: np.ndarray,
-        action: int,
-        model_name: str,
-        action_mask: Optional[np.ndarray] = None
-    ) -> float:
-        """Discrete 모델의 confidence 계산"""
-        try:
-            if model_name == 'dqn_v4':
-                # DQN: Q-value 기반
-                q_values = model.q_net(model.policy.obs_to_tensor(observation)[0])
-                q_values = q_values.detach().cpu().numpy().flatten()
-                max_q = np.max(q_values)
-                selected_q = q_values[action]
-                # Normalized confidence
-                confidence = selected_q / (max_q + 1e-8)
-                return float(np.clip(confidence, 0, 1))
-            
-            elif model_name == 'ppo_v3':
-                # PPO: Policy probability 기반
-                obs_tensor = model.policy.obs_to_tensor(observation)[0]
-                distribution = model.policy.get_distribution(obs_tensor)
-                log_prob = distribution.distribution.logits.detach().cpu().numpy().flatten()
+        observations_by_model: Dict[str, np.ndarray],
+        masks_by_model: Optional[Dict[str, Optional[np.ndarray]]] = None,
+        query_types: Optional[Sequence[str]] = None,
+        query_infos: Optional[Sequence[Optional[Dict]]] = None
+    ) -> Tuple[np.ndarray, Dict]:
+        """
+        배치 Ensemble 예측: 쿼리 N개를 한 번에 처리 (쿼리마다 predict_with_multi_env를 호출한 것과 같은 결과)
+        
+        모델마다 observation을 쌓아 forward 1회로 예측하고,
+        threshold / Action Validator / Router / 투표는 (N, 모델 수) 배열 연산으로 적용합니다.
+        
+        Args:
+            observations_by_model: {model_name: (N, obs_dim) observation}
+            masks_by_model: {model_name: (N, n_actions) action mask} (PPO용)
+            query_types: 길이 N 쿼리 타입 (None이면 모두 'DEFAULT')
+            query_infos: 길이 N 쿼리 정보 (Action Validator용, None이면 검증 생략)
+        
+        Returns:
+            final_actions: (N,) 최종 선택된 액션
+            info: 상세 정보 (model_names 순서의 (N, 모델 수) 배열)
+        """
+        masks_by_model = masks_by_model or {}
+        model_names = [name for name in self.loaded_models if name in observations_by_model]
+        
+        if model_names:
+            n_queries = len(observations_by_model[model_names[0]])
+        else:
+            n_queries = len(query_types) if query_types is not None else 0
+        query_types = list(query_types) if query_types is not None else ['DEFAULT'] * n_queries
+        
+        predictions = np.full((n_queries, len(model_names)), 18, dtype=int)
+        confidences = np.zeros((n_queries, len(model_names)))
+        predicted = np.zeros((n_queries, len(model_names)), dtype=bool)
+        
+        # 1. 모델별로 배치 예측 (모델당 forward 1회)
+        for j, model_name in enumerate(model_names):
+            try:
+                actions, model_confidences = self.inference.infer_batch(
+                    model_name, np.asarray(observations_by_model[model_name]), masks_by_model.get(model_name)
+                )
                 
-                # Apply action mask if available
-                if action_mask is not None:
-                    log_prob = np.where(action_mask, log_prob, -np.inf)
+                if self.model_types[model_name] == 'discrete':
+                    # v2: PPO v3의 44개 액션을 DQN v4의 19개 액션으로 매핑
+                    if model_name == 'ppo_v3':
+                        predictions[:, j] = [self.ppo_action_mapper.convert(int(a)) for a in actions]
+                    else:
+                        predictions[:, j] = actions
+                else:
+                    # DDPG, SAC: continuous action → discrete action으로 변환
+                    predictions[:, j] = [self.action_converter.convert(a) for a in actions]
                 
-                # Softmax to get probabilities
-                exp_log_prob = np.exp(log_prob - np.max(log_prob))
-                probs = exp_log_prob / np.sum(exp_log_prob)
+                confidences[:, j] = model_confidences
+                predicted[:, j] = True
                 
-                confidence = probs[action]
-                return float(np.clip(confidence, 0, 1))
-            
-            else:
-                return 0.5  # Default confidence
+            except Exception as e:
+                if self.verbose:
+                    print(f"[WARN] {model_name} batch prediction failed: {e}")
+                continue
         
-        except Exception as e:
-            if self.verbose:
-                print(f"[WARN] Confidence calculation failed for {model_name}: {e}")
-            return 0.5
-    
-    def _get_continuous_confidence(
-        self,
-        model,
-        observation: np.ndarray,
-        action: np.ndarray,
-        model_name: str
-    ) -> float:
-        """Continuous 모델의 confidence 계산"""
-        try:
-            # DDPG, SAC: Q-value 기반 (Critic network)
-            obs_tensor = model.policy.obs_to_tensor(observation)[0]
-            action_tensor = model.policy.actor.action_to_tensor(action)
-            
-            # Q-value 계산
-            if hasattr(model.policy, 'critic'):
-                q_value = model.policy.critic(obs_tensor, action_tensor)
-            else:
-                # SAC는 여러 critic이 있을 수 있음
-                q_value = model.policy.critic_target(obs_tensor, action_tensor)[0]
-            
-            q_value = q_value.detach().cpu().numpy().flatten()[0]
+        # 2. Confidence threshold 적용
+        valid = predicted & (confidences >= self.confidence_threshold)
+        filtered_predictions = predictions
+        filtered_confidences = confidences
+        
+        if n_queries > 0:
+            # 3. Action Validator 적용
+            if self.use_action_validator and self.action_validator and query_infos is not None:
+                filtered_predictions, filtered_confidences = self.action_validator.filter_unsafe_actions_batch(
+                    filtered_predictions, filtered_confidences, valid, query_infos
+                )
             
-            # Q-value를 0~1 범위로 정규화 (시그모이드 사용)
-            confidence = 1.0 / (1.0 + np.exp(-q_value / 10.0))
-            return float(np.clip(confidence, 0, 1))
-        
-        except Exception as e:
-            if self.verbose:
-                print(f"[WARN] Confidence calculation failed for {model_name}: {e}")
-            return 0.5
+            # 4. Query Type Router 적용
+            if self.use_query_router and self.query_router:
+                filtered_predictions, filtered_confidences = self.query_router.filter_actions_batch(
+                    query_types, filtered_predictions, filtered_confidences, valid
+                )
+                
+                # TOP 쿼리에 대해 NO_ACTION boost
+                filtered_confidences = self.query_router.boost_no_action_batch(
+                    query_types, filtered_predictions, filtered_confidences, valid
+                )
+        
+        # 5. 투표 전략에 따라 최종 액션 선택 (threshold 통과 모델이 없으면 NO_ACTION)
+        final_actions = self._apply_voting_strategy_batch(
+            model_names, filtered_predictions, filtered_confidences, valid, query_types
+        )
+        
+        # 6. 상세 정보 반환
+        info = {
+            'model_names': model_names,
+            'predictions': predictions,
+            'confidences': confidences,
+            'filtered_mask': valid,
+            'filtered_predictions': filtered_predictions,
+            'filtered_confidences': filtered_confidences,
+            'final_actions': final_actions,
+            'voting_strategy': self.voting_strategy,
+            'query_types': query_types,
+        }
+        
+        return final_actions, info
     
     def _apply_voting_strategy(
         self,
@@ -489,10 +472,6 @@ class VotingEnsembleV2:
         
         elif self.voting_strategy == 'weighted':
             # v2 개선: Performance + Query Type + NO_ACTION 페널티 적용
-            from RLQO.Ensemble_v2.config.ensemble_config import (
-                PERFORMANCE_WEIGHTS, QUERY_TYPE_WEIGHTS, NO_ACTION_PENALTY
-            )
-            
             type_weights = QUERY_TYPE_WEIGHTS.get(query_type, QUERY_TYPE_WEIGHTS['DEFAULT'])
             model_type_weights = {k: type_weights.get(k, 0.25) for k in predictions.keys()}
             
@@ -534,6 +513,54 @@ class VotingEnsembleV2:
                 disagreement_threshold=SAFETY_CONFIG['disagreement_threshold']
             )
     
+    def _apply_voting_strategy_batch(
+        self,
+        model_names: List[str],
+        predictions: np.ndarray,
+        confidences: np.ndarray,
+        valid: np.ndarray,
+        query_types: List[str]
+    ) -> np.ndarray:
+        """투표 전략 적용 (배치, _apply_voting_strategy와 같은 규칙)"""
+        
+        def type_weight_matrix():
+            rows = {}
+            for query_type in set(query_types):
+                type_weights = QUERY_TYPE_WEIGHTS.get(query_type, QUERY_TYPE_WEIGHTS['DEFAULT'])
+                rows[query_type] = [type_weights.get(k, 0.25) for k in model_names]
+            return np.array([rows[query_type] for query_type in query_types]).reshape(len(query_types), len(model_names))
+        
+        ones = np.ones_like(confidences)
+        
+        if self.voting_strategy in ('majority', 'equal'):
+            return weighted_vote_batch(predictions, ones, valid)
+        
+        elif self.voting_strategy == 'weighted':
+            perf_weights = np.array([PERFORMANCE_WEIGHTS.get(k, 1.0) for k in model_names])
+            return weighted_vote_batch(
+                predictions,
+                confidences * perf_weights * type_weight_matrix(),
+                valid,
+                no_action_penalty=NO_ACTION_PENALTY
+            )
+        
+        elif self.voting_strategy == 'performance':
+            perf_weights = np.array([self.performance_weights.get(k, 1.0) for k in model_names])
+            return weighted_vote_batch(predictions, ones * perf_weights, valid)
+        
+        elif self.voting_strategy == 'query_type':
+            return weighted_vote_batch(predictions, type_weight_matrix(), valid)
+        
+        else:
+            # safety_first (Default)
+            return safety_first_vote_batch(
+                predictions,
+                confidences,
+                valid,
+                safety_threshold=SAFETY_CONFIG['avg_confidence_threshold'],
+                disagreement_threshold=SAFETY_CONFIG['disagreement_threshold']
+            )
+    
     def record_action_result(self, query_type: str, action_id: int, speedup: float):
         """액션 실행 결과를 기록 (Action Validator가 학습에 사용)"""
         if self.action_validator:
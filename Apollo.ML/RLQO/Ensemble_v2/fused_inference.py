@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+"""
+Ensemble v2: Fused Inference
+
+모델마다 observation을 한 번만 텐서로 바꾸고, 네트워크를 한 번만 실행해
+같은 출력에서 액션과 confidence를 함께 구합니다.
+
+기존: model.predict() (forward 1회) + confidence 계산 (텐서 변환 + forward 1회 더)
+개선: torch.no_grad() 안에서 모델당 forward 1회
+- DQN: q_net 출력 → argmax 액션 + 선택 Q / 최대 Q
+- PPO: get_distribution 로짓 → (마스크 적용) argmax 액션 + softmax 확률
+- DDPG/SAC: actor 출력 → 액션 (critic_confidence=True면 같은 액션 텐서로 critic 1회)
+
+infer_batch는 여러 observation을 쌓아 모델당 forward 1회로 처리합니다 (오프라인 재채점용).
+
+모델은 SB3 모델이나 policy_artifacts.InferencePolicy(내보낸 artifact) 모두 가능하며
+model.predict(deterministic=True)와 같은 액션을 반환합니다.
+"""
+
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import torch as th
+
+from RLQO.Ensemble_v2.policy_artifacts import InferencePolicy
+
+
+# critic을 쓰지 않을 때 연속 모델 confidence
+# (기존 critic 계산은 SB3에 없는 actor.action_to_tensor를 호출해 항상 이 값으로 대체됐음)
+DEFAULT_CONTINUOUS_CONFIDENCE = 0.5
+
+
+class FusedPolicyInference:
+    """모델당 forward 1회로 (액션, confidence)를 계산하는 추론기"""
+
+    def __init__(self, models: Dict, critic_confidence: bool = False):
+        """
+        Args:
+            models: {model_name: SB3 모델 또는 InferencePolicy}
+            critic_confidence: True면 DDPG/SAC confidence를 critic Q값(시그모이드)으로 계산
+        """
+        self.policies = {
+            model_name: model if isinstance(model, InferencePolicy) else InferencePolicy.from_sb3(model)
+            for model_name, model in models.items()
+        }
+        self.critic_confidence = critic_confidence
+
+    def infer(
+        self,
+        model_name: str,
+        observation: np.ndarray,
+        action_mask: Optional[np.ndarray] = None
+    ) -> Tuple[np.ndarray, float]:
+        """
+        Returns:
+            action: discrete면 정수 액션, continuous면 환경 스케일의 액션 벡터
+            confidence: 0~1
+        """
+        actions, confidences = self.infer_batch(model_name, observation, action_mask)
+        action = actions[0] if self.policies[model_name].head_kind == 'actor' else int(actions[0])
+        return action, float(confidences[0])
+
+    def infer_batch(
+        self,
+        model_name: str,
+        observations: np.ndarray,
+        action_masks: Optional[np.ndarray] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        observation 여러 개를 한 번의 forward로 처리합니다.
+
+        Args:
+            observations: (N, obs_dim) 또는 단일 observation (obs_dim,)
+            action_masks: (N, n_actions) 또는 (n_actions,), PPO만 사용
+
+        Returns:
+            actions: discrete면 (N,) 정수, continuous면 (N, action_dim)
+            confidences: (N,) 0~1
+        """
+        policy = self.policies[model_name]
+
+        with th.no_grad():
+            obs_tensor = policy.obs_to_tensor(observations)
+            output = policy.head(obs_tensor)
+
+            if policy.head_kind == 'q_values':
+                return self._infer_q_values(output.cpu().numpy())
+            if policy.head_kind == 'logits':
+                return self._infer_logits(output.cpu().numpy(), action_masks)
+            return self._infer_continuous(policy, obs_tensor, output)
+
+    def _infer_q_values(self, q_values: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """DQN: Q값 argmax, confidence = 선택 Q / 최대 Q"""
+        actions = np.argmax(q_values, axis=1)
+        max_q = np.max(q_values, axis=1)
+        selected_q = np.take_along_axis(q_values, actions[:, None], axis=1)[:, 0]
+        confidences = selected_q / (max_q + 1e-8)
+        return actions, np.clip(confidences, 0, 1)
+
+    def _infer_logits(self, log_prob: np.ndarray, action_masks: Optional[np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+        """PPO: (마스크 적용) 로짓 argmax, confidence = softmax 확률"""
+        # Apply action mask if available
+        if action_masks is not None:
+            log_prob = np.where(np.asarray(action_masks, dtype=bool).reshape(log_prob.shape), log_prob, -np.inf)
+
+        actions = np.argmax(log_prob, axis=1)
+
+        # Softmax to get probabilities
+        exp_log_prob = np.exp(log_prob - np.max(log_prob, axis=1, keepdims=True))
+        probs = exp_log_prob / np.sum(exp_log_prob, axis=1, keepdims=True)
+        confidences = np.take_along_axis(probs, actions[:, None], axis=1)[:, 0]
+        return actions, np.clip(confidences, 0, 1)
+
+    def _infer_continuous(self, policy: InferencePolicy, obs_tensor, scaled_actions) -> Tuple[np.ndarray, np.ndarray]:
+        """DDPG/SAC: actor 출력 → 환경 스케일 액션 (model.predict와 같은 후처리)"""
+        n = scaled_actions.shape[0]
+
+        confidences = np.full(n, DEFAULT_CONTINUOUS_CONFIDENCE)
+        if self.critic_confidence and policy.critic is not None:
+            q_values = policy.critic(obs_tensor, scaled_actions).cpu().numpy().reshape(n, -1)[:, 0]
+            # Q-value를 0~1 범위로 정규화 (시그모이드 사용)
+            confidences = np.clip(1.0 / (1.0 + np.exp(-q_values / 10.0)), 0, 1)
+
+        return policy.to_env_action(scaled_actions.cpu().numpy()), confidences
@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+"""
+Ensemble v2: Measurement Broker
+
+앙상블 평가에서 4개 환경(DQN v4, PPO v3, DDPG v1, SAC v1)이 공유하는 측정 서비스.
+하나의 DB 연결로 에피소드당 (쿼리, 액션) SQL을 한 번만 실행하고,
+그 결과(plan XML + STATISTICS IO/TIME)를 각 환경에 넘겨줍니다.
+
+각 환경은 받은 측정값을 자기 방식으로 관측값으로 변환합니다 (observation adapter):
+- DQN v4: parse_statistics + extract_features → 79차원
+- PPO v3 / DDPG v1 / SAC v1: ActionableStateEncoderV3 → 18차원
+"""
+
+import os
+import sys
+from typing import Dict, Optional, Tuple
+
+# Path setup
+current_dir = os.path.dirname(os.path.abspath(__file__))
+apollo_ml_dir = os.path.abspath(os.path.join(current_dir, '..', '..'))
+sys.path.insert(0, apollo_ml_dir)
+
+from config import load_config
+from db import connect, get_execution_plan, get_query_statistics, get_plan_and_statistics
+
+
+class MeasurementBroker:
+    """
+    에피소드 단위 측정 캐시를 가진 공유 DB 측정기
+
+    사용법:
+        broker = MeasurementBroker()
+        env = QueryPlanDBEnvV4(..., measurement_broker=broker)
+        for episode in ...:
+            broker.begin_episode()
+            env.reset()   # 첫 환경만 실제로 실행, 나머지는 캐시 사용
+    """
+
+    def __init__(self, conn=None, use_actual_plan: bool = False, verbose: bool = False):
+        """
+        Args:
+            conn: 공유할 pyodbc 연결 (None이면 config.yaml로 새로 연결)
+            use_actual_plan: True면 SET STATISTICS XML로 계획과 통계를 1회 실행으로 측정
+            verbose: 측정/캐시 로그 출력 여부
+        """
+        if conn is None:
+            config = load_config(os.path.join(apollo_ml_dir, 'config.yaml'))
+            conn = connect(config.db, max_retries=3, retry_delay=5)
+        self.conn = conn
+        self.use_actual_plan = use_actual_plan
+        self.verbose = verbose
+
+        # sql → {'plan_xml', 'stats_io', 'stats_time'} (에피소드 단위로 초기화)
+        self._episode_cache: Dict[str, Dict] = {}
+
+        self.stats = {
+            'episodes': 0,
+            'executions': 0,
+            'plan_requests': 0,
+            'cache_hits': 0,
+        }
+
+    def begin_episode(self):
+        """새 에피소드 시작 - 이전 에피소드의 측정값을 버립니다."""
+        self._episode_cache.clear()
+        self.stats['episodes'] += 1
+
+    def measure(self, sql: str, with_plan: bool = True) -> Tuple[Optional[str], str, str]:
+        """
+        SQL을 (에피소드당 한 번) 실행하고 (plan_xml, stats_io, stats_time)을 반환합니다.
+
+        Args:
+            sql: 실행할 SQL (액션 적용 후)
+            with_plan: 실행 계획이 필요한지 여부 (DDPG/SAC는 통계만 사용)
+        """
+        key = sql.strip()
+        entry = self._episode_cache.get(key)
+
+        if entry is None:
+            if self.use_actual_plan:
+                plan_xml, stats_io, stats_time = get_plan_and_statistics(self.conn, sql)
+            else:
+                plan_xml = get_execution_plan(self.conn, sql) if with_plan else None
+                stats_io, stats_time = get_query_statistics(self.conn, sql)
+                if with_plan:
+                    self.stats['plan_requests'] += 1
+            entry = {'plan_xml': plan_xml, 'stats_io': stats_io, 'stats_time': stats_time}
+            self._episode_cache[key] = entry
+            self.stats['executions'] += 1
+            if self.verbose:
+                print(f"[BROKER] Executed: {key[:80]}...")
+        else:
+            self.stats['cache_hits'] += 1
+            if with_plan and entry['plan_xml'] is None and not self.use_actual_plan:
+                # 통계만 측정된 SQL에 계획이 필요해진 경우 계획만 추가로 가져옴
+                entry['plan_xml'] = get_execution_plan(self.conn, sql)
+                self.stats['plan_requests'] += 1
+
+        return entry['plan_xml'], entry['stats_io'], entry['stats_time']
+
+    def print_stats(self):
+        """측정 통계 출력"""
+        total = self.stats['executions'] + self.stats['cache_hits']
+        hit_rate = self.stats['cache_hits'] / total if total > 0 else 0.0
+        print("\n[BROKER] Measurement Statistics")
+        print(f"  Episodes: {self.stats['episodes']}")
+        print(f"  DB executions: {self.stats['executions']}")
+        print(f"  Plan requests: {self.stats['plan_requests']}")
+        print(f"  Cache hits: {self.stats['cache_hits']} ({hit_rate:.1%})")
+
+    def close(self):
+        """공유 DB 연결 종료"""
+        if self.conn:
+            self.conn.close()
+            self.conn = None
@@ -0,0 +1,323 @@
+# -*- coding: utf-8 -*-
+"""
+Ensemble v2: Policy Artifacts
+
+SB3 체크포인트(zip)에서 추론에 필요한 네트워크만 TorchScript로 내보내고,
+stable_baselines3 / sb3_contrib 없이 torch만으로 다시 불러옵니다.
+
+체크포인트 로드는 optimizer 상태, replay buffer 설정, SB3 학습 스택 전체를 불러오지만
+앙상블 추론에는 모델당 작은 MLP 하나(+ 선택적으로 critic)만 필요합니다.
+
+artifacts/RLQO/models/inference/
+  {model_name}.pt          추론 head (TorchScript)
+  {model_name}_critic.pt   DDPG/SAC critic Q1 (TorchScript, critic confidence용)
+  {model_name}.json        manifest (head 종류, observation/action space, 원본 체크포인트 정보)
+
+head 종류:
+- q_values: DQN (obs → Q값)
+- logits: MaskablePPO (obs → 액션 로짓, 마스크 미적용)
+- actor: DDPG/SAC (obs → [-1, 1] 범위 액션, squash_output이면 action space로 unscale)
+
+사용법:
+    python policy_artifacts.py                       # MODEL_PATHS의 4개 모델 내보내기
+    python policy_artifacts.py --models dqn_v4 ppo_v3
+"""
+
+import argparse
+import json
+import os
+import sys
+from datetime import datetime
+from typing import Dict, Optional
+
+import numpy as np
+import torch as th
+from torch import nn
+
+# Path setup
+current_dir = os.path.dirname(os.path.abspath(__file__))
+apollo_ml_dir = os.path.abspath(os.path.join(current_dir, '..', '..'))
+sys.path.insert(0, apollo_ml_dir)
+
+from RLQO.Ensemble_v2.config.ensemble_config import MODEL_PATHS, POLICY_ARTIFACTS_DIR
+
+MANIFEST_VERSION = 1
+
+
+class _QValueHead(nn.Module):
+    """DQN: obs → Q값"""
+
+    def __init__(self, policy):
+        super().__init__()
+        self.q_net = policy.q_net
+
+    def forward(self, obs: th.Tensor) -> th.Tensor:
+        return self.q_net(obs)
+
+
+class _LogitsHead(nn.Module):
+    """MaskablePPO: obs → 액션 로짓 (get_distribution과 같은 경로)"""
+
+    def __init__(self, policy):
+        super().__init__()
+        self.policy = policy
+
+    def forward(self, obs: th.Tensor) -> th.Tensor:
+        features = self.policy.extract_features(obs, self.policy.pi_features_extractor)
+        latent_pi = self.policy.mlp_extractor.forward_actor(features)
+        return self.policy.action_net(latent_pi)
+
+
+class _ActorHead(nn.Module):
+    """DDPG/SAC: obs → 결정적 액션 ([-1, 1])"""
+
+    def __init__(self, policy):
+        super().__init__()
+        self.actor = policy.actor
+        # SAC actor는 (평균, log_std)를 내고 결정적 액션은 tanh(평균)
+        self.gaussian = hasattr(self.actor, 'get_action_dist_params')
+        if getattr(self.actor, 'use_sde', False):
+            raise ValueError("gSDE actor는 내보내기를 지원하지 않습니다")
+
+    def forward(self, obs: th.Tensor) -> th.Tensor:
+        if self.gaussian:
+            mean_actions, _, _ = self.actor.get_action_dist_params(obs)
+            return th.tanh(mean_actions)
+        return self.actor(obs)
+
+
+class _CriticHead(nn.Module):
+    """DDPG/SAC: (obs, action) → 첫 번째 critic의 Q값"""
+
+    def __init__(self, policy):
+        super().__init__()
+        self.critic = policy.critic
+
+    def forward(self, obs: th.Tensor, actions: th.Tensor) -> th.Tensor:
+        return self.critic.q1_forward(obs, actions)
+
+
+def _head_kind(policy) -> str:
+    """SB3 policy 구조로 head 종류 판별"""
+    if hasattr(policy, 'q_net'):
+        return 'q_values'
+    if hasattr(policy, 'mlp_extractor'):
+        return 'logits'
+    if hasattr(policy, 'actor'):
+        return 'actor'
+    raise ValueError(f"지원하지 않는 policy: {type(policy).__name__}")
+
+
+def _action_space_spec(action_space) -> Dict:
+    if hasattr(action_space, 'n'):
+        return {'type': 'discrete', 'n': int(action_space.n)}
+    return {
+        'type': 'box',
+        'shape': list(action_space.shape),
+        'low': np.asarray(action_space.low, dtype=float).tolist(),
+        'high': np.asarray(action_space.high, dtype=float).tolist(),
+    }
+
+
+class InferencePolicy:
+    """
+    추론 전용 policy (head 네트워크 + observation/action space 정보)
+
+    SB3 모델을 감싸거나(from_sb3) 내보낸 artifact에서 불러옵니다(load).
+    어느 쪽이든 FusedPolicyInference가 같은 방식으로 사용합니다.
+    """
+
+    def __init__(
+        self,
+        head: nn.Module,
+        head_kind: str,
+        observation_shape,
+        action_space: Dict,
+        squash_output: bool = False,
+        critic: Optional[nn.Module] = None
+    ):
+        self.head = head
+        self.head_kind = head_kind
+        self.observation_shape = tuple(observation_shape)
+        self.action_space = action_space
+        self.squash_output = squash_output
+        self.critic = critic
+
+        if action_space['type'] == 'box':
+            self.action_shape = tuple(action_space['shape'])
+            self.action_low = np.asarray(action_space['low'], dtype=np.float32).reshape(self.action_shape)
+            self.action_high = np.asarray(action_space['high'], dtype=np.float32).reshape(self.action_shape)
+
+    @classmethod
+    def from_sb3(cls, model) -> 'InferencePolicy':
+        """로드된 SB3 모델을 감쌉니다 (네트워크는 공유, 복사하지 않음)."""
+        policy = model.policy
+        policy.set_training_mode(False)
+
+        head_kind = _head_kind(policy)
+        head = {'q_values': _QValueHead, 'logits': _LogitsHead, 'actor': _ActorHead}[head_kind](policy)
+        critic = _CriticHead(policy) if head_kind == 'actor' else None
+        return cls(
+            head.eval(), head_kind,
+            observation_shape=policy.observation_space.shape,
+            action_space=_action_space_spec(policy.action_space),
+            squash_output=bool(getattr(policy, 'squash_output', False)),
+            critic=critic.eval() if critic is not None else None,
+        )
+
+    @classmethod
+    def load(cls, model_name: str, artifact_dir: str = POLICY_ARTIFACTS_DIR) -> 'InferencePolicy':
+        """export_policy로 내보낸 artifact를 불러옵니다 (torch만 필요)."""
+        manifest = read_manifest(model_name, artifact_dir)
+        files = manifest['files']
+        head = th.jit.load(os.path.join(artifact_dir, files['head']), map_location='cpu')
+        critic = None
+        if files.get('critic'):
+            critic = th.jit.load(os.path.join(artifact_dir, files['critic']), map_location='cpu')
+        return cls(
+            head.eval(), manifest['head'],
+            observation_shape=manifest['observation_shape'],
+            action_space=manifest['action_space'],
+            squash_output=manifest['squash_output'],
+            critic=critic.eval() if critic is not None else None,
+        )
+
+    def obs_to_tensor(self, observations: np.ndarray) -> th.Tensor:
+        """단일 observation 또는 (N, ...) 배치 → (N, ...) float 텐서"""
+        observations = np.asarray(observations, dtype=np.float32).reshape((-1, *self.observation_shape))
+        return th.as_tensor(observations)
+
+    def to_env_action(self, scaled_actions: np.ndarray) -> np.ndarray:
+        """actor 출력 → action space 스케일 (SB3 predict와 같은 후처리)"""
+        actions = scaled_actions.reshape((-1, *self.action_shape))
+        if self.squash_output:
+            return self.action_low + 0.5 * (actions + 1.0) * (self.action_high - self.action_low)
+        return np.clip(actions, self.action_low, self.action_high)
+
+
+def manifest_path(model_name: str, artifact_dir: str = POLICY_ARTIFACTS_DIR) -> str:
+    return os.path.join(artifact_dir, f"{model_name}.json")
+
+
+def read_manifest(model_name: str, artifact_dir: str = POLICY_ARTIFACTS_DIR) -> Optional[Dict]:
+    """manifest를 읽습니다 (없으면 None)."""
+    path = manifest_path(model_name, artifact_dir)
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def is_artifact_current(model_name: str, source_path: str, artifact_dir: str = POLICY_ARTIFACTS_DIR) -> bool:
+    """
+    artifact가 있고 원본 체크포인트보다 오래되지 않았는지 확인
+    (manifest가 깨졌거나 source_mtime이 null/잘못된 값이면 오래된 것으로 보고 False)
+    """
+    try:
+        manifest = read_manifest(model_name, artifact_dir)
+        if manifest is None or manifest.get('version') != MANIFEST_VERSION:
+            return False
+        source_mtime = float(manifest.get('source_mtime') or 0)
+        if os.path.exists(source_path) and os.path.getmtime(source_path) > source_mtime:
+            return False
+    except (OSError, TypeError, ValueError, AttributeError):
+        return False
+    return True
+
+
+def export_policy(model, model_name: str, artifact_dir: str = POLICY_ARTIFACTS_DIR,
+                  source_path: Optional[str] = None) -> Dict:
+    """
+    SB3 모델의 추론 네트워크를 TorchScript + manifest로 내보냅니다.
+
+    Returns:
+        manifest dict
+    """
+    os.makedirs(artifact_dir, exist_ok=True)
+    policy = InferencePolicy.from_sb3(model)
+    example_obs = th.zeros((1, *policy.observation_shape), dtype=th.float32)
+
+    files = {'head': f"{model_name}.pt"}
+    with th.no_grad():
+        traced_head = th.jit.trace(policy.head, example_obs)
+        th.jit.save(traced_head, os.path.join(artifact_dir, files['head']))
+
+        if policy.critic is not None:
+            example_action = policy.head(example_obs)
+            traced_critic = th.jit.trace(policy.critic, (example_obs, example_action))
+            files['critic'] = f"{model_name}_critic.pt"
+            th.jit.save(traced_critic, os.path.join(artifact_dir, files['critic']))
+
+    manifest = {
+        'version': MANIFEST_VERSION,
+        'model_name': model_name,
+        'algorithm': type(model).__name__,
+        'head': policy.head_kind,
+        'files': files,
+        'observation_shape': list(policy.observation_shape),
+        'action_space': policy.action_space,
+        'squash_output': policy.squash_output,
+        'source_checkpoint': source_path,
+        'source_mtime': os.path.getmtime(source_path) if source_path and os.path.exists(source_path) else None,
+        'exported_at': datetime.now().isoformat(),
+        'torch_version': th.__version__,
+    }
+    with open(manifest_path(model_name, artifact_dir), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+    return manifest
+
+
+def check_export(model, model_name: str, artifact_dir: str = POLICY_ARTIFACTS_DIR, n_samples: int = 64) -> float:
+    """내보낸 head와 원본 모델의 출력 차이(최대 절대 오차)"""
+    live = InferencePolicy.from_sb3(model)
+    loaded = InferencePolicy.load(model_name, artifact_dir)
+    space = model.policy.observation_space
+    obs = np.stack([space.sample() for _ in range(n_samples)])
+    with th.no_grad():
+        expected = live.head(live.obs_to_tensor(obs)).numpy()
+        actual = loaded.head(loaded.obs_to_tensor(obs)).numpy()
+    return float(np.max(np.abs(expected - actual)))
+
+
+# SB3 모델 클래스 (체크포인트를 읽을 때만 import)
+def sb3_model_classes():
+    from stable_baselines3 import DQN, DDPG, SAC
+    from sb3_contrib import MaskablePPO
+    return {'dqn_v4': DQN, 'ppo_v3': MaskablePPO, 'ddpg_v1': DDPG, 'sac_v1': SAC}
+
+
+def main():
+    """메인 실행 함수"""
+    parser = argparse.ArgumentParser(description="Ensemble v2 추론용 policy artifact 내보내기")
+    parser.add_argument('--models', nargs='+', default=list(MODEL_PATHS.keys()),
+                        help='내보낼 모델 (기본값: 전체)')
+    parser.add_argument('--output-dir', default=POLICY_ARTIFACTS_DIR,
+                        help=f'artifact 저장 경로 (기본값: {POLICY_ARTIFACTS_DIR})')
+    args = parser.parse_args()
+
+    loaders = sb3_model_classes()
+    print("=" * 80)
+    print("Exporting Ensemble v2 Policy Artifacts")
+    print("=" * 80)
+
+    for model_name in args.models:
+        source_path = MODEL_PATHS[model_name]
+        if not os.path.exists(source_path):
+            print(f"[X] {model_name} not found: {source_path}")
+            continue
+        try:
+            model = loaders[model_name].load(source_path, device='cpu')
+            manifest = export_policy(model, model_name, args.output_dir, source_path=source_path)
+            max_error = check_export(model, model_name, args.output_dir)
+            files = ', '.join(manifest['files'].values())
+            print(f"[OK] {model_name} ({manifest['algorithm']}, {manifest['head']}): {files} "
+                  f"(max abs error {max_error:.2e})")
+        except Exception as e:
+            print(f"[X] {model_name} export failed: {e}")
+
+    print("=" * 80)
+    print(f"Saved to: {args.output_dir}")
+
+
+if __name__ == '__main__':
+    main()
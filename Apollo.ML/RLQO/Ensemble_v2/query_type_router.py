@@ -6,9 +6,12 @@ Ensemble v2: Query Type Router
 특히 TOP 쿼리 성능 개선에 초점을 맞춥니다.
 """
 
-from typing import Dict, List, Optional
+from typing import TYPE_CHECKING, Dict, List, Optional, Sequence, Tuple
 from collections import Counter
 
+if TYPE_CHECKING:
+    import numpy as np
+
 
 class QueryTypeRouter:
     """
@@ -175,6 +178,80 @@ class QueryTypeRouter:
         
         return boosted
     
+    def filter_actions_batch(
+        self,
+        query_types: Sequence[str],
+        predictions: 'np.ndarray',
+        confidences: 'np.ndarray',
+        valid: 'np.ndarray'
+    ) -> Tuple['np.ndarray', 'np.ndarray']:
+        """
+        filter_actions_for_query의 배치 버전 (쿼리 N개 × 모델 M개)
+        
+        Args:
+            query_types: 길이 N 쿼리 타입
+            predictions: (N, M) 액션 ID
+            confidences: (N, M) confidence
+            valid: (N, M) 필터링 대상 여부
+        
+        Returns:
+            filtered_predictions, filtered_confidences: (N, M)
+        """
+        self.filter_stats['total_calls'] += len(query_types)
+        for query_type, count in Counter(query_types).items():
+            self.filter_stats['filtered_by_type'][query_type] = \
+                self.filter_stats['filtered_by_type'].get(query_type, 0) + count
+        
+        # v2: 필터링 비활성화 (PPO action space 불일치 문제)
+        if not self.enable_filtering:
+            return predictions, confidences
+        
+        import numpy as np
+        
+        # 쿼리 타입별 허용 액션 테이블
+        type_names, type_index = np.unique(list(query_types), return_inverse=True)
+        n_actions = max(int(predictions.max()) + 1, len(self.allowed_actions['DEFAULT']))
+        allowed_table = np.zeros((len(type_names), n_actions), dtype=bool)
+        for t, query_type in enumerate(type_names):
+            allowed = self.allowed_actions.get(query_type, self.allowed_actions['DEFAULT'])
+            if query_type == 'TOP':
+                allowed = self._apply_top_query_rules({}, allowed)
+            allowed_table[t, allowed] = True
+        
+        blocked = valid & ~allowed_table[type_index[:, None], predictions]
+        
+        # 통계
+        for action_id, count in zip(*np.unique(predictions[blocked], return_counts=True)):
+            self.filter_stats['actions_blocked'][int(action_id)] = \
+                self.filter_stats['actions_blocked'].get(int(action_id), 0) + int(count)
+        
+        # 허용되지 않은 액션 → NO_ACTION으로 대체, Confidence 감소
+        filtered_predictions = np.where(blocked, 18, predictions)
+        filtered_confidences = np.where(blocked, confidences * 0.5, confidences)
+        return filtered_predictions, filtered_confidences
+    
+    def boost_no_action_batch(
+        self,
+        query_types: Sequence[str],
+        predictions: 'np.ndarray',
+        confidences: 'np.ndarray',
+        valid: 'np.ndarray'
+    ) -> 'np.ndarray':
+        """
+        boost_no_action_for_top의 배치 버전: TOP 쿼리의 NO_ACTION confidence를 1.5배 증폭
+        
+        Returns:
+            boosted_confidences: (N, M)
+        """
+        if not self.top_query_rules['boost_no_action']:
+            return confidences
+        
+        import numpy as np
+
+        is_top = np.array([query_type == 'TOP' for query_type in query_types], dtype=bool)
+        boost = valid & is_top[:, None] & (predictions == 18)
+        return np.where(boost, np.minimum(confidences * 1.5, 1.0), confidences)
+    
     def get_query_type_from_sql(self, sql: str) -> str:
         """
         SQL 쿼리로부터 쿼리 타입 추론
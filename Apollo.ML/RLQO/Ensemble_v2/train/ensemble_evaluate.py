@@ -16,7 +16,6 @@ import os
 import sys
 import json
 import numpy as np
-import pandas as pd
 from datetime import datetime
 from collections import defaultdict
 from typing import Dict, List
@@ -28,19 +27,17 @@ rlqo_dir = os.path.abspath(os.path.join(current_dir, '..', '..'))
 apollo_ml_dir = os.path.abspath(os.path.join(current_dir, '..', '..', '..'))
 project_root = os.path.abspath(os.path.join(apollo_ml_dir, '..'))
 
-sys.path.insert(0, project_root)
-sys.path.insert(0, apollo_ml_dir)
-sys.path.insert(0, rlqo_dir)
-sys.path.append(ensemble_dir)
+for path in (project_root, apollo_ml_dir, rlqo_dir):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+if ensemble_dir not in sys.path:
+    sys.path.append(ensemble_dir)
 
 from RLQO.constants2 import SAMPLE_QUERIES
 from RLQO.PPO_v3.config.query_action_mapping_v3 import QUERY_TYPES
 from RLQO.Ensemble_v2.config.ensemble_config import EVAL_CONFIG, OUTPUT_FILES, MODEL_PATHS
 from RLQO.Ensemble_v2.ensemble_voting import VotingEnsembleV2
-
-from stable_baselines3 import DQN, DDPG, SAC
-from sb3_contrib import MaskablePPO
-from sb3_contrib.common.wrappers import ActionMasker
+from RLQO.Ensemble_v2.measurement_broker import MeasurementBroker
 
 
 def evaluate_ensemble_v2(
@@ -85,6 +82,9 @@ def evaluate_ensemble_v2(
     queries = SAMPLE_QUERIES[:n_queries]
     envs = {}
     
+    # 공유 측정기: 4개 환경이 하나의 DB 연결로 에피소드당 baseline을 한 번만 측정
+    broker = MeasurementBroker()
+    
     # DQN v4 환경
     if 'dqn_v4' in ensemble.loaded_models:
         from RLQO.DQN_v4.env.v4_db_env import QueryPlanDBEnvV4
@@ -92,18 +92,21 @@ def evaluate_ensemble_v2(
             query_list=queries,
             max_steps=1,
             curriculum_mode=False,
-            verbose=False
+            verbose=False,
+            measurement_broker=broker
         )
         print("  [OK] DQN v4 environment loaded")
     
     # PPO v3 환경
     if 'ppo_v3' in ensemble.loaded_models:
         from RLQO.PPO_v3.env.v3_db_env import QueryPlanDBEnvPPOv3
+        from sb3_contrib.common.wrappers import ActionMasker
         ppo_env = QueryPlanDBEnvPPOv3(
             query_list=queries,
             max_steps=1,
             curriculum_mode=False,
-            verbose=False
+            verbose=False,
+            measurement_broker=broker
         )
         
         def mask_fn(env_instance):
@@ -119,7 +122,8 @@ def evaluate_ensemble_v2(
         envs['ddpg_v1'] = QueryPlanRealDBEnvDDPGv1(
             query_list=queries,
             max_steps=1,
-            verbose=False
+            verbose=False,
+            measurement_broker=broker
         )
         print("  [OK] DDPG v1 environment loaded")
     
@@ -129,7 +133,8 @@ def evaluate_ensemble_v2(
         envs['sac_v1'] = make_sac_db_env(
             query_list=queries,
             max_steps=1,
-            verbose=False
+            verbose=False,
+            measurement_broker=broker
         )
         print("  [OK] SAC v1 environment loaded")
     
@@ -149,6 +154,8 @@ def evaluate_ensemble_v2(
         print(f"\n--- Query {query_idx} ({query_type}) ---")
         
         for episode in range(n_episodes):
+            broker.begin_episode()
+            
             # 각 환경 reset (query_idx 설정)
             observations = {}
             action_masks = {}
@@ -323,10 +330,12 @@ def evaluate_ensemble_v2(
     
     # Ensemble 통계 출력
     ensemble.print_stats()
+    broker.print_stats()
     
     # 환경 정리
     for env in envs.values():
         env.close()
+    broker.close()
     
     print("\n[SUCCESS] Evaluation completed!")
     
@@ -21,22 +21,24 @@ rlqo_dir = os.path.abspath(os.path.join(current_dir, '..', '..'))
 apollo_ml_dir = os.path.abspath(os.path.join(current_dir, '..', '..', '..'))
 project_root = os.path.abspath(os.path.join(apollo_ml_dir, '..'))
 
-sys.path.insert(0, project_root)
-sys.path.insert(0, apollo_ml_dir)
-sys.path.insert(0, rlqo_dir)
-sys.path.append(ensemble_dir)
+for path in (project_root, apollo_ml_dir, rlqo_dir):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+if ensemble_dir not in sys.path:
+    sys.path.append(ensemble_dir)
 
 from RLQO.constants2 import SAMPLE_QUERIES
 from RLQO.PPO_v3.config.query_action_mapping_v3 import QUERY_TYPES
 from RLQO.Ensemble_v2.config.ensemble_config import MODEL_PATHS
-
-from stable_baselines3 import DQN, DDPG, SAC
-from sb3_contrib import MaskablePPO
-from sb3_contrib.common.wrappers import ActionMasker
+from RLQO.Ensemble_v2.measurement_broker import MeasurementBroker
 
 
 def oracle_ensemble_evaluate():
     """Oracle Ensemble 평가 (기존 코드 기반)"""
+    # SB3는 평가를 실행할 때만 로드 (import만으로 torch를 올리지 않음)
+    from stable_baselines3 import DQN, DDPG, SAC
+    from sb3_contrib import MaskablePPO
+    from sb3_contrib.common.wrappers import ActionMasker
     
     n_queries = 30
     n_episodes = 10
@@ -46,7 +48,7 @@ def oracle_ensemble_evaluate():
     print("=" * 80)
     print(f"Queries: {n_queries}")
     print(f"Episodes per query: {n_episodes}")
-    print(f"Total executions: {n_queries * n_episodes * 4} (모든 모델 실행)")
+    print(f"Total executions: {n_queries * n_episodes * 4} (모든 모델 실행, baseline은 에피소드당 1회)")
     print(f"Timestamp: {datetime.now().isoformat()}")
     print("=" * 80 + "\n")
     
@@ -89,6 +91,9 @@ def oracle_ensemble_evaluate():
     queries = SAMPLE_QUERIES[:n_queries]
     envs = {}
     
+    # 공유 측정기: 4개 환경이 하나의 DB 연결로 에피소드당 baseline을 한 번만 측정
+    broker = MeasurementBroker()
+    
     # DQN v4
     try:
         from RLQO.DQN_v4.env.v4_db_env import QueryPlanDBEnvV4
@@ -96,7 +101,8 @@ def oracle_ensemble_evaluate():
             query_list=queries,
             max_steps=1,
             curriculum_mode=False,
-            verbose=False
+            verbose=False,
+            measurement_broker=broker
         )
         print("  [OK] DQN v4 environment")
     except Exception as e:
@@ -109,7 +115,8 @@ def oracle_ensemble_evaluate():
             query_list=queries,
             max_steps=1,
             curriculum_mode=False,
-            verbose=False
+            verbose=False,
+            measurement_broker=broker
         )
         def mask_fn(env_instance):
             return env_instance.get_action_mask().astype(bool)
@@ -124,7 +131,8 @@ def oracle_ensemble_evaluate():
         envs['ddpg_v1'] = QueryPlanRealDBEnvDDPGv1(
             query_list=queries,
             max_steps=1,
-            verbose=False
+            verbose=False,
+            measurement_broker=broker
         )
         print("  [OK] DDPG v1 environment")
     except Exception as e:
@@ -136,7 +144,8 @@ def oracle_ensemble_evaluate():
         envs['sac_v1'] = make_sac_db_env(
             query_list=queries,
             max_steps=1,
-            verbose=False
+            verbose=False,
+            measurement_broker=broker
         )
         print("  [OK] SAC v1 environment")
     except Exception as e:
@@ -160,6 +169,7 @@ def oracle_ensemble_evaluate():
         model_performances = defaultdict(list)  # {model_name: [speedups]}
         
         for episode in range(n_episodes):
+            broker.begin_episode()
             episode_speedups = {}  # {model_name: speedup}
             baseline_ms = 0
             
@@ -348,9 +358,12 @@ def oracle_ensemble_evaluate():
         summary = next(s for s in query_summaries if s['query_idx'] == query_idx)
         print(f"  Query {query_idx:2d}: {model_name:8s} ({summary['best_model_avg']:.3f}x)")
     
+    broker.print_stats()
+    
     # 환경 정리
     for env in envs.values():
         env.close()
+    broker.close()
     
     print("\n[SUCCESS] Oracle Ensemble evaluation completed!")
     
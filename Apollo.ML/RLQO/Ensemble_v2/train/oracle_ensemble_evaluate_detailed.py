@@ -24,20 +24,17 @@ rlqo_dir = os.path.abspath(os.path.join(current_dir, '..', '..'))
 apollo_ml_dir = os.path.abspath(os.path.join(current_dir, '..', '..', '..'))
 project_root = os.path.abspath(os.path.join(apollo_ml_dir, '..'))
 
-sys.path.insert(0, project_root)
-sys.path.insert(0, apollo_ml_dir)
-sys.path.insert(0, rlqo_dir)
-sys.path.append(ensemble_dir)
+for path in (project_root, apollo_ml_dir, rlqo_dir):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+if ensemble_dir not in sys.path:
+    sys.path.append(ensemble_dir)
 
 from RLQO.constants2 import SAMPLE_QUERIES
 from RLQO.PPO_v3.config.query_action_mapping_v3 import QUERY_TYPES
 from RLQO.Ensemble_v2.config.ensemble_config import MODEL_PATHS
 from RLQO.DQN_v4.env.v4_db_env import apply_action_to_sql
 
-from stable_baselines3 import DQN, DDPG, SAC
-from sb3_contrib import MaskablePPO
-from sb3_contrib.common.wrappers import ActionMasker
-
 from db import connect
 from config import load_config
 from collections import Counter
@@ -58,6 +55,10 @@ def extract_query_name(query_str: str) -> str:
 
 def oracle_ensemble_evaluate_detailed():
     """Oracle Ensemble 상세 평가 (DB 메트릭 포함)"""
+    # SB3는 평가를 실행할 때만 로드 (import만으로 torch를 올리지 않음)
+    from stable_baselines3 import DQN, DDPG, SAC
+    from sb3_contrib import MaskablePPO
+    from sb3_contrib.common.wrappers import ActionMasker
     
     n_queries = 30
     n_episodes = 10
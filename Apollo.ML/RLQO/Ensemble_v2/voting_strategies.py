@@ -192,6 +192,75 @@ def safety_first_vote(
     return weighted_vote(predictions, confidences)
 
 
+def weighted_vote_batch(
+    predictions: np.ndarray,
+    weights: np.ndarray,
+    valid: np.ndarray,
+    no_action_penalty: float = 1.0
+) -> np.ndarray:
+    """
+    weighted_vote의 배치 버전 (쿼리 N개 × 모델 M개)
+    
+    Args:
+        predictions: (N, M) 모델별 액션
+        weights: (N, M) 모델별 가중치 (confidence × performance × query type)
+        valid: (N, M) 투표 참여 여부
+        no_action_penalty: NO_ACTION(18번)에 적용할 페널티
+    
+    Returns:
+        actions: (N,) 투표 결과 (참여 모델이 없으면 NO_ACTION)
+    """
+    if predictions.size == 0:
+        return np.full(len(predictions), 18)  # NO_ACTION
+    
+    weights = np.where(valid, weights, 0.0)
+    weights = np.where(predictions == 18, weights * no_action_penalty, weights)
+    
+    # 각 모델 위치에 그 모델이 고른 액션의 가중치 합
+    same_action = (predictions[:, :, None] == predictions[:, None, :]) & valid[:, None, :]
+    action_weights = np.einsum('nmk,nk->nm', same_action.astype(float), weights)
+    action_weights = np.where(valid, action_weights, -np.inf)
+    
+    # 동률이면 먼저 나온 모델의 액션 (weighted_vote의 dict 순서와 동일)
+    best = np.argmax(action_weights, axis=1)
+    actions = predictions[np.arange(len(predictions)), best]
+    return np.where(valid.any(axis=1), actions, 18)
+
+
+def safety_first_vote_batch(
+    predictions: np.ndarray,
+    confidences: np.ndarray,
+    valid: np.ndarray,
+    safety_threshold: float = 0.2,
+    disagreement_threshold: float = 0.1
+) -> np.ndarray:
+    """
+    safety_first_vote의 배치 버전 (쿼리 N개 × 모델 M개)
+    
+    Args:
+        predictions: (N, M) 모델별 액션
+        confidences: (N, M) 모델별 confidence
+        valid: (N, M) 투표 참여 여부
+    
+    Returns:
+        actions: (N,) 투표 결과
+    """
+    n_valid = valid.sum(axis=1)
+    safe_n = np.maximum(n_valid, 1)
+    
+    # 1. 평균 confidence 체크
+    avg_conf = np.where(valid, confidences, 0.0).sum(axis=1) / safe_n
+    
+    # 2. Disagreement 체크 (최다 득표 액션의 비율)
+    same_action = (predictions[:, :, None] == predictions[:, None, :]) & valid[:, None, :] & valid[:, :, None]
+    agreement_rate = same_action.sum(axis=2).max(axis=1) / safe_n
+    
+    # 3. 안전성 조건을 통과하면 Weighted vote
+    actions = weighted_vote_batch(predictions, confidences, valid)
+    unsafe = (n_valid == 0) | (avg_conf < safety_threshold) | (agreement_rate < disagreement_threshold)
+    return np.where(unsafe, 18, actions)
+
+
 def adaptive_vote(
     predictions: Dict[str, int],
     confidences: Dict[str, float],
@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+"""
+PPO v3: 구조화된 쿼리 상태 (베이스 SQL + 힌트 집합)
+
+에피소드 동안 SQL 문자열에 힌트를 계속 덧붙이면
+'OPTION (RECOMPILE, ..., OPTION (RECOMPILE ...' 같은 수집된 적 없는 SQL이 만들어져
+두 번째 스텝부터 캐시를 거의 못 씁니다.
+
+QueryState는 베이스 SQL과 힌트 집합을 따로 보관하고, 항상 같은 형태의 SQL로 렌더링합니다.
+- OPTION 힌트: 중복 제거, 같은 종류(MAXDOP n, FAST n 등)는 마지막 값으로 교체, 정렬된 순서로 출력
+- ISOLATION: 하나만 유지 (마지막 값)
+- TABLE_HINT: 하나만 유지 (마지막 값)
+같은 힌트 조합은 액션 순서와 관계없이 같은 SQL(= 같은 캐시 키)이 됩니다.
+"""
+
+import os
+import re
+import sys
+from typing import Dict, Optional, Tuple
+
+# 경로 설정
+current_dir = os.path.dirname(os.path.abspath(__file__))
+apollo_ml_dir = os.path.abspath(os.path.join(current_dir, '..', '..', '..'))
+sys.path.insert(0, apollo_ml_dir)
+
+from RLQO.plan_cache import split_sql_hints
+from RLQO.DQN_v3.env.v3_db_env import apply_action_to_sql
+
+
+def _hint_kind(hint: str) -> str:
+    """힌트 종류 (숫자 인자를 뺀 이름). 예: 'MAXDOP 4' → 'MAXDOP'"""
+    return re.sub(r'\s+\d+$', '', hint)
+
+
+class QueryState:
+    """
+    베이스 SQL + 정규화된 힌트 집합
+
+    불변 객체처럼 사용합니다: apply()는 새 QueryState를 반환합니다.
+    """
+
+    def __init__(self,
+                 base_sql: str,
+                 option_hints: Optional[Dict[str, str]] = None,
+                 isolation: Optional[str] = None,
+                 table_hint: Optional[str] = None):
+        """
+        Args:
+            base_sql: 힌트가 없는 원본 SQL
+            option_hints: 힌트 종류 → 힌트 (예: {'MAXDOP': 'MAXDOP 4'})
+            isolation: 'SET TRANSACTION ISOLATION LEVEL ...' 문 (세미콜론 제외)
+            table_hint: 테이블 힌트 (예: 'NOLOCK')
+        """
+        self.base_sql = base_sql
+        self.option_hints = dict(option_hints or {})
+        self.isolation = isolation
+        self.table_hint = table_hint
+
+    def apply(self, action: dict) -> 'QueryState':
+        """액션을 적용한 새 상태를 반환합니다."""
+        action_type = action.get('type')
+        action_value = action.get('value')
+
+        if action_type == "BASELINE" or not action_value:
+            return self
+
+        option_hints = dict(self.option_hints)
+        isolation = self.isolation
+        table_hint = self.table_hint
+
+        if action_type == "ISOLATION":
+            isolation = ' '.join(action_value.strip().rstrip(';').split()).upper()
+        elif action_type == "HINT":
+            _, hints = split_sql_hints(action_value)
+            for hint in hints:
+                option_hints[_hint_kind(hint)] = hint
+        elif action_type == "TABLE_HINT":
+            table_hint = action_value.strip().upper()
+        else:
+            return self
+
+        return QueryState(self.base_sql, option_hints, isolation, table_hint)
+
+    @property
+    def hints(self) -> Tuple[str, ...]:
+        """정렬된 전체 힌트 목록 (캐시 키/로그용)"""
+        hints = sorted(self.option_hints.values())
+        if self.isolation:
+            hints.append(self.isolation)
+        if self.table_hint:
+            hints.append(f"TABLE {self.table_hint}")
+        return tuple(hints)
+
+    @property
+    def cache_key(self) -> Tuple[str, Tuple[str, ...]]:
+        return self.base_sql.strip(), self.hints
+
+    def to_sql(self) -> str:
+        """결정적(deterministic) SQL 렌더링"""
+        sql = self.base_sql.rstrip()
+        has_semicolon = sql.endswith(';')
+        sql = sql.rstrip(';').rstrip()
+
+        if self.table_hint:
+            sql = apply_action_to_sql(sql, {'type': 'TABLE_HINT', 'value': self.table_hint})
+
+        if self.option_hints:
+            sql = f"{sql} OPTION ({', '.join(sorted(self.option_hints.values()))})"
+
+        if has_semicolon:
+            sql += ';'
+
+        if self.isolation:
+            sql = f"{self.isolation};\n{sql}"
+
+        return sql
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, QueryState) and self.cache_key == other.cache_key
+
+    def __hash__(self) -> int:
+        return hash(self.cache_key)
+
+    def __repr__(self) -> str:
+        return f"QueryState(hints={list(self.hints)})"
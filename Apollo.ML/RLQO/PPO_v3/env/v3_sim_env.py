@@ -8,13 +8,13 @@ PPO v3 Simulation 환경
 - 18차원 actionable state
 - Log scale normalized reward
 - Action masking (Query 타입별)
+- 구조화된 쿼리 상태 (QueryState: 베이스 SQL + 힌트 집합) → 다단계 에피소드도 캐시 사용
 """
 
 import sys
 import os
 import numpy as np
 import json
-import joblib
 from gymnasium import spaces
 
 # 경로 설정
@@ -28,6 +28,8 @@ sys.path.insert(0, rlqo_dir)
 from RLQO.PPO_v3.env.v3_actionable_state import ActionableStateEncoderV3
 from RLQO.PPO_v3.env.v3_normalized_reward import calculate_reward_v3_normalized
 from RLQO.PPO_v3.config.query_action_mapping_v3 import QUERY_TYPES, PHASE1_ACTIONS, get_query_type
+from RLQO.PPO_v3.env.v3_query_state import QueryState
+from RLQO.action_masks import compile_compatibility_matrix, compile_allowed_matrix
 
 # DQN v3 sim_env 재사용 (XGB 예측)
 from RLQO.DQN_v3.env.v3_sim_env import QueryPlanSimEnvV3
@@ -90,6 +92,19 @@ class QueryPlanSimEnvPPOv3(QueryPlanSimEnvV3):
         self.query_types_ppo = [get_query_type(i) for i in range(len(query_list))]
         self.phase1_actions_ppo = PHASE1_ACTIONS
         
+        # 액션 마스크 사전 컴파일: (쿼리 × 타입 × 액션) = 호환성 행렬 AND 타입별 Phase 1 행렬
+        self.compat_mask_matrix = compile_compatibility_matrix(
+            self.actions, self.compatibility_map, self.original_indices, missing_ok=True
+        )
+        self.type_mask_matrix, self.type_mask_rows = compile_allowed_matrix(
+            self.phase1_actions_ppo, len(self.actions)
+        )
+        self.action_mask_tensor = self.compat_mask_matrix[:, None, :] & self.type_mask_matrix[None, :, :]
+        self.action_mask_tensor.flags.writeable = False
+        # Phase 1 액션이 정의되지 않은 타입용
+        self.empty_action_mask = np.zeros(len(self.actions), dtype=bool)
+        self.empty_action_mask.flags.writeable = False
+        
         # 이력 추적
         self.prev_action_id = -1
         self.prev_reward = 0.0
@@ -118,6 +133,9 @@ class QueryPlanSimEnvPPOv3(QueryPlanSimEnvV3):
         self.prev_reward = 0.0
         self.previous_metrics = self.baseline_metrics.copy()
         
+        # 구조화된 쿼리 상태 (힌트 없음)
+        self.query_state = QueryState(self.current_sql)
+        
         # 현재 힌트 상태 (초기: 힌트 없음)
         current_hints = {
             'maxdop': 0,
@@ -148,38 +166,47 @@ class QueryPlanSimEnvPPOv3(QueryPlanSimEnvV3):
         return obs_18d, info
     
     def get_action_mask(self):
-        """Query 타입별 허용 액션만 마스킹 (9-10개)"""
+        """Query 타입별 허용 액션만 마스킹 (9-10개, 사전 컴파일된 행렬의 읽기 전용 view)"""
         # PPO v3 호환성 맵 사용 (부모 클래스 호출 안 함)
-        current_query_idx = self.original_indices[self.current_query_ix % len(self.query_list)]
-        
-        # 호환 액션 이름 리스트 가져오기
-        compatible_action_names = self.compatibility_map.get(str(current_query_idx), [])
-        
-        # 호환성 마스크 생성 (액션 이름으로 비교)
-        base_mask = np.zeros(len(self.actions), dtype=np.float32)
-        for i, action in enumerate(self.actions):
-            if action['name'] in compatible_action_names:
-                base_mask[i] = 1.0
-        
-        # Query 타입별 Phase 1 액션만 허용
-        type_mask = np.zeros(len(self.actions), dtype=np.float32)
-        allowed_actions = self.phase1_actions_ppo.get(self.current_query_type_ppo, [])
-        for action_id in allowed_actions:
-            if action_id < len(self.actions):
-                type_mask[action_id] = 1.0
+        query_pos = self.current_query_ix % len(self.query_list)
+        type_row = self.type_mask_rows.get(self.current_query_type_ppo)
         
-        # 기본 마스크와 AND 연산
-        final_mask = base_mask * type_mask
+        # 호환성 마스크 AND Query 타입별 Phase 1 액션
+        if type_row is None:
+            final_mask = self.empty_action_mask
+        else:
+            final_mask = self.action_mask_tensor[query_pos, type_row]
         
         if self.verbose:
-            compatible_count = int(np.sum(base_mask))
-            type_count = int(np.sum(type_mask))
+            compatible_count = int(np.sum(self.compat_mask_matrix[query_pos]))
+            type_count = int(np.sum(self.type_mask_matrix[type_row])) if type_row is not None else 0
             final_count = int(np.sum(final_mask))
-            print(f"[MASK] Query {current_query_idx}, Type {self.current_query_type_ppo}")
+            print(f"[MASK] Query {self.original_indices[query_pos]}, Type {self.current_query_type_ppo}")
             print(f"       Compatible: {compatible_count}, Type-specific: {type_count}, Final: {final_count}")
         
         return final_mask
     
+    def _get_metrics_for_state(self, state: QueryState, action: dict):
+        """
+        쿼리 상태에 해당하는 캐시 값을 찾습니다.
+        
+        조회 순서:
+        1. 누적된 힌트 조합 전체
+        2. 이번 액션만 적용한 SQL (수집 스크립트가 모은 단일 액션 조합)
+        3. 베이스 쿼리 실측값 (_get_obs_from_cache의 fallback)
+        """
+        full_sql = state.to_sql()
+        if full_sql in self.plan_cache:
+            return self._get_obs_from_cache(full_sql)
+        
+        single_sql = QueryState(state.base_sql).apply(action).to_sql()
+        if single_sql in self.plan_cache:
+            if self.verbose:
+                print(f"[CACHE] 힌트 조합 {list(state.hints)} 미수집 - 단일 액션 값 사용")
+            return self._get_obs_from_cache(single_sql)
+        
+        return self._get_obs_from_cache(full_sql)
+    
     def step(self, action_id):
         """
         액션 실행 + 정규화된 보상 계산 (캐시 기반)
@@ -235,12 +262,12 @@ class QueryPlanSimEnvPPOv3(QueryPlanSimEnvV3):
             
             return obs_18d, reward, terminated, truncated, info
         
-        # 3. 액션 적용된 SQL 생성
-        from RLQO.DQN_v3.env.v3_db_env import apply_action_to_sql
-        modified_sql = apply_action_to_sql(self.current_sql, action)
+        # 3. 액션 적용 (힌트 집합 갱신 후 결정적으로 렌더링)
+        next_state = self.query_state.apply(action)
+        modified_sql = next_state.to_sql()
         
         # 4. 캐시에서 실제 성능 데이터 가져오기
-        _, metrics_after = self._get_obs_from_cache(modified_sql)
+        _, metrics_after = self._get_metrics_for_state(next_state, action)
         
         # 5. 정규화된 보상 계산
         reward = calculate_reward_v3_normalized(
@@ -254,7 +281,8 @@ class QueryPlanSimEnvPPOv3(QueryPlanSimEnvV3):
         # 6. 상태 업데이트
         self.current_metrics = metrics_after
         self.current_step += 1
-        self.current_sql = modified_sql  # SQL 업데이트 (힌트 누적)
+        self.query_state = next_state
+        self.current_sql = modified_sql  # 렌더링된 SQL (힌트 누적, 중복 없음)
         
         # 7. 이력 업데이트
         self.prev_action_id = action_id
@@ -289,7 +317,8 @@ class QueryPlanSimEnvPPOv3(QueryPlanSimEnvV3):
             "action": action_name,
             "metrics": metrics_after,
             "baseline_metrics": self.baseline_metrics,
-            "invalid_action": False
+            "invalid_action": False,
+            "cache_source": self.last_cache_source  # 'fallback'이면 힌트 조합 미수집 (베이스 실측값)
         }
         
         return obs_18d, reward, terminated, truncated, info
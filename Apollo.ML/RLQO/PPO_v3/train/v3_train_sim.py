@@ -29,6 +29,7 @@ sys.path.insert(0, apollo_ml_dir)
 
 from RLQO.PPO_v3.env.v3_sim_env import QueryPlanSimEnvPPOv3
 from RLQO.PPO_v3.train.callbacks import EarlyStoppingCallback, ActionDiversityCallback
+from RLQO.vec_env import make_sim_vec_env
 
 # Load 30 queries from constants2.py
 sys.path.insert(0, os.path.join(apollo_ml_dir, 'RLQO'))
@@ -91,7 +92,43 @@ def make_masked_env(verbose=False):
     return env
 
 
-def train_simulation():
+def make_masked_vec_env(n_envs):
+    """
+    Create N parallel copies of the Simulation environment with action masking
+    
+    The parent process fills the shared plan cache once; each copy opens it
+    read-only and gets its own Monitor log file and query cursor.
+    
+    Args:
+        n_envs: Number of environment copies
+    
+    Returns:
+        env: VecEnv (SubprocVecEnv when n_envs > 1)
+    """
+    # Prepare the shared plan cache once in the parent process
+    QueryPlanSimEnvPPOv3(
+        query_list=SAMPLE_QUERIES,
+        max_steps=10,
+        curriculum_mode=True,
+        verbose=False
+    ).close()
+    
+    def env_fn(rank):
+        env = QueryPlanSimEnvPPOv3(
+            query_list=SAMPLE_QUERIES,
+            max_steps=10,
+            curriculum_mode=True,
+            verbose=False,
+            plan_cache_readonly=True
+        )
+        env = ActionMasker(env, mask_fn)
+        env = Monitor(env, os.path.join(SIM_LOG_DIR, str(rank)))
+        return env
+    
+    return make_sim_vec_env(env_fn, n_envs=n_envs)
+
+
+def train_simulation(n_envs=1):
     """
     PPO v3 Training in Simulation Environment
     
@@ -100,7 +137,13 @@ def train_simulation():
     - 44 actions
     - Gradient clipping
     - Learning rate scheduling
+    
+    Args:
+        n_envs: Number of parallel simulation environments
     """
+    # Keep the rollout size (n_steps x n_envs) the same as single-env training
+    n_steps = max(SIM_N_STEPS // n_envs, SIM_BATCH_SIZE)
+    
     print("=" * 80)
     print(" PPO v3 Simulation Training Start")
     print("=" * 80)
@@ -121,7 +164,8 @@ def train_simulation():
     print("-" * 80)
     print(f"Hyperparameters:")
     print(f"  Learning Rate: {SIM_LEARNING_RATE}")
-    print(f"  N Steps: {SIM_N_STEPS}")
+    print(f"  N Envs: {n_envs}")
+    print(f"  N Steps: {n_steps} per env")
     print(f"  Batch Size: {SIM_BATCH_SIZE}")
     print(f"  N Epochs: {SIM_N_EPOCHS}")
     print(f"  Gamma: {SIM_GAMMA}")
@@ -133,7 +177,10 @@ def train_simulation():
     # 1. Environment setup
     print("\n[1/4] Creating Simulation environment...")
     try:
-        env = make_masked_env(verbose=False)
+        if n_envs > 1:
+            env = make_masked_vec_env(n_envs)
+        else:
+            env = make_masked_env(verbose=False)
         print("[OK] Environment created")
         print(f"     Action space: {env.action_space}")
         print(f"     Observation space: {env.observation_space}")
@@ -150,7 +197,7 @@ def train_simulation():
             'MlpPolicy',
             env,
             learning_rate=SIM_LEARNING_RATE,
-            n_steps=SIM_N_STEPS,
+            n_steps=n_steps,
             batch_size=SIM_BATCH_SIZE,
             n_epochs=SIM_N_EPOCHS,
             gamma=SIM_GAMMA,
@@ -173,7 +220,8 @@ def train_simulation():
     print("\n[3/4] Setting up callbacks...")
     try:
         checkpoint_callback = CheckpointCallback(
-            save_freq=3_000,  # Save every 3K steps (5K -> 3K)
+            # save_freq counts per-env steps, so divide by n_envs to keep every 3K total steps
+            save_freq=max(3_000 // n_envs, 1),  # Save every 3K steps (5K -> 3K)
             save_path=SIM_CHECKPOINT_DIR,
             name_prefix="ppo_v3_sim"
         )
@@ -247,6 +295,8 @@ def main():
     parser = argparse.ArgumentParser(description='PPO v3 Simulation Training')
     parser.add_argument('--test', action='store_true',
                        help='Run environment test only')
+    parser.add_argument('--n-envs', type=int, default=1,
+                       help='Number of parallel simulation environments (SubprocVecEnv when > 1)')
     
     args = parser.parse_args()
     
@@ -276,7 +326,7 @@ def main():
         
         return
     
-    model = train_simulation()
+    model = train_simulation(n_envs=args.n_envs)
     
     if model:
         print("\n" + "=" * 80)
@@ -47,7 +47,7 @@ class QueryPlanDbEnvSACv1(QueryPlanRealDBEnvDDPGv1):
 
 
 # Convenience function
-def make_sac_db_env(query_list, max_steps=10, verbose=True):
+def make_sac_db_env(query_list, max_steps=10, verbose=True, measurement_broker=None):
     """
     SAC v1 Real DB 환경 생성
     
@@ -55,6 +55,7 @@ def make_sac_db_env(query_list, max_steps=10, verbose=True):
         query_list: 30개 쿼리 리스트
         max_steps: 에피소드당 최대 스텝
         verbose: 로그 출력 여부
+        measurement_broker: 공유 측정기 (Ensemble 평가용)
     
     Returns:
         env: SAC v1 Real DB Environment
@@ -62,7 +63,8 @@ def make_sac_db_env(query_list, max_steps=10, verbose=True):
     return QueryPlanDbEnvSACv1(
         query_list=query_list,
         max_steps=max_steps,
-        verbose=verbose
+        verbose=verbose,
+        measurement_broker=measurement_broker
     )
 
 
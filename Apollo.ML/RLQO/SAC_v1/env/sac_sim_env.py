@@ -53,7 +53,7 @@ class QueryPlanSimEnvSACv1(QueryPlanSimEnvDDPGv1):
 
 
 # Convenience function
-def make_sac_sim_env(query_list, max_steps=10, verbose=True):
+def make_sac_sim_env(query_list, max_steps=10, verbose=True, plan_cache_readonly=False, prediction_table=None):
     """
     SAC v1 Simulation 환경 생성
     
@@ -61,6 +61,8 @@ def make_sac_sim_env(query_list, max_steps=10, verbose=True):
         query_list: 30개 쿼리 리스트
         max_steps: 에피소드당 최대 스텝
         verbose: 로그 출력 여부
+        plan_cache_readonly: True면 공유 실행 계획 캐시를 읽기 전용으로 열기 (병렬 환경 복사본용)
+        prediction_table: 미리 계산한 XGB 예측 테이블 (병렬 환경 복사본끼리 공유)
     
     Returns:
         env: SAC v1 Simulation Environment
@@ -68,7 +70,9 @@ def make_sac_sim_env(query_list, max_steps=10, verbose=True):
     return QueryPlanSimEnvSACv1(
         query_list=query_list,
         max_steps=max_steps,
-        verbose=verbose
+        verbose=verbose,
+        plan_cache_readonly=plan_cache_readonly,
+        prediction_table=prediction_table
     )
 
 
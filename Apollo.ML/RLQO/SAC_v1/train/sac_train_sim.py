@@ -10,6 +10,7 @@ SAC v1: Simulation Training
 
 import os
 import sys
+import argparse
 from stable_baselines3 import SAC
 from stable_baselines3.common.callbacks import CheckpointCallback, EvalCallback
 
@@ -25,13 +26,35 @@ sys.path.insert(0, sac_v1_dir)
 # Imports
 from RLQO.constants2 import SAMPLE_QUERIES
 from RLQO.SAC_v1.env.sac_sim_env import make_sac_sim_env
+from RLQO.vec_env import make_sim_vec_env
 from RLQO.SAC_v1.config.sac_config import (
     SAC_SIM_CONFIG,
     MODEL_PATHS
 )
 
 
-def train_sac_simulation():
+def make_train_env(n_envs=1):
+    """
+    학습용 Simulation 환경 생성
+    
+    n_envs > 1이면 환경 N개를 병렬로 실행합니다.
+    실행 계획 캐시와 XGB 예측 테이블은 첫 환경에서 한 번만 준비해 모든 복사본이 공유합니다.
+    """
+    template_env = make_sac_sim_env(SAMPLE_QUERIES, max_steps=10, verbose=False)
+    if n_envs <= 1:
+        return template_env
+    
+    prediction_table = template_env.surrogate.export_table()
+    template_env.close()
+    
+    def env_fn(rank):
+        return make_sac_sim_env(SAMPLE_QUERIES, max_steps=10, verbose=False,
+                                plan_cache_readonly=True, prediction_table=prediction_table)
+    
+    return make_sim_vec_env(env_fn, n_envs=n_envs)
+
+
+def train_sac_simulation(n_envs=1):
     """
     SAC v1 Simulation 학습
     
@@ -40,6 +63,9 @@ def train_sac_simulation():
     2. SAC 모델 생성
     3. 100k steps 학습
     4. 모델 저장
+    
+    Args:
+        n_envs: 병렬 Simulation 환경 수
     """
     
     print("=" * 80)
@@ -48,9 +74,10 @@ def train_sac_simulation():
     
     # 1. Create environments
     print("\n[1/4] Creating environments...")
-    train_env = make_sac_sim_env(SAMPLE_QUERIES, max_steps=10, verbose=False)
+    train_env = make_train_env(n_envs)
     eval_env = make_sac_sim_env(SAMPLE_QUERIES, max_steps=10, verbose=False)
     
+    print(f"Parallel envs: {n_envs}")
     print(f"Action space: {train_env.action_space}")
     print(f"Observation space: {train_env.observation_space}")
     
@@ -89,8 +116,9 @@ def train_sac_simulation():
     # Checkpoint callback
     checkpoint_dir = MODEL_PATHS['checkpoint_dir'] + "sim/"
     os.makedirs(checkpoint_dir, exist_ok=True)
+    # Callback frequencies count per-env steps, so divide by n_envs to keep total-step intervals
     checkpoint_callback = CheckpointCallback(
-        save_freq=SAC_SIM_CONFIG['save_freq'],
+        save_freq=max(SAC_SIM_CONFIG['save_freq'] // n_envs, 1),
         save_path=checkpoint_dir,
         name_prefix='sac_v1_sim'
     )
@@ -100,7 +128,7 @@ def train_sac_simulation():
         eval_env,
         best_model_save_path=checkpoint_dir + "best/",
         log_path=checkpoint_dir + "logs/",
-        eval_freq=SAC_SIM_CONFIG['eval_freq'],
+        eval_freq=max(SAC_SIM_CONFIG['eval_freq'] // n_envs, 1),
         n_eval_episodes=SAC_SIM_CONFIG['n_eval_episodes'],
         deterministic=False,  # SAC uses stochastic policy
         render=False
@@ -139,5 +167,10 @@ def train_sac_simulation():
 
 
 if __name__ == '__main__':
-    train_sac_simulation()
+    parser = argparse.ArgumentParser(description='SAC v1 Simulation Training')
+    parser.add_argument('--n-envs', type=int, default=1,
+                        help='병렬 Simulation 환경 수 (1보다 크면 SubprocVecEnv 사용)')
+    args = parser.parse_args()
+    
+    train_sac_simulation(n_envs=args.n_envs)
 
@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+"""
+RLQO 액션 마스크 행렬 (쿼리 × 액션)
+
+환경은 get_action_mask() 호출마다 모든 액션을 돌며
+action['name'] in compatible_actions (리스트 탐색)로 마스크를 새로 만들어 왔습니다.
+호환성 맵은 환경 생성 후 바뀌지 않으므로 생성 시 bool 행렬로 한 번 컴파일하고,
+스텝에서는 행 view만 반환합니다.
+
+사용법:
+    matrix = compile_compatibility_matrix(actions, compatibility_map, original_indices)
+    mask = matrix[query_pos]          # (n_actions,) bool view
+
+행렬은 읽기 전용입니다 (반환된 view를 수정하면 다른 스텝의 마스크가 바뀌므로).
+"""
+
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+
+def compile_compatibility_matrix(
+    actions: List[Dict],
+    compatibility_map: Dict[str, List[str]],
+    query_indices: Sequence[int],
+    missing_ok: bool = False
+) -> np.ndarray:
+    """
+    호환성 맵을 (쿼리 수, 액션 수) bool 행렬로 컴파일합니다.
+
+    Args:
+        actions: 액션 정의 리스트 (각 항목에 'name')
+        compatibility_map: {str(원본 쿼리 인덱스): [호환 액션 이름, ...]}
+        query_indices: 행 순서대로의 원본 쿼리 인덱스 (curriculum 정렬 반영)
+        missing_ok: True면 맵에 없는 쿼리는 호환 액션 없음, False면 KeyError
+
+    Returns:
+        matrix: (len(query_indices), len(actions)) bool, 읽기 전용
+    """
+    missing = [idx for idx in query_indices if str(idx) not in compatibility_map]
+    if missing and not missing_ok:
+        raise KeyError(f"호환성 맵에 없는 쿼리: {missing}")
+
+    action_ids = {}
+    for action_id, action in enumerate(actions):
+        action_ids.setdefault(action['name'], []).append(action_id)
+
+    matrix = np.zeros((len(query_indices), len(actions)), dtype=bool)
+    for row, query_idx in enumerate(query_indices):
+        for name in compatibility_map.get(str(query_idx), []):
+            matrix[row, action_ids.get(name, [])] = True
+
+    matrix.flags.writeable = False
+    return matrix
+
+
+def compile_allowed_matrix(allowed_actions: Dict[str, List[int]], n_actions: int) -> Tuple[np.ndarray, Dict[str, int]]:
+    """
+    {키: 허용 액션 ID 리스트}를 bool 행렬로 컴파일합니다 (예: 쿼리 타입별 허용 액션).
+    범위를 벗어난 액션 ID는 무시합니다.
+
+    Returns:
+        matrix: (len(allowed_actions), n_actions) bool, 읽기 전용
+        rows: {키: 행 번호}
+    """
+    rows = {key: row for row, key in enumerate(allowed_actions)}
+    matrix = np.zeros((len(rows), n_actions), dtype=bool)
+    for key, row in rows.items():
+        action_ids = [action_id for action_id in allowed_actions[key] if action_id < n_actions]
+        matrix[row, action_ids] = True
+
+    matrix.flags.writeable = False
+    return matrix, rows
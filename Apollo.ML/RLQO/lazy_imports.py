@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+"""
+RLQO: Lazy Imports
+
+패키지 __init__에서 무거운 하위 모듈(환경, 모델)을 바로 import하지 않고
+속성에 처음 접근할 때 import하도록 합니다 (PEP 562 모듈 __getattr__).
+
+예) DDPG_v1/__init__.py가 DB/시뮬레이션 환경을 즉시 import하면
+    config.action_decoder만 필요한 경우에도 pandas, joblib, gymnasium이 함께 로드됩니다.
+
+사용법:
+    __getattr__, __dir__ = lazy_exports(__name__, {
+        'QueryPlanSimEnvDDPGv1': '.env.ddpg_sim_env',
+    })
+"""
+
+import importlib
+import sys
+from typing import Callable, Dict, List, Tuple
+
+
+def lazy_exports(package_name: str, exports: Dict[str, str]) -> Tuple[Callable, Callable]:
+    """
+    Args:
+        package_name: 패키지 이름 (__name__)
+        exports: {속성 이름: 모듈 경로 (상대 경로는 package_name 기준)}
+
+    Returns:
+        (__getattr__, __dir__): 패키지 모듈 전역에 할당할 함수
+    """
+    def __getattr__(name: str):
+        if name not in exports:
+            raise AttributeError(f"module {package_name!r} has no attribute {name!r}")
+
+        module = importlib.import_module(exports[name], package_name)
+        value = getattr(module, name)
+        # 다음 접근부터는 __getattr__을 거치지 않도록 캐시
+        setattr(sys.modules[package_name], name, value)
+        return value
+
+    def __dir__() -> List[str]:
+        return sorted(set(vars(sys.modules[package_name])) | set(exports))
+
+    return __getattr__, __dir__
@@ -0,0 +1,459 @@
+# -*- coding: utf-8 -*-
+"""
+RLQO 공유 실행 계획/메트릭 캐시
+
+모든 Sim 환경과 수집 스크립트가 함께 쓰는 SQLite 기반 캐시입니다.
+- 키: 정규화된 SQL 지문(fingerprint) + 힌트 집합 + DB 스냅샷 ID
+  (공백, 대소문자, 세미콜론, OPTION 힌트 순서 차이는 같은 키로 취급)
+  스냅샷 ID는 수집 스크립트의 --snapshot-id, Sim 환경의 plan_cache_snapshot_id,
+  또는 환경 변수 RLQO_SNAPSHOT_ID로 지정 (DB 데이터가 바뀌면 새 ID로 수집/학습)
+- 값: 중앙값/p95 메트릭, 실행 계획 XML, 79차원 관측값, 실행 횟수
+- hit/miss 카운터 제공
+- 실행 단위 체크포인트(plan_runs): 수집이 중단돼도 완료된 반복 실행은 다시 하지 않음
+
+기존 dict 피클 캐시(v4_plan_cache.pkl 등)는 import_pickle()로 가져올 수 있습니다.
+"""
+
+import hashlib
+import os
+import pickle
+import re
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+apollo_ml_dir = os.path.abspath(os.path.join(current_dir, '..'))
+
+# 기본 캐시 파일 (모든 버전 공유)
+DEFAULT_CACHE_PATH = os.path.join(apollo_ml_dir, 'artifacts', 'RLQO', 'cache', 'plan_cache.sqlite')
+# 환경 변수로 지정하면 병렬 환경 서브프로세스에도 그대로 전달됨
+DEFAULT_SNAPSHOT_ID = os.getenv('RLQO_SNAPSHOT_ID', 'default')
+
+METRIC_KEYS = ('elapsed_time_ms', 'logical_reads', 'cpu_time_ms')
+
+# 문자열 리터럴 / 주석을 왼쪽부터 한 번에 찾음 (리터럴 안의 '--', 주석 안의 ' 오인 방지)
+_LITERAL_OR_COMMENT = re.compile(r"(N?'(?:[^']|'')*')|--[^\n]*|/\*.*?\*/", re.DOTALL)
+_LITERAL_PLACEHOLDER = re.compile(r'\x00(\d+)\x00')
+_OPTION_START = re.compile(r'\bOPTION\s*\(', re.IGNORECASE)
+_ISOLATION_PREFIX = re.compile(r'SET\s+TRANSACTION\s+ISOLATION\s+LEVEL\s+([A-Z ]+?)\s*;', re.IGNORECASE)
+_TABLE_HINT = re.compile(
+    r'(?:\bWITH\s*)?\(\s*(NOLOCK|READUNCOMMITTED|READPAST|ROWLOCK|PAGLOCK|TABLOCK|UPDLOCK|FORCESEEK|FORCESCAN)\s*\)',
+    re.IGNORECASE
+)
+
+
+def _mask_literals(sql: str) -> Tuple[str, List[str]]:
+    """
+    주석을 지우고 문자열 리터럴을 자리표시자로 바꿉니다.
+
+    대문자 변환, OPTION 추출, 공백 정규화가 리터럴 안의 텍스트를 바꾸지 않도록
+    정규화가 끝난 뒤 _restore_literals로 원래 리터럴을 되돌립니다.
+    """
+    literals = []
+
+    def replace(match):
+        if match.group(1) is None:
+            return ' '
+        literals.append(match.group(1))
+        return f'\x00{len(literals) - 1}\x00'
+
+    return _LITERAL_OR_COMMENT.sub(replace, sql), literals
+
+
+def _restore_literals(text: str, literals: List[str]) -> str:
+    return _LITERAL_PLACEHOLDER.sub(lambda match: literals[int(match.group(1))], text)
+
+
+def _split_top_level(text: str) -> List[str]:
+    """괄호 밖의 쉼표 기준으로 분리합니다."""
+    items, depth, start = [], 0, 0
+    for i, ch in enumerate(text):
+        if ch == '(':
+            depth += 1
+        elif ch == ')':
+            depth -= 1
+        elif ch == ',' and depth == 0:
+            items.append(text[start:i])
+            start = i + 1
+    items.append(text[start:])
+    return items
+
+
+def _extract_option_hints(text: str) -> Tuple[str, set]:
+    """
+    모든 OPTION (...) 절을 제거하고 그 안의 힌트를 모읍니다.
+
+    힌트가 누적되어 생긴 'OPTION (RECOMPILE, MAXDOP 4, OPTION (RECOMPILE))' 같은
+    중첩 OPTION 절도 평탄화합니다.
+    """
+    hints = set()
+    while True:
+        match = _OPTION_START.search(text)
+        if not match:
+            return text, hints
+        depth, end = 1, match.end()
+        while end < len(text) and depth > 0:
+            if text[end] == '(':
+                depth += 1
+            elif text[end] == ')':
+                depth -= 1
+            end += 1
+        body = text[match.end():end - 1] if depth == 0 else text[match.end():]
+        for item in _split_top_level(body):
+            item = ' '.join(item.split())
+            if _OPTION_START.match(item):
+                _, nested = _extract_option_hints(item)
+                hints.update(nested)
+            elif item:
+                hints.add(item)
+        text = text[:match.start()] + ' ' + text[end:]
+
+
+def split_sql_hints(sql: str) -> Tuple[str, List[str]]:
+    """
+    SQL을 (정규화된 베이스 SQL, 정렬/중복 제거된 힌트 목록)으로 분리합니다.
+
+    힌트 종류:
+    - OPTION (...) 절의 쿼리 힌트 (여러 OPTION 절이 누적되어도 하나로 합침)
+    - 앞에 붙은 SET TRANSACTION ISOLATION LEVEL → 'ISOLATION <LEVEL>'
+    - 테이블 힌트 (NOLOCK 등) → 'TABLE <HINT>'
+    """
+    text, literals = _mask_literals(sql)
+    text = text.upper()
+
+    hints = set()
+
+    match = _ISOLATION_PREFIX.search(text)
+    if match:
+        hints.add(f"ISOLATION {' '.join(match.group(1).split())}")
+        text = _ISOLATION_PREFIX.sub(' ', text)
+
+    for table_hint in _TABLE_HINT.findall(text):
+        hints.add(f"TABLE {table_hint.upper()}")
+    text = _TABLE_HINT.sub(' ', text)
+
+    text, option_hints = _extract_option_hints(text)
+    hints.update(option_hints)
+
+    base_sql = ' '.join(text.split()).rstrip(';').strip()
+    # 괄호/쉼표 주변 공백 통일
+    base_sql = re.sub(r'\s*([(),])\s*', r'\1', base_sql)
+    return _restore_literals(base_sql, literals), sorted(_restore_literals(hint, literals) for hint in hints)
+
+
+def sql_fingerprint(sql: str) -> str:
+    """정규화된 베이스 SQL의 SHA-1 지문을 반환합니다."""
+    base_sql, _ = split_sql_hints(sql)
+    return hashlib.sha1(base_sql.encode('utf-8')).hexdigest()
+
+
+def make_cache_key(sql: str) -> Tuple[str, str]:
+    """SQL에서 (fingerprint, hint_key)를 만듭니다."""
+    base_sql, hints = split_sql_hints(sql)
+    fingerprint = hashlib.sha1(base_sql.encode('utf-8')).hexdigest()
+    return fingerprint, '|'.join(hints)
+
+
+def summarize_runs(runs: List[dict]) -> Tuple[dict, dict]:
+    """여러 번 실행한 메트릭 목록에서 (중앙값, p95) 메트릭을 계산합니다."""
+    median_metrics = {}
+    p95_metrics = {}
+    for key in METRIC_KEYS:
+        values = [float(m[key]) for m in runs if key in m]
+        if not values:
+            continue
+        median_metrics[key] = float(np.median(values))
+        p95_metrics[key] = float(np.percentile(values, 95))
+    return median_metrics, p95_metrics
+
+
+class PlanCache:
+    """
+    SQLite 기반 실행 계획/메트릭 캐시
+
+    조회 결과는 메모리에도 보관하므로 Sim 학습 중 반복 조회는 dict 조회 비용만 듭니다.
+    """
+
+    def __init__(self,
+                 path: str = DEFAULT_CACHE_PATH,
+                 snapshot_id: str = DEFAULT_SNAPSHOT_ID,
+                 readonly: bool = False):
+        """
+        Args:
+            path: SQLite 파일 경로
+            snapshot_id: DB 스냅샷 ID (데이터가 바뀌면 새 ID로 수집)
+            readonly: True면 쓰기 불가 (학습 환경용)
+        """
+        self.path = path
+        self.snapshot_id = snapshot_id
+        self.readonly = readonly
+
+        if readonly:
+            self._conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False)
+        else:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self._conn = sqlite3.connect(path, check_same_thread=False)
+            self._create_schema()
+
+        self._memory: Dict[Tuple[str, str], Optional[dict]] = {}
+        self._key_memo: Dict[str, Tuple[str, str]] = {}
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'fallbacks': 0, 'writes': 0}
+
+    def _create_schema(self):
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS plan_cache (
+                fingerprint   TEXT NOT NULL,
+                hint_key      TEXT NOT NULL,
+                snapshot_id   TEXT NOT NULL,
+                sql_text      TEXT,
+                plan_xml      TEXT,
+                observation   BLOB,
+                median_elapsed_ms REAL, p95_elapsed_ms REAL,
+                median_cpu_ms     REAL, p95_cpu_ms     REAL,
+                median_reads      REAL, p95_reads      REAL,
+                runs          INTEGER,
+                source        TEXT,
+                collected_at  TEXT,
+                PRIMARY KEY (fingerprint, hint_key, snapshot_id)
+            )
+        """)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS plan_runs (
+                fingerprint   TEXT NOT NULL,
+                hint_key      TEXT NOT NULL,
+                snapshot_id   TEXT NOT NULL,
+                run_idx       INTEGER NOT NULL,
+                elapsed_ms    REAL,
+                cpu_ms        REAL,
+                reads         REAL,
+                plan_xml      TEXT,
+                collected_at  TEXT,
+                PRIMARY KEY (fingerprint, hint_key, snapshot_id, run_idx)
+            )
+        """)
+        self._conn.commit()
+
+    # --- 조회 ---
+
+    def get(self, sql: str) -> Optional[dict]:
+        """
+        SQL에 해당하는 캐시 항목을 반환합니다 (없으면 None).
+
+        Returns:
+            {'metrics', 'metrics_p95', 'plan_xml', 'observation', 'runs', 'source'}
+        """
+        entry = self._lookup(sql)
+        if entry is None:
+            self.stats['misses'] += 1
+        else:
+            self.stats['hits'] += 1
+        return entry
+
+    def get_with_fallback(self, sql: str) -> Tuple[Optional[dict], bool]:
+        """
+        SQL 항목을 찾고, 없으면 힌트를 뺀 베이스 쿼리의 실측값을 반환합니다.
+
+        조회 1회당 hit / fallback / miss 중 하나만 집계합니다.
+        fallback 항목은 source='fallback'으로 표시됩니다 (힌트 효과가 없는 베이스 실측값이므로
+        호출자가 실제 측정값과 구분할 수 있도록, 원래 source는 'base_source'에 보관).
+
+        Returns:
+            (entry, is_fallback) - 베이스 쿼리도 없으면 (None, False)
+        """
+        entry = self._lookup(sql)
+        if entry is not None:
+            self.stats['hits'] += 1
+            return entry, False
+
+        base_sql, hints = split_sql_hints(sql)
+        if hints:
+            entry = self._lookup(base_sql)
+            if entry is not None:
+                self.stats['fallbacks'] += 1
+                return dict(entry, source='fallback', base_source=entry['source']), True
+
+        self.stats['misses'] += 1
+        return None, False
+
+    def _lookup(self, sql: str) -> Optional[dict]:
+        """통계 집계 없이 메모리 → SQLite 순으로 조회합니다."""
+        key = self._key(sql)
+        if key not in self._memory:
+            self._memory[key] = self._load(*key)
+        return self._memory[key]
+
+    def __contains__(self, sql: str) -> bool:
+        return self._lookup(sql) is not None
+
+    def _key(self, sql: str) -> Tuple[str, str]:
+        """SQL 문자열별 키 계산 결과를 재사용합니다 (정규화 비용 절감)."""
+        key = self._key_memo.get(sql)
+        if key is None:
+            key = make_cache_key(sql)
+            self._key_memo[sql] = key
+        return key
+
+    def _load(self, fingerprint: str, hint_key: str) -> Optional[dict]:
+        with self._lock:
+            row = self._conn.execute(
+                """SELECT plan_xml, observation,
+                          median_elapsed_ms, p95_elapsed_ms, median_cpu_ms, p95_cpu_ms,
+                          median_reads, p95_reads, runs, source
+                   FROM plan_cache WHERE fingerprint = ? AND hint_key = ? AND snapshot_id = ?""",
+                (fingerprint, hint_key, self.snapshot_id)
+            ).fetchone()
+        if row is None:
+            return None
+
+        plan_xml, obs_blob, med_el, p95_el, med_cpu, p95_cpu, med_reads, p95_reads, runs, source = row
+        observation = np.frombuffer(obs_blob, dtype=np.float32).copy() if obs_blob else None
+        return {
+            'metrics': {'elapsed_time_ms': med_el, 'logical_reads': med_reads, 'cpu_time_ms': med_cpu},
+            'metrics_p95': {'elapsed_time_ms': p95_el, 'logical_reads': p95_reads, 'cpu_time_ms': p95_cpu},
+            'plan_xml': plan_xml,
+            'observation': observation,
+            'runs': runs,
+            'source': source,
+        }
+
+    # --- 저장 ---
+
+    def put(self,
+            sql: str,
+            runs: List[dict],
+            plan_xml: Optional[str] = None,
+            observation: Optional[np.ndarray] = None,
+            source: str = '',
+            median_metrics: Optional[dict] = None):
+        """
+        측정 결과를 저장합니다 (같은 키가 있으면 덮어씀).
+
+        Args:
+            sql: 실행한 SQL (액션 적용 후)
+            runs: 각 실행의 메트릭 목록 (중앙값/p95 계산용)
+            plan_xml: 실행 계획 XML
+            observation: 79차원 관측값
+            source: 수집 스크립트 이름 (예: 'v4_collect_plans')
+            median_metrics: 이미 계산된 중앙값 (runs가 없는 기존 캐시 이전용)
+        """
+        if self.readonly:
+            raise PermissionError(f"읽기 전용 캐시입니다: {self.path}")
+
+        median, p95 = summarize_runs(runs) if runs else ({}, {})
+        if median_metrics is not None:
+            median = {k: float(median_metrics[k]) for k in METRIC_KEYS}
+            p95 = p95 or dict(median)
+
+        fingerprint, hint_key = self._key(sql)
+        obs_blob = np.asarray(observation, dtype=np.float32).tobytes() if observation is not None else None
+
+        with self._lock:
+            self._conn.execute(
+                """INSERT OR REPLACE INTO plan_cache VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                (fingerprint, hint_key, self.snapshot_id, sql.strip(), plan_xml, obs_blob,
+                 median.get('elapsed_time_ms'), p95.get('elapsed_time_ms'),
+                 median.get('cpu_time_ms'), p95.get('cpu_time_ms'),
+                 median.get('logical_reads'), p95.get('logical_reads'),
+                 len(runs) if runs else None, source, datetime.now().isoformat())
+            )
+            self._conn.commit()
+            self._memory.pop((fingerprint, hint_key), None)
+            self.stats['writes'] += 1
+
+    def record_run(self, sql: str, run_idx: int, metrics: dict, plan_xml: Optional[str] = None):
+        """
+        반복 실행 1회의 측정값을 체크포인트로 저장합니다.
+
+        Args:
+            sql: 실행한 SQL
+            run_idx: 반복 번호 (0부터)
+            metrics: {'elapsed_time_ms', 'logical_reads', 'cpu_time_ms'}
+            plan_xml: 실행 계획 XML (보통 첫 실행에서만 수집)
+        """
+        if self.readonly:
+            raise PermissionError(f"읽기 전용 캐시입니다: {self.path}")
+
+        fingerprint, hint_key = self._key(sql)
+        with self._lock:
+            self._conn.execute(
+                """INSERT OR REPLACE INTO plan_runs VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                (fingerprint, hint_key, self.snapshot_id, run_idx,
+                 metrics['elapsed_time_ms'], metrics['cpu_time_ms'], metrics['logical_reads'],
+                 plan_xml, datetime.now().isoformat())
+            )
+            self._conn.commit()
+
+    def get_runs(self, sql: str) -> Tuple[Dict[int, dict], Optional[str]]:
+        """
+        체크포인트된 반복 실행 측정값을 반환합니다.
+
+        Returns:
+            ({run_idx: metrics}, plan_xml) - plan_xml은 저장된 첫 실행 계획
+        """
+        fingerprint, hint_key = self._key(sql)
+        with self._lock:
+            rows = self._conn.execute(
+                """SELECT run_idx, elapsed_ms, cpu_ms, reads, plan_xml FROM plan_runs
+                   WHERE fingerprint = ? AND hint_key = ? AND snapshot_id = ? ORDER BY run_idx""",
+                (fingerprint, hint_key, self.snapshot_id)
+            ).fetchall()
+
+        runs, plan_xml = {}, None
+        for run_idx, elapsed_ms, cpu_ms, reads, run_plan_xml in rows:
+            runs[run_idx] = {'elapsed_time_ms': elapsed_ms, 'logical_reads': reads, 'cpu_time_ms': cpu_ms}
+            if plan_xml is None and run_plan_xml:
+                plan_xml = run_plan_xml
+        return runs, plan_xml
+
+    def import_pickle(self, pickle_path: str, source: str = '', overwrite: bool = False) -> int:
+        """
+        기존 dict 피클 캐시({sql.strip(): {'observation', 'metrics', 'plan_xml', 'runs'}})를 가져옵니다.
+
+        Returns:
+            새로 저장한 항목 수
+        """
+        with open(pickle_path, 'rb') as f:
+            legacy_cache = pickle.load(f)
+
+        imported = 0
+        for sql, data in legacy_cache.items():
+            if not overwrite and sql in self:
+                continue
+            self.put(
+                sql,
+                runs=data.get('all_metrics', []),
+                plan_xml=data.get('plan_xml'),
+                observation=data.get('observation'),
+                source=source or os.path.basename(pickle_path),
+                median_metrics=data['metrics']
+            )
+            imported += 1
+        return imported
+
+    # --- 기타 ---
+
+    def __len__(self) -> int:
+        row = self._conn.execute(
+            "SELECT COUNT(*) FROM plan_cache WHERE snapshot_id = ?", (self.snapshot_id,)
+        ).fetchone()
+        return int(row[0])
+
+    def hit_rate(self) -> float:
+        """정확히 일치한 조회 비율 (fallback은 hit로 세지 않음)"""
+        total = self.stats['hits'] + self.stats['misses'] + self.stats['fallbacks']
+        return self.stats['hits'] / total if total > 0 else 0.0
+
+    def print_stats(self):
+        """캐시 통계 출력"""
+        print(f"[CACHE] {self.path} (snapshot={self.snapshot_id})")
+        print(f"  Hits: {self.stats['hits']}, Misses: {self.stats['misses']} "
+              f"(hit rate {self.hit_rate():.1%}), Fallbacks: {self.stats['fallbacks']}, "
+              f"Writes: {self.stats['writes']}")
+
+    def close(self):
+        self._conn.close()
@@ -0,0 +1,302 @@
+# -*- coding: utf-8 -*-
+"""
+RLQO 병렬 실행 계획 수집기
+
+(쿼리, 액션, 반복) 작업을 큐에 넣고, 여러 pyodbc 연결을 가진 워커들이 나눠서 실행합니다.
+- 반복 실행 1회가 끝날 때마다 공유 캐시(plan_cache.py)에 체크포인트 저장
+- 스크립트가 중단되어도 다시 실행하면 남은 작업만 이어서 수집
+- 같은 SQL은 동시에 두 워커에서 실행하지 않음 (SQL 수보다 워커가 많아도 서로 간섭하지 않도록)
+- 연결 끊김/타임아웃/교착 상태 같은 일시적 오류만 재연결 후 재시도
+  (구문 오류, 없는 개체 등 결정적 오류는 바로 실패 처리)
+- workers=1이면 기존처럼 한 번에 한 쿼리씩 측정 (측정 간섭 최소)
+  workers를 늘리면 동시 실행 간섭은 커지지만 전체 수집 시간은 짧아짐
+
+사용법:
+    cache = PlanCache()
+    collector = ParallelPlanCollector(config.db, cache, parse_statistics, workers=1, source='v4_collect_plans')
+    results = collector.collect([(label, sql), ...])   # {sql: 캐시 항목 또는 None}
+"""
+
+import os
+import sys
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+apollo_ml_dir = os.path.abspath(os.path.join(current_dir, '..'))
+sys.path.insert(0, apollo_ml_dir)
+
+from db import connect, get_execution_plan, get_query_statistics, is_transient_error
+from RLQO.plan_cache import PlanCache, summarize_runs
+from RLQO.DQN_v1.features.phase2_features import extract_features
+
+
+class _WorkQueue:
+    """
+    (sql, run_idx, attempt) 작업 큐
+
+    get()은 다른 워커가 실행 중인 SQL을 건너뛰고 꺼냅니다.
+    꺼낼 수 있는 작업이 없지만 실행 중인 작업이 있으면 (재시도로 다시 들어올 수 있으므로) 기다리고,
+    남은 작업도 실행 중인 작업도 없으면 None을 반환합니다.
+    """
+
+    def __init__(self):
+        self._items = deque()
+        self._in_flight = set()
+        self._cond = threading.Condition()
+
+    def put(self, item: Tuple[str, int, int]):
+        with self._cond:
+            self._items.append(item)
+            self._cond.notify_all()
+
+    def get(self) -> Optional[Tuple[str, int, int]]:
+        with self._cond:
+            while True:
+                for item in self._items:
+                    if item[0] not in self._in_flight:
+                        self._items.remove(item)
+                        self._in_flight.add(item[0])
+                        return item
+                if not self._items and not self._in_flight:
+                    return None
+                self._cond.wait()
+
+    def done(self, sql: str):
+        """get()으로 꺼낸 SQL의 실행이 끝났음을 알립니다 (재시도 작업은 done 전에 put)."""
+        with self._cond:
+            self._in_flight.discard(sql)
+            self._cond.notify_all()
+
+    def remaining(self) -> int:
+        with self._cond:
+            return len(self._items)
+
+
+class ParallelPlanCollector:
+    """
+    워커 풀 기반 실행 계획/메트릭 수집기
+
+    작업 순서는 반복 번호 우선(run-major)입니다: 모든 SQL의 1회차 → 2회차 → ...
+    같은 SQL의 반복 실행이 동시에 돌지 않도록 분산시키고, _WorkQueue가 이를 보장합니다.
+    """
+
+    def __init__(self,
+                 db_config,
+                 plan_cache: PlanCache,
+                 parse_statistics: Callable[[str, str], dict],
+                 num_runs: int = 5,
+                 workers: int = 1,
+                 source: str = '',
+                 observation_fn: Callable[[str, dict], np.ndarray] = extract_features,
+                 max_attempts: int = 3,
+                 retry_delay: int = 5,
+                 verbose: bool = True):
+        """
+        Args:
+            db_config: config.yaml의 DB 설정 (워커마다 별도 연결 생성)
+            plan_cache: 체크포인트/결과를 저장할 공유 캐시
+            parse_statistics: (stats_io, stats_time) → metrics dict
+            num_runs: SQL당 반복 실행 횟수 (중앙값/p95 계산용)
+            workers: 동시 DB 연결 수 (기본 1: 순차 측정, 늘리면 측정 간섭 증가)
+            source: 캐시에 기록할 수집 스크립트 이름
+            observation_fn: (plan_xml, median_metrics) → 관측값
+            max_attempts: 작업당 최대 시도 횟수 (일시적 DB 오류에만 재시도)
+            retry_delay: 재연결 대기 시간 (초)
+            verbose: 진행 로그 출력 여부
+        """
+        self.db_config = db_config
+        self.plan_cache = plan_cache
+        self.parse_statistics = parse_statistics
+        self.num_runs = num_runs
+        self.workers = max(1, workers)
+        self.source = source
+        self.observation_fn = observation_fn
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.verbose = verbose
+
+        self._print_lock = threading.Lock()
+        self._finalize_lock = threading.Lock()
+        self._finalized = set()
+        self.stats = {'reused': 0, 'resumed_runs': 0, 'executed_runs': 0, 'failed_runs': 0, 'reconnects': 0}
+
+    def _log(self, message: str):
+        if self.verbose:
+            with self._print_lock:
+                print(message)
+
+    # --- 작업 큐 ---
+
+    def _build_queue(self, jobs: List[Tuple[str, str]]) -> Tuple[_WorkQueue, Dict[str, str], int]:
+        """캐시에 없는 (SQL, 반복 번호) 작업만 큐에 넣습니다."""
+        pending = self._pending = {}  # 캐시 키 → (label, sql)
+        for label, sql in jobs:
+            key = self.plan_cache._key(sql)
+            if key in pending:
+                continue
+            if sql in self.plan_cache:
+                self.stats['reused'] += 1
+                continue
+            pending[key] = (label, sql)
+
+        work = _WorkQueue()
+        labels = {}
+        total = 0
+        for run_idx in range(self.num_runs):
+            for label, sql in pending.values():
+                done_runs, _ = self.plan_cache.get_runs(sql)
+                if run_idx in done_runs:
+                    self.stats['resumed_runs'] += 1
+                    continue
+                work.put((sql, run_idx, 1))
+                labels[sql] = label
+                total += 1
+
+        # 모든 반복이 이미 체크포인트된 SQL은 바로 확정
+        for label, sql in pending.values():
+            if sql not in labels:
+                self._finalize(sql, label)
+
+        return work, labels, total
+
+    # --- 워커 ---
+
+    def _connect(self):
+        return connect(self.db_config, max_retries=self.max_attempts, retry_delay=self.retry_delay)
+
+    def _worker(self, worker_id: int, work: _WorkQueue, labels: Dict[str, str], progress: dict):
+        try:
+            conn = self._connect()
+        except Exception as e:
+            self._log(f"[W{worker_id}] DB 연결 실패, 워커 종료: {e}")
+            return
+
+        while True:
+            item = work.get()
+            if item is None:
+                break
+            sql, run_idx, attempt = item
+
+            label = labels.get(sql, sql[:40])
+            try:
+                plan_xml = get_execution_plan(conn, sql, raise_errors=True) if run_idx == 0 else None
+                stats_io, stats_time = get_query_statistics(conn, sql, raise_errors=True)
+                if not stats_time:
+                    raise RuntimeError("통계 수집 실패")
+                if run_idx == 0 and not plan_xml:
+                    raise RuntimeError("실행 계획 수집 실패")
+
+                metrics = self.parse_statistics(stats_io, stats_time)
+                # 안전성을 위해 0 이하 값 방지
+                metrics['elapsed_time_ms'] = max(0.1, metrics['elapsed_time_ms'])
+                metrics['logical_reads'] = max(1, metrics['logical_reads'])
+                metrics['cpu_time_ms'] = max(0.1, metrics['cpu_time_ms'])
+
+                self.plan_cache.record_run(sql, run_idx, metrics, plan_xml)
+
+                with self._print_lock:
+                    self.stats['executed_runs'] += 1
+                    progress['done'] += 1
+                    done = progress['done']
+                self._log(f"  [W{worker_id}] [{done}/{progress['total']}] {label} #{run_idx + 1}: "
+                          f"{metrics['elapsed_time_ms']:.1f}ms, {metrics['logical_reads']:.0f} reads")
+
+                done_runs, _ = self.plan_cache.get_runs(sql)
+                if len(done_runs) >= self.num_runs:
+                    self._finalize(sql, label)
+
+            except Exception as e:
+                if is_transient_error(e) and attempt < self.max_attempts:
+                    self._log(f"  [W{worker_id}] {label} #{run_idx + 1} 실패 ({e}) - 재연결 후 재시도 "
+                              f"({attempt}/{self.max_attempts})")
+                    work.put((sql, run_idx, attempt + 1))
+                    work.done(sql)
+                    try:
+                        conn.close()
+                    except Exception:
+                        pass
+                    time.sleep(self.retry_delay)
+                    try:
+                        conn = self._connect()
+                        with self._print_lock:
+                            self.stats['reconnects'] += 1
+                    except Exception as conn_error:
+                        self._log(f"[W{worker_id}] 재연결 실패, 워커 종료: {conn_error}")
+                        return
+                    continue
+                with self._print_lock:
+                    self.stats['failed_runs'] += 1
+                    progress['done'] += 1
+                self._log(f"  [W{worker_id}] {label} #{run_idx + 1} 최종 실패: {e}")
+
+            work.done(sql)
+
+        conn.close()
+
+    def _finalize(self, sql: str, label: str):
+        """모든 반복이 끝난 SQL의 중앙값/p95와 관측값을 캐시에 확정합니다."""
+        with self._finalize_lock:
+            key = self.plan_cache._key(sql)
+            if key in self._finalized:
+                return
+            self._finalized.add(key)
+
+        done_runs, plan_xml = self.plan_cache.get_runs(sql)
+        runs = [done_runs[i] for i in sorted(done_runs)]
+        median_metrics, _ = summarize_runs(runs)
+
+        observation = None
+        if plan_xml:
+            try:
+                observation = self.observation_fn(plan_xml, median_metrics)
+            except Exception as e:
+                self._log(f"    {label} 특징 추출 실패: {e}")
+
+        self.plan_cache.put(sql, runs=runs, plan_xml=plan_xml, observation=observation, source=self.source)
+        self._log(f"  [DONE] {label}: {median_metrics['elapsed_time_ms']:.1f}ms (중앙값, {len(runs)}회)")
+
+    # --- 실행 ---
+
+    def collect(self, jobs: List[Tuple[str, str]]) -> Dict[str, Optional[dict]]:
+        """
+        (label, sql) 목록을 수집합니다.
+
+        Returns:
+            {sql: 캐시 항목} - 수집에 실패한 SQL은 None
+        """
+        start_time = time.time()
+        work, labels, total = self._build_queue(jobs)
+
+        self._log(f"[COLLECT] SQL {len(jobs)}개, 남은 실행 {total}회, 워커 {self.workers}개 "
+                  f"(재사용 {self.stats['reused']}개, 이어받은 실행 {self.stats['resumed_runs']}회)")
+
+        progress = {'done': 0, 'total': total}
+        threads = []
+        # 같은 SQL은 동시에 실행하지 않으므로 남은 SQL 수보다 많은 워커는 띄우지 않음
+        for worker_id in range(min(self.workers, max(len(labels), 1))):
+            thread = threading.Thread(target=self._worker, args=(worker_id, work, labels, progress), daemon=True)
+            thread.start()
+            threads.append(thread)
+        for thread in threads:
+            thread.join()
+
+        remaining = work.remaining()
+        if remaining:
+            self._log(f"[WARN] 모든 워커가 종료되어 {remaining}개 작업이 남았습니다. 다시 실행하면 이어서 수집합니다.")
+        else:
+            # 일부 반복만 실패한 SQL은 성공한 실행(실행 계획 포함)만으로 확정
+            for label, sql in self._pending.values():
+                done_runs, plan_xml = self.plan_cache.get_runs(sql)
+                if done_runs and plan_xml:
+                    self._finalize(sql, label)
+
+        elapsed = time.time() - start_time
+        self._log(f"[COLLECT] 완료: 실행 {self.stats['executed_runs']}회, 실패 {self.stats['failed_runs']}회, "
+                  f"재연결 {self.stats['reconnects']}회, {elapsed / 60:.1f}분 소요")
+
+        return {sql: self.plan_cache.get(sql) for _, sql in jobs}
@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+"""
+RLQO import 시간 예산 테스트
+
+가벼운 유틸리티(router, validator, action mapper, reward 함수, ensemble 클래스)가
+torch/SB3/pyodbc/xgboost/pandas 등 무거운 의존성 없이 빠르게 import되는지 확인합니다.
+
+각 모듈은 새 프로세스에서 import합니다 (sys.modules 캐시 영향 제거).
+numpy는 모든 모듈의 공통 기반이므로 미리 import하고 시간에서 제외합니다.
+
+실행:
+    python RLQO/test_import_time.py
+    python -m pytest RLQO/test_import_time.py
+"""
+
+import json
+import os
+import subprocess
+import sys
+
+apollo_ml_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+# 모듈별 import 시간 예산 (ms, numpy 제외)
+IMPORT_BUDGET_MS = {
+    'RLQO.Ensemble_v2.query_type_router': 50,
+    'RLQO.Ensemble_v2.action_validator': 50,
+    'RLQO.Ensemble_v2.ppo_action_mapper': 50,
+    'RLQO.Ensemble_v2.voting_strategies': 50,
+    'RLQO.Ensemble_v2.action_converter': 50,
+    'RLQO.Ensemble_v2.ensemble_voting': 100,
+    'RLQO.DQN_v4.env.v4_reward': 50,
+    'RLQO.DQN_v3.env.v3_reward': 50,
+    'RLQO.PPO_v3.env.v3_normalized_reward': 50,
+    'RLQO.DDPG_v1.config.action_decoder': 50,
+    'db': 150,  # pyodbc/pandas는 함수 안에서 import
+}
+
+# 가벼운 모듈이 import 시 로드하면 안 되는 패키지
+HEAVY_MODULES = [
+    'torch', 'stable_baselines3', 'sb3_contrib', 'pyodbc', 'xgboost',
+    'joblib', 'pandas', 'gymnasium', 'sklearn',
+]
+
+# 반복 측정 횟수 (최솟값 사용, 디스크 캐시/스케줄링 잡음 제거)
+N_REPEATS = 3
+
+MEASURE_SCRIPT = """
+import importlib, json, sys, time
+import numpy
+start = time.perf_counter()
+importlib.import_module({module!r})
+elapsed_ms = (time.perf_counter() - start) * 1000
+print(json.dumps({{'elapsed_ms': elapsed_ms, 'heavy': [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+
+def measure_import(module: str) -> dict:
+    """새 프로세스에서 모듈을 import하고 시간(ms)과 로드된 무거운 패키지를 반환합니다."""
+    script = MEASURE_SCRIPT.format(module=module, heavy=HEAVY_MODULES)
+    result = subprocess.run(
+        [sys.executable, '-c', script],
+        cwd=apollo_ml_dir, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        return {'error': result.stderr.strip().splitlines()[-1]}
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def run_import_checks() -> list:
+    """모든 모듈의 import 시간/무거운 의존성을 확인하고 실패 메시지 목록을 반환합니다."""
+    failures = []
+    for i, (module, budget_ms) in enumerate(IMPORT_BUDGET_MS.items(), 1):
+        print(f"\n[Test {i}] {module} (budget {budget_ms}ms)")
+
+        runs = [measure_import(module) for _ in range(N_REPEATS)]
+        errors = [run['error'] for run in runs if 'error' in run]
+        if errors:
+            print(f"  [FAIL] Import error: {errors[0]}")
+            failures.append(f"{module}: import error: {errors[0]}")
+            continue
+
+        elapsed_ms = min(run['elapsed_ms'] for run in runs)
+        heavy = sorted(set(name for run in runs for name in run['heavy']))
+        print(f"  Import time: {elapsed_ms:.1f}ms")
+
+        if heavy:
+            print(f"  [FAIL] Heavy modules loaded: {', '.join(heavy)}")
+            failures.append(f"{module}: heavy modules loaded: {', '.join(heavy)}")
+        elif elapsed_ms > budget_ms:
+            print(f"  [FAIL] Over budget: {elapsed_ms:.1f}ms > {budget_ms}ms")
+            failures.append(f"{module}: {elapsed_ms:.1f}ms > {budget_ms}ms")
+        else:
+            print("  [PASS]")
+    return failures
+
+
+def test_import_time_budget():
+    """가벼운 모듈이 예산 안에서, 무거운 의존성 없이 import되는지 확인"""
+    failures = run_import_checks()
+    assert not failures, "\n".join(failures)
+
+
+if __name__ == '__main__':
+    print("=" * 80)
+    print("RLQO import 시간 예산 테스트")
+    print("=" * 80)
+
+    failures = run_import_checks()
+    passed = len(IMPORT_BUDGET_MS) - len(failures)
+
+    print("\n" + "=" * 80)
+    print(f"Test Results: {passed} passed, {len(failures)} failed")
+    print("=" * 80)
+
+    if not failures:
+        print("\n✓ All tests passed!")
+    else:
+        print(f"\n✗ {len(failures)} test(s) failed!")
+        sys.exit(1)
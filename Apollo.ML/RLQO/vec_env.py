@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+"""
+RLQO Sim 환경 병렬화 (N개 환경 복사본을 VecEnv로 실행)
+
+- 각 복사본은 자기 쿼리 커서를 가짐 (rank별로 시작 쿼리를 분산)
+- 읽기 전용 자원은 부모 프로세스에서 한 번만 준비해 공유
+  · 실행 계획 캐시: 부모가 SQLite를 채우고, 자식은 read-only로 열기 (OS 페이지 캐시 공유)
+  · XGB 예측 테이블: 부모가 한 번 배치 예측 → 자식에게 전달
+    (fork 방식이면 복사 없이 copy-on-write로 공유)
+- ActionMasker는 각 복사본 안에서 적용 → MaskablePPO가 env_method("action_masks")로 마스크 수집
+
+사용법:
+    def env_fn(rank):
+        env = QueryPlanSimEnvPPOv3(..., plan_cache_readonly=True)
+        env = ActionMasker(env, mask_fn)
+        return Monitor(env, os.path.join(LOG_DIR, str(rank)))
+
+    vec_env = make_sim_vec_env(env_fn, n_envs=8)
+"""
+
+import multiprocessing as mp
+from typing import Callable, Optional
+
+import gymnasium as gym
+from stable_baselines3.common.vec_env import DummyVecEnv, SubprocVecEnv, VecEnv
+
+
+def _find_base_env(env):
+    """래퍼를 따라 내려가 쿼리 커서(query_list, current_query_ix)를 가진 환경을 찾습니다."""
+    while not hasattr(env, 'query_list') and hasattr(env, 'env'):
+        env = env.env
+    return env
+
+
+def offset_query_cursor(env, rank: int, n_envs: int):
+    """복사본마다 시작 쿼리를 고르게 분산시킵니다."""
+    base_env = _find_base_env(env)
+    n_queries = len(base_env.query_list)
+    if n_queries > 0:
+        base_env.current_query_ix = (rank * n_queries // n_envs) % n_queries
+
+
+def make_sim_vec_env(env_fn: Callable[[int], gym.Env],
+                     n_envs: int = 1,
+                     use_subproc: bool = True,
+                     start_method: Optional[str] = None) -> VecEnv:
+    """
+    Sim 환경 N개를 VecEnv로 묶습니다.
+
+    Args:
+        env_fn: rank → 래퍼까지 적용된 환경 (Monitor 로그 파일은 rank별로 분리할 것)
+        n_envs: 환경 복사본 수
+        use_subproc: True면 프로세스별 실행 (SubprocVecEnv), False면 단일 프로세스 (DummyVecEnv)
+        start_method: 멀티프로세싱 시작 방식 (None이면 가능할 때 'fork' 사용)
+
+    Returns:
+        VecEnv
+    """
+    def make_init(rank: int):
+        def _init():
+            env = env_fn(rank)
+            offset_query_cursor(env, rank, n_envs)
+            return env
+        return _init
+
+    env_fns = [make_init(rank) for rank in range(n_envs)]
+
+    if n_envs == 1 or not use_subproc:
+        return DummyVecEnv(env_fns)
+
+    if start_method is None:
+        start_method = 'fork' if 'fork' in mp.get_all_start_methods() else 'spawn'
+    return SubprocVecEnv(env_fns, start_method=start_method)
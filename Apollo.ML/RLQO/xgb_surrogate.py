@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+"""
+RLQO XGB 시뮬레이션 대리 모델 (배치 예측 + 조회 테이블)
+
+Sim 환경은 스텝마다 xgb_model.predict([features])로 1행씩 예측해 왔습니다.
+에피소드 중 특징 벡터는 (쿼리, 액션) 조합으로 정해지므로,
+환경 생성 시 모든 조합을 한 번의 predict 호출로 미리 계산하고 스텝에서는 조회만 합니다.
+
+사용법:
+    surrogate = XGBSurrogate(xgb_model)
+    surrogate.precompute({(sql, action_id): features, ...})   # 1회 배치 예측
+    predicted_time = surrogate.predict((sql, action_id))  # dict 조회
+
+증분 학습(enhanced_train.py --incremental)으로 모델 버전이 올라가면
+reload_if_newer(model_path)로 새 모델을 불러오고 조회 테이블을 비웁니다 (호출자가 다시 precompute).
+"""
+
+import json
+import os
+from typing import Dict, Hashable, List, Optional
+
+import numpy as np
+
+
+def read_model_version(model_path: str) -> Optional[int]:
+    """모델 옆 model_meta.json의 버전 (없으면 None)"""
+    meta_path = os.path.join(os.path.dirname(model_path), 'model_meta.json')
+    try:
+        with open(meta_path, 'r', encoding='utf-8') as f:
+            return json.load(f).get('version')
+    except (OSError, ValueError):
+        return None
+
+
+class XGBSurrogate:
+    """
+    (키 → 예측 실행 시간) 조회 테이블을 가진 XGB 예측기
+
+    미리 계산하지 않은 키는 1행 예측 후 테이블에 저장합니다.
+    """
+
+    def __init__(self, xgb_model, verbose: bool = False, model_version: Optional[int] = None):
+        """
+        Args:
+            xgb_model: 학습된 XGBoost 모델 (artifacts/model.joblib)
+            verbose: 로그 출력 여부
+            model_version: 모델 메타데이터 버전 (reload_if_newer 비교용)
+        """
+        self.xgb_model = xgb_model
+        self.verbose = verbose
+        self.model_version = model_version
+        self._table: Dict[Hashable, float] = {}
+        self.stats = {'precomputed': 0, 'hits': 0, 'misses': 0}
+
+    def predict_rows(self, rows: List[np.ndarray]) -> np.ndarray:
+        """여러 특징 벡터를 한 번의 predict 호출로 예측합니다."""
+        X = np.asarray(np.vstack(rows), dtype=np.float32)
+        return np.asarray(self.xgb_model.predict(X), dtype=np.float64)
+
+    def precompute(self, keyed_features: Dict[Hashable, np.ndarray]) -> int:
+        """
+        키별 특징 벡터를 배치로 예측해 조회 테이블을 채웁니다.
+
+        Returns:
+            새로 계산한 항목 수
+        """
+        keys = [key for key in keyed_features if key not in self._table]
+        if not keys:
+            return 0
+
+        predictions = self.predict_rows([keyed_features[key] for key in keys])
+        for key, value in zip(keys, predictions):
+            self._table[key] = float(value)
+
+        self.stats['precomputed'] += len(keys)
+        if self.verbose:
+            print(f"[SURROGATE] {len(keys)}개 (쿼리, 액션) 조합 배치 예측 완료")
+        return len(keys)
+
+    def predict(self, key: Hashable, features: Optional[np.ndarray] = None) -> float:
+        """
+        조회 테이블에서 예측값을 반환합니다 (없으면 1행 예측 후 저장).
+
+        Args:
+            key: 조회 키 (예: (sql, action_id))
+            features: 테이블에 없을 때 예측할 특징 벡터 (키가 있으면 생략 가능)
+        """
+        value = self._table.get(key)
+        if value is not None:
+            self.stats['hits'] += 1
+            return value
+
+        if features is None:
+            raise KeyError(f"미리 계산되지 않은 키입니다: {key}")
+        self.stats['misses'] += 1
+        value = float(self.predict_rows([features])[0])
+        self._table[key] = value
+        return value
+
+    def export_table(self) -> Dict[Hashable, float]:
+        """조회 테이블 사본을 반환합니다 (병렬 환경 복사본에 전달용)."""
+        return dict(self._table)
+
+    def load_table(self, table: Dict[Hashable, float]):
+        """다른 프로세스에서 계산한 조회 테이블을 가져옵니다."""
+        self._table.update(table)
+        self.stats['precomputed'] += len(table)
+
+    def reload_if_newer(self, model_path: str) -> bool:
+        """
+        메타데이터 버전이 바뀌었으면 모델을 다시 불러오고 조회 테이블을 비웁니다.
+
+        Returns:
+            새 모델을 불러왔는지 여부
+        """
+        version = read_model_version(model_path)
+        if version is None or version == self.model_version:
+            return False
+
+        import joblib
+        self.xgb_model = joblib.load(model_path)
+        self.model_version = version
+        self._table.clear()
+        if self.verbose:
+            print(f"[SURROGATE] 새 모델 v{version} 로드: {model_path}")
+        return True
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._table
+
+    def __len__(self) -> int:
+        return len(self._table)
+
+    def print_stats(self):
+        """조회 통계 출력"""
+        total = self.stats['hits'] + self.stats['misses']
+        hit_rate = self.stats['hits'] / total if total > 0 else 0.0
+        print(f"[SURROGATE] Precomputed: {self.stats['precomputed']}, "
+              f"Hits: {self.stats['hits']}, Misses: {self.stats['misses']} ({hit_rate:.1%} hit)")
@@ -4,9 +4,13 @@
 다양한 회귀 평가 메트릭과 분석 기능을 제공합니다.
 """
 
+import argparse
+import os
 import pandas as pd
 import numpy as np
 import joblib
+from joblib import Parallel, delayed
+from sklearn.base import clone
 import matplotlib.pyplot as plt
 import seaborn as sns
 from sklearn.metrics import (
@@ -14,12 +18,16 @@ from sklearn.metrics import (
     mean_absolute_percentage_error, median_absolute_error,
     explained_variance_score, max_error
 )
-from sklearn.model_selection import cross_val_score, TimeSeriesSplit, train_test_split
+from sklearn.model_selection import TimeSeriesSplit
 from scipy import stats
+from enhanced_train import load_train_split, split_holdout
 import warnings
 warnings.filterwarnings('ignore')
 
-def load_model_and_data():
+# 교차 검증 out-of-fold 예측 (generate_charts.py가 읽음)
+OOF_PREDICTIONS_PATH = 'artifacts/cv_oof_predictions.parquet'
+
+def load_model_and_data(config_path: str = 'config.yaml'):
     """저장된 모델과 데이터를 로드합니다."""
     try:
         model = joblib.load('artifacts/model.joblib')
@@ -41,9 +49,10 @@ def load_model_and_data():
         
         feature_importance = pd.read_csv('artifacts/model_importance.csv')
         
-        # 훈련 시와 동일한 분할 적용 (random_state=42)
-        X_train, X_val, y_train, y_val = train_test_split(
-            X_processed, y_processed, test_size=0.2, random_state=42
+        # 훈련 시와 동일한 분할 적용 (config.yaml의 train 섹션)
+        test_size, random_state = load_train_split(config_path)
+        X_train, X_val, y_train, y_val = split_holdout(
+            X_processed, y_processed, test_size=test_size, random_state=random_state
         )
         
         print("모델과 데이터 로드 완료")
@@ -190,21 +199,55 @@ def analyze_performance_by_ranges(y_true, y_pred):
             
             print(f"  {label}: R²={subset_r2:.4f}, MAE={subset_mae:.2f}, MAPE={subset_mape:.2f}% (n={mask.sum()})")
 
-def cross_validation_analysis(model, scaler, X, y, cv_folds=5):
-    """교차 검증을 통한 모델 안정성 분석"""
+def _fit_predict_fold(model, X, y, train_idx, val_idx):
+    """폴드 하나를 학습하고 검증 구간 예측을 반환합니다."""
+    fold_model = clone(model)
+    fold_model.fit(X[train_idx], y[train_idx])
+    return fold_model.predict(X[val_idx])
+
+def cross_validation_analysis(model, scaler, X, y, cv_folds=5, workers=1, oof_path=OOF_PREDICTIONS_PATH):
+    """
+    교차 검증을 통한 모델 안정성 분석
+
+    폴드마다 한 번만 학습하고, 저장한 out-of-fold 예측으로 모든 지표를 계산합니다.
+
+    Args:
+        workers: 동시에 학습할 폴드 수 (-1이면 CPU 코어 수)
+        oof_path: out-of-fold 예측 저장 경로 (None이면 저장 안 함)
+    """
     
     print(f"\n=== 교차 검증 분석 ({cv_folds}-fold) ===")
     
     # 데이터 스케일링
     X_scaled = scaler.transform(X)
+    y_values = np.asarray(y, dtype=float)
     
     # 시계열 분할 (데이터가 시간순으로 정렬되어 있다고 가정)
     tscv = TimeSeriesSplit(n_splits=cv_folds)
+    splits = list(tscv.split(X_scaled))
     
-    # R² 점수 계산
-    r2_scores = cross_val_score(model, X_scaled, y, cv=tscv, scoring='r2')
-    mse_scores = -cross_val_score(model, X_scaled, y, cv=tscv, scoring='neg_mean_squared_error')
-    mae_scores = -cross_val_score(model, X_scaled, y, cv=tscv, scoring='neg_mean_absolute_error')
+    # 폴드 병렬 학습 시 XGB 내부 스레드를 나눠 과다 구독 방지
+    fold_model = clone(model)
+    n_parallel = min(os.cpu_count() or 1, len(splits)) if workers == -1 else max(1, min(workers, len(splits)))
+    if n_parallel > 1 and 'n_jobs' in fold_model.get_params():
+        fold_model.set_params(n_jobs=max(1, (os.cpu_count() or 1) // n_parallel))
+    
+    fold_preds = Parallel(n_jobs=n_parallel)(
+        delayed(_fit_predict_fold)(fold_model, X_scaled, y_values, train_idx, val_idx)
+        for train_idx, val_idx in splits
+    )
+    
+    # out-of-fold 예측 (첫 구간은 어떤 폴드의 검증에도 들어가지 않으므로 NaN)
+    oof_pred = np.full(len(y_values), np.nan)
+    oof_fold = np.full(len(y_values), -1)
+    r2_scores, mse_scores, mae_scores = [], [], []
+    for fold, ((_, val_idx), pred) in enumerate(zip(splits, fold_preds)):
+        oof_pred[val_idx] = pred
+        oof_fold[val_idx] = fold
+        r2_scores.append(r2_score(y_values[val_idx], pred))
+        mse_scores.append(mean_squared_error(y_values[val_idx], pred))
+        mae_scores.append(mean_absolute_error(y_values[val_idx], pred))
+    r2_scores, mse_scores, mae_scores = np.array(r2_scores), np.array(mse_scores), np.array(mae_scores)
     
     print(f"R² 점수: {r2_scores.mean():.4f} ± {r2_scores.std():.4f}")
     print(f"RMSE: {np.sqrt(mse_scores.mean()):.2f} ± {np.sqrt(mse_scores.std()):.2f}")
@@ -221,11 +264,22 @@ def cross_validation_analysis(model, scaler, X, y, cv_folds=5):
     
     print(f"안정성: {stability} (CV std: {cv_std:.4f})")
     
+    oof = pd.DataFrame({
+        'row': np.arange(len(y_values)),
+        'fold': oof_fold,
+        'y_true': y_values,
+        'y_pred': oof_pred,
+    })
+    if oof_path is not None:
+        oof[oof['fold'] >= 0].to_parquet(oof_path, index=False)
+        print(f"out-of-fold 예측 저장: {oof_path}")
+    
     return {
         'r2_scores': r2_scores,
         'mse_scores': mse_scores,
         'mae_scores': mae_scores,
-        'cv_std': cv_std
+        'cv_std': cv_std,
+        'oof_predictions': oof
     }
 
 def analyze_feature_importance(feature_importance, top_n=15):
@@ -366,11 +420,17 @@ def print_sample_predictions(y_true, y_pred, X_val, n_samples=20):
 
 def main():
     """메인 실행 함수"""
+    parser = argparse.ArgumentParser(description="Apollo.ML 회귀 모델 평가")
+    parser.add_argument("--config", default="config.yaml", help="config.yaml 파일 경로 (기본값: config.yaml)")
+    parser.add_argument("--cv-folds", type=int, default=5, help="교차 검증 폴드 수 (기본값: 5)")
+    parser.add_argument("--cv-workers", type=int, default=-1,
+                        help="동시에 학습할 폴드 수 (기본값: -1, CPU 코어 수)")
+    args = parser.parse_args()
     
     print("=== 회귀 모델 평가 시작 ===")
     
     # 모델과 데이터 로드 (훈련/검증 분할 포함)
-    model, scaler, X_train, X_val, y_train, y_val, feature_importance = load_model_and_data()
+    model, scaler, X_train, X_val, y_train, y_val, feature_importance = load_model_and_data(args.config)
     
     if model is None:
         print("❌ 모델 로드 실패. 먼저 enhanced_train.py를 실행하세요.")
@@ -410,7 +470,8 @@ def main():
     analyze_performance_by_ranges(y_val, y_pred_val)
     
     # 교차 검증 분석 (훈련 데이터 기준)
-    cv_results = cross_validation_analysis(model, scaler, X_train, y_train)
+    cv_results = cross_validation_analysis(model, scaler, X_train, y_train,
+                                           cv_folds=args.cv_folds, workers=args.cv_workers)
     
     # 피처 중요도 분석
     analyze_feature_importance(feature_importance)
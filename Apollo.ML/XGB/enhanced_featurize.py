@@ -5,13 +5,69 @@
 """
 
 import argparse
+import os
+import shutil
+import tempfile
+import time
 import pandas as pd
 from pathlib import Path
 from config import load_config
 import numpy as np
 import networkx as nx
+import pyarrow as pa
+import pyarrow.parquet as pq
 from collections import Counter
-from plan_graph import planxml_to_graph
+from multiprocessing import Pool
+from plan_graph import OP_NAMES, PlanTree, planxml_to_tree
+from plan_tree_metrics import tree_metrics
+from plan_feature_store import PlanFeatureStore, plan_fingerprint
+
+# 피처 컬럼 순서와 타입 (graph → cost → operator → index → derived 순, 청크마다 같은 스키마로 기록)
+FEATURE_SCHEMA = [
+    # graph_basic_features
+    ("num_nodes", pa.int64()), ("num_edges", pa.int64()),
+    ("avg_out_degree", pa.float64()), ("max_out_degree", pa.int64()),
+    ("avg_in_degree", pa.float64()), ("max_in_degree", pa.int64()),
+    ("density", pa.float64()), ("is_connected", pa.bool_()),
+    ("num_components", pa.int64()), ("diameter", pa.int64()),
+    ("avg_clustering", pa.float64()), ("tree_depth", pa.int64()), ("avg_tree_depth", pa.float64()),
+    ("num_leaves", pa.int64()), ("max_fanout", pa.int64()), ("avg_fanout", pa.float64()), ("tree_diameter", pa.int64()),
+    # cost_features
+    ("total_estimated_cost", pa.float64()), ("avg_estimated_cost", pa.float64()),
+    ("max_estimated_cost", pa.float64()), ("total_io_cost", pa.float64()),
+    ("total_cpu_cost", pa.float64()), ("total_rows", pa.float64()),
+    ("avg_rows", pa.float64()), ("max_rows", pa.float64()), ("cost_per_row", pa.float64()),
+    # operator_features
+    ("num_physical_ops", pa.int64()), ("num_logical_ops", pa.int64()),
+    ("unique_physical_ops", pa.int64()), ("unique_logical_ops", pa.int64()),
+    ("scan_ops_count", pa.int64()), ("join_ops_count", pa.int64()),
+    ("sort_ops_count", pa.int64()), ("aggregate_ops_count", pa.int64()),
+    ("parallel_ops_ratio", pa.float64()), ("join_to_scan_ratio", pa.float64()),
+    # index_features
+    ("index_ops_count", pa.int64()), ("unique_index_kinds", pa.int64()),
+    ("clustered_index_ops", pa.int64()), ("nonclustered_index_ops", pa.int64()),
+    ("index_scan_ops", pa.int64()), ("index_seek_ops", pa.int64()),
+    # derived_features
+    ("is_frequent_query", pa.int64()), ("estimated_cpu_per_cost", pa.float64()),
+    ("cpu_per_avg_ms", pa.float64()), ("reads_per_avg_ms", pa.float64()),
+    ("memory_intensive", pa.int64()), ("is_parallel", pa.int64()),
+    ("complexity_score", pa.float64()), ("cost_x_complexity", pa.float64()),
+    ("reads_x_cpu", pa.float64()), ("is_large_plan", pa.int64()),
+]
+FEATURE_COLUMNS = [name for name, _ in FEATURE_SCHEMA]
+
+# derived_features가 참조하는 행 컬럼
+DERIVED_INPUT_COLUMNS = ["plan_xml", "count_exec", "avg_ms", "last_cpu_ms", "last_reads", "max_used_mem_kb", "max_dop"]
+
+# 피처 저장소 namespace (graph/cost/operator/index 피처 계산 방식이 바뀌면 올릴 것)
+PLAN_FEATURE_NAMESPACE = "enhanced_v1"
+
+# plan_xml이 없는 행의 지문 자리 키 (빈 트리 피처를 공유, 저장소에는 기록하지 않음)
+# None은 DataFrame/Arrow를 거치며 NaN으로 바뀌어 dict 키로 쓸 수 없으므로 SHA-1 hex와 겹치지 않는 문자열 사용
+NULL_PLAN_KEY = "<null-plan>"
+
+# 단계별 소요 시간 집계 키 (parse~index는 고유 계획당 1회, derived는 행마다)
+PLAN_TIMING_STAGES = ["parse", "graph", "cost", "operator", "index"]
 
 def get_tree_depth(g: nx.DiGraph) -> (int, float):
     """실행 계획 트리의 깊이와 평균 깊이를 계산합니다."""
@@ -29,34 +85,35 @@ def get_tree_depth(g: nx.DiGraph) -> (int, float):
              return 0, 0.0 # 순환이 있으면 깊이를 0으로 처리
         
     all_path_lengths = []
-    leaf_nodes = [n for n, d in g.out_degree() if d == 0]
+    leaf_nodes = {n for n, d in g.out_degree() if d == 0}
     
+    # 루트마다 BFS 한 번으로 도달 가능한 모든 리프까지의 최단 거리 (루트 × 리프 쌍별 탐색 대신)
     for root in root_nodes:
-        for leaf in leaf_nodes:
-            if nx.has_path(g, root, leaf):
-                all_path_lengths.append(nx.shortest_path_length(g, root, leaf))
+        for node, length in nx.single_source_shortest_path_length(g, root).items():
+            if node in leaf_nodes:
+                all_path_lengths.append(length)
     
     return max(all_path_lengths) if all_path_lengths else 0, np.mean(all_path_lengths) if all_path_lengths else 0.0
 
-def _get_node_attributes(g, attribute_name, default_value=0):
-    return [attrs.get(attribute_name, default_value) for _, attrs in g.nodes(data=True)]
+# 연산자 분류 플래그 (OP_NAMES 코드 → bool), 어휘가 늘어나면 다시 계산
+_OP_FLAG_CACHE = {}
 
-def graph_basic_features(g: nx.DiGraph) -> dict:
-    """기본 그래프 통계 특성들을 추출합니다."""
-    num_nodes = g.number_of_nodes()
-    if num_nodes == 0:
-        return {
-            "num_nodes": 0, "num_edges": 0, "avg_out_degree": 0.0, "max_out_degree": 0,
-            "avg_in_degree": 0.0, "max_in_degree": 0, "density": 0.0, "is_connected": False,
-            "num_components": 0, "diameter": 0, "avg_clustering": 0.0, "tree_depth": 0, "avg_tree_depth": 0.0
-        }
-    
+def _op_flags(*keywords) -> np.ndarray:
+    """연산자 코드별로 이름(소문자)에 keywords 중 하나가 들어있는지 여부"""
+    flags = _OP_FLAG_CACHE.get(keywords)
+    if flags is None or len(flags) < len(OP_NAMES):
+        flags = np.array([any(k in name.lower() for k in keywords) for name in OP_NAMES], dtype=bool)
+        _OP_FLAG_CACHE[keywords] = flags
+    return flags
+
+def _graph_basic_features_nx(g: nx.DiGraph) -> dict:
+    """기본 그래프 통계 (순환이 있는 계획용, networkx 사용)"""
     out_degrees = list(dict(g.out_degree()).values())
     in_degrees = list(dict(g.in_degree()).values())
     max_depth, avg_depth = get_tree_depth(g)
     
     return {
-        "num_nodes": num_nodes,
+        "num_nodes": g.number_of_nodes(),
         "num_edges": g.number_of_edges(),
         "avg_out_degree": np.mean(out_degrees),
         "max_out_degree": max(out_degrees) if out_degrees else 0,
@@ -71,67 +128,109 @@ def graph_basic_features(g: nx.DiGraph) -> dict:
         "avg_tree_depth": avg_depth
     }
 
-def cost_features(g: nx.DiGraph) -> dict:
+def graph_basic_features(tree: PlanTree) -> dict:
+    """기본 그래프 통계 특성들을 추출합니다."""
+    num_nodes = tree.num_nodes
+    if num_nodes == 0:
+        return {
+            "num_nodes": 0, "num_edges": 0, "avg_out_degree": 0.0, "max_out_degree": 0,
+            "avg_in_degree": 0.0, "max_in_degree": 0, "density": 0.0, "is_connected": False,
+            "num_components": 0, "diameter": 0, "avg_clustering": 0.0, "tree_depth": 0, "avg_tree_depth": 0.0,
+            "num_leaves": 0, "max_fanout": 0, "avg_fanout": 0.0, "tree_diameter": 0
+        }
+    
+    shape = tree_metrics(tree)
+    if not tree.is_forest:
+        features = _graph_basic_features_nx(tree.to_networkx())
+    else:
+        out_degrees = tree.out_degree()
+        in_degrees = tree.in_degree()
+        num_edges = tree.num_edges
+        # 숲(forest)에서는 루트 수 = 약연결 요소 수
+        num_components = num_nodes - num_edges
+        
+        features = {
+            "num_nodes": num_nodes,
+            "num_edges": num_edges,
+            "avg_out_degree": np.mean(out_degrees),
+            "max_out_degree": int(out_degrees.max()),
+            "avg_in_degree": np.mean(in_degrees),
+            "max_in_degree": int(in_degrees.max()),
+            "density": num_edges / (num_nodes * (num_nodes - 1)) if num_nodes > 1 else 0,
+            "is_connected": num_components == 1,
+            "num_components": num_components,
+            "diameter": 0,  # 강한 연결은 노드가 1개일 때뿐이고 그때 지름은 0
+            "avg_clustering": 0.0,  # 트리에는 삼각형이 없음
+            "tree_depth": shape["max_depth"],
+            "avg_tree_depth": shape["mean_leaf_depth"]
+        }
+    
+    features.update({
+        "num_leaves": shape["num_leaves"],
+        "max_fanout": shape["max_fanout"],
+        "avg_fanout": shape["avg_fanout"],
+        "tree_diameter": shape["diameter"]
+    })
+    return features
+
+def cost_features(tree: PlanTree) -> dict:
     """비용 관련 특성들을 추출합니다."""
-    if g.number_of_nodes() == 0: return { "total_estimated_cost": 0.0, "avg_estimated_cost": 0.0, "max_estimated_cost": 0.0, "total_io_cost": 0.0, "total_cpu_cost": 0.0, "total_rows": 0.0, "avg_rows": 0.0, "max_rows": 0.0, "cost_per_row": 0.0 }
+    if tree.num_nodes == 0: return { "total_estimated_cost": 0.0, "avg_estimated_cost": 0.0, "max_estimated_cost": 0.0, "total_io_cost": 0.0, "total_cpu_cost": 0.0, "total_rows": 0.0, "avg_rows": 0.0, "max_rows": 0.0, "cost_per_row": 0.0 }
 
-    costs = _get_node_attributes(g, 'EstimatedTotalSubtreeCost')
-    rows = _get_node_attributes(g, 'EstimateRows')
-    total_cost = sum(costs)
-    total_rows = sum(rows)
+    total_cost = tree.cost.sum()
+    total_rows = tree.rows.sum()
 
     return {
         "total_estimated_cost": total_cost,
-        "avg_estimated_cost": np.mean(costs),
-        "max_estimated_cost": max(costs),
-        "total_io_cost": sum(_get_node_attributes(g, 'EstimateIO')),
-        "total_cpu_cost": sum(_get_node_attributes(g, 'EstimateCPU')),
+        "avg_estimated_cost": tree.cost.mean(),
+        "max_estimated_cost": tree.cost.max(),
+        "total_io_cost": tree.io.sum(),
+        "total_cpu_cost": tree.cpu.sum(),
         "total_rows": total_rows,
-        "avg_rows": np.mean(rows),
-        "max_rows": max(rows),
+        "avg_rows": tree.rows.mean(),
+        "max_rows": tree.rows.max(),
         "cost_per_row": total_cost / total_rows if total_rows > 0 else 0.0
     }
 
-def operator_features(g: nx.DiGraph) -> dict:
+def operator_features(tree: PlanTree) -> dict:
     """연산자 관련 특성들을 추출합니다."""
-    if g.number_of_nodes() == 0: return { "num_physical_ops": 0, "num_logical_ops": 0, "unique_physical_ops": 0, "unique_logical_ops": 0, "scan_ops_count": 0, "join_ops_count": 0, "sort_ops_count": 0, "aggregate_ops_count": 0, "parallel_ops_ratio": 0.0, "join_to_scan_ratio": 0.0 }
+    num_nodes = tree.num_nodes
+    if num_nodes == 0: return { "num_physical_ops": 0, "num_logical_ops": 0, "unique_physical_ops": 0, "unique_logical_ops": 0, "scan_ops_count": 0, "join_ops_count": 0, "sort_ops_count": 0, "aggregate_ops_count": 0, "parallel_ops_ratio": 0.0, "join_to_scan_ratio": 0.0 }
 
-    physical_ops = _get_node_attributes(g, 'PhysicalOp', '')
-    logical_ops = _get_node_attributes(g, 'LogicalOp', '')
+    physical_ops = tree.physical_op
     
-    scan_ops = sum(1 for op in physical_ops if 'scan' in op.lower() or 'seek' in op.lower())
-    join_ops = sum(1 for op in physical_ops if any(k in op.lower() for k in ['join', 'merge', 'hash']))
+    scan_ops = int(np.count_nonzero(_op_flags('scan', 'seek')[physical_ops]))
+    join_ops = int(np.count_nonzero(_op_flags('join', 'merge', 'hash')[physical_ops]))
 
     return {
-        "num_physical_ops": len(physical_ops),
-        "num_logical_ops": len(logical_ops),
-        "unique_physical_ops": len(set(physical_ops)),
-        "unique_logical_ops": len(set(logical_ops)),
+        "num_physical_ops": num_nodes,
+        "num_logical_ops": num_nodes,
+        "unique_physical_ops": len(np.unique(physical_ops)),
+        "unique_logical_ops": len(np.unique(tree.logical_op)),
         "scan_ops_count": scan_ops,
         "join_ops_count": join_ops,
-        "sort_ops_count": sum(1 for op in physical_ops if 'sort' in op.lower()),
-        "aggregate_ops_count": sum(1 for op in physical_ops if any(k in op.lower() for k in ['aggregate', 'stream'])),
-        "parallel_ops_ratio": sum(_get_node_attributes(g, 'Parallel', 0)) / g.number_of_nodes(),
+        "sort_ops_count": int(np.count_nonzero(_op_flags('sort')[physical_ops])),
+        "aggregate_ops_count": int(np.count_nonzero(_op_flags('aggregate', 'stream')[physical_ops])),
+        "parallel_ops_ratio": np.count_nonzero(tree.parallel) / num_nodes,
         "join_to_scan_ratio": join_ops / scan_ops if scan_ops > 0 else 0.0
     }
 
-def index_features(g: nx.DiGraph) -> dict:
+def index_features(tree: PlanTree) -> dict:
     """인덱스 관련 특성들을 추출합니다."""
-    if g.number_of_nodes() == 0: return { "index_ops_count": 0, "unique_index_kinds": 0, "clustered_index_ops": 0, "nonclustered_index_ops": 0, "index_scan_ops": 0, "index_seek_ops": 0 }
-    
-    index_kinds = _get_node_attributes(g, 'IndexKind', '')
-    scan_types = _get_node_attributes(g, 'IndexScanType', '')
+    if tree.num_nodes == 0: return { "index_ops_count": 0, "unique_index_kinds": 0, "clustered_index_ops": 0, "nonclustered_index_ops": 0, "index_scan_ops": 0, "index_seek_ops": 0 }
     
+    # IndexKind/IndexScanType은 RelOp가 아닌 하위 요소의 속성이라 노드 속성으로 수집된 적이 없음
+    # (기존 그래프에서도 모든 노드가 빈 값) → 같은 값 유지
     return {
-        "index_ops_count": len(index_kinds),
-        "unique_index_kinds": len(set(index_kinds)),
-        "clustered_index_ops": index_kinds.count('Clustered'),
-        "nonclustered_index_ops": index_kinds.count('NonClustered'),
-        "index_scan_ops": sum(1 for st in scan_types if 'scan' in st.lower()),
-        "index_seek_ops": sum(1 for st in scan_types if 'seek' in st.lower())
+        "index_ops_count": tree.num_nodes,
+        "unique_index_kinds": 1,
+        "clustered_index_ops": 0,
+        "nonclustered_index_ops": 0,
+        "index_scan_ops": 0,
+        "index_seek_ops": 0
     }
 
-def derived_features(row: pd.Series, g: nx.DiGraph, costs: dict) -> dict:
+def derived_features(row: pd.Series, plan_feats: dict) -> dict:
     """데이터 누수를 방지한 안전한 파생 피처들을 생성합니다."""
     count_exec = row.get('count_exec', 0)
     avg_ms = row.get('avg_ms', 0)
@@ -139,51 +238,242 @@ def derived_features(row: pd.Series, g: nx.DiGraph, costs: dict) -> dict:
     last_reads = row.get('last_reads', 0)
     plan_xml_len = len(str(row.get('plan_xml', '')))
     
-    complexity = (g.number_of_nodes() * 0.4 + g.number_of_edges() * 0.4 + costs['num_physical_ops'] * 0.2)
+    complexity = (plan_feats['num_nodes'] * 0.4 + plan_feats['num_edges'] * 0.4 + plan_feats['num_physical_ops'] * 0.2)
 
     return {
         'is_frequent_query': 1 if count_exec > 10 else 0,
-        'estimated_cpu_per_cost': costs['total_cpu_cost'] / costs['total_estimated_cost'] if costs['total_estimated_cost'] > 0 else 0,
+        'estimated_cpu_per_cost': plan_feats['total_cpu_cost'] / plan_feats['total_estimated_cost'] if plan_feats['total_estimated_cost'] > 0 else 0,
         'cpu_per_avg_ms': last_cpu_ms / avg_ms if avg_ms > 0 else 0,
         'reads_per_avg_ms': last_reads / avg_ms if avg_ms > 0 else 0,
         'memory_intensive': 1 if row.get('max_used_mem_kb', 0) > 10000 else 0,
         'is_parallel': 1 if row.get('max_dop', 0) > 1 else 0,
         'complexity_score': complexity,
-        'cost_x_complexity': costs['total_estimated_cost'] * complexity,
+        'cost_x_complexity': plan_feats['total_estimated_cost'] * complexity,
         'reads_x_cpu': last_reads * last_cpu_ms,
         'is_large_plan': 1 if plan_xml_len > 50000 else 0
     }
 
-def enhanced_featurize(df: pd.DataFrame, target_col: str) -> pd.DataFrame:
-    """피처 엔지니어링 파이프라인"""
-    print(f"총 {len(df)}개의 실행계획에 대한 피처 엔지니어링 시작...")
-    
+def plan_features(plan_xml) -> (dict, dict):
+    """
+    실행계획 하나의 graph/cost/operator/index 피처를 계산합니다 (행 값과 무관한 피처만).
+
+    Returns:
+        (피처 dict, 단계별 소요 시간)
+    """
+    t0 = time.perf_counter()
+    tree = planxml_to_tree(plan_xml) if pd.notna(plan_xml) else PlanTree.empty()
+    t1 = time.perf_counter()
+    graph_feats = graph_basic_features(tree)
+    t2 = time.perf_counter()
+    cost_feats = cost_features(tree)
+    t3 = time.perf_counter()
+    op_feats = operator_features(tree)
+    t4 = time.perf_counter()
+    idx_feats = index_features(tree)
+    t5 = time.perf_counter()
+
+    timings = dict(zip(PLAN_TIMING_STAGES, (t1 - t0, t2 - t1, t3 - t2, t4 - t3, t5 - t4)))
+    return {**graph_feats, **cost_feats, **op_feats, **idx_feats}, timings
+
+def _featurize_plans(plans: pd.DataFrame):
+    """
+    고유 계획들의 피처를 계산합니다.
+
+    Args:
+        plans: fingerprint, plan_xml, plan_id(오류 로그용) 컬럼
+
+    Returns:
+        ({지문: 피처 dict 또는 None(오류)}, 단계별 소요 시간)
+    """
+    timings = dict.fromkeys(PLAN_TIMING_STAGES, 0.0)
+    results = {}
+    for fingerprint, plan_xml, plan_id in zip(plans["fingerprint"], plans["plan_xml"], plans["plan_id"]):
+        try:
+            feats, plan_timings = plan_features(plan_xml)
+            for stage, elapsed in plan_timings.items():
+                timings[stage] += elapsed
+            results[fingerprint] = feats
+        except Exception as e:
+            print(f"Plan ID {plan_id} 처리 오류: {e}")
+            results[fingerprint] = None  # 오류 시 원본 데이터만 유지
+    return results, timings
+
+def _featurize_batch(task):
+    """워커: 메모리 맵 Arrow 파일에서 자기 배치만 읽어 피처를 계산합니다."""
+    arrow_path, batch_idx = task
+    with pa.memory_map(arrow_path, 'r') as source:
+        plans = pa.ipc.open_file(source).get_batch(batch_idx).to_pandas()
+    return _featurize_plans(plans)
+
+def _compute_plan_features(plans: pd.DataFrame, workers: int, chunk_size: int, timings: dict) -> dict:
+    """
+    고유 계획을 chunk_size개씩 나눠 프로세스 풀에서 계산합니다.
+
+    계획은 Arrow IPC 파일로 한 번 기록하고, 워커는 이를 메모리 맵으로 열어
+    자기 배치만 읽습니다 (행 단위 pickle 없이 OS 페이지 캐시 공유).
+    """
+    results = {}
+    n_chunks = (len(plans) + chunk_size - 1) // chunk_size
+
+    def _consume(batches):
+        for batch_results, batch_timings in batches:
+            results.update(batch_results)
+            for stage, elapsed in batch_timings.items():
+                timings[stage] += elapsed
+
+    if workers == 1 or n_chunks <= 1:
+        _consume(_featurize_plans(plans.iloc[start:start + chunk_size]) for start in range(0, len(plans), chunk_size))
+        return results
+
+    tmp_dir = tempfile.mkdtemp(prefix="apollo_featurize_")
+    try:
+        t0 = time.perf_counter()
+        arrow_path = os.path.join(tmp_dir, "plans.arrow")
+        table = pa.Table.from_pandas(plans, preserve_index=False)
+        with pa.OSFile(arrow_path, 'wb') as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                for batch in table.to_batches(max_chunksize=chunk_size):
+                    writer.write_batch(batch)
+        del table
+        timings["handoff"] += time.perf_counter() - t0
+
+        tasks = [(arrow_path, batch_idx) for batch_idx in range(n_chunks)]
+        with Pool(processes=min(workers, n_chunks)) as pool:
+            _consume(pool.imap_unordered(_featurize_batch, tasks))
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+    return results
+
+def _assemble_chunk(base: pd.DataFrame, fingerprints: list, plan_feats: dict, timings: dict) -> pd.DataFrame:
+    """
+    행별 파생 피처를 계산해 원본 컬럼 뒤에 붙입니다.
+    (이름이 겹치면 원본 위치에 피처 값, 오류 행은 원본 값 유지)
+    """
+    t0 = time.perf_counter()
+    derived_input = base[[col for col in DERIVED_INPUT_COLUMNS if col in base.columns]]
     features_list = []
-    for _, row in df.iterrows():
+    ok = np.ones(len(base), dtype=bool)
+    for i, ((_, row), fingerprint) in enumerate(zip(derived_input.iterrows(), fingerprints)):
+        feats = plan_feats.get(fingerprint)
         try:
-            g = planxml_to_graph(row["plan_xml"]) if pd.notna(row.get('plan_xml')) else nx.DiGraph()
-            
-            base_feats = row.to_dict()
-            graph_feats = graph_basic_features(g)
-            cost_feats = cost_features(g)
-            op_feats = operator_features(g)
-            idx_feats = index_features(g)
-            derived_feats = derived_features(row, g, {**cost_feats, **op_feats})
-            
-            features_list.append({
-                **base_feats, **graph_feats, **cost_feats,
-                **op_feats, **idx_feats, **derived_feats
-            })
+            if feats is None:
+                raise ValueError("실행계획 피처 계산 실패")
+            features_list.append({**feats, **derived_features(row, feats)})
         except Exception as e:
-            print(f"Plan ID {row.get('plan_id', 'N/A')} 처리 오류: {e}")
-            features_list.append(row.to_dict()) # 오류 시 원본 데이터만 추가
-            
-    return pd.DataFrame(features_list)
+            if feats is not None:
+                print(f"Plan ID {base['plan_id'].iat[i] if 'plan_id' in base.columns else 'N/A'} 처리 오류: {e}")
+            features_list.append({})  # 오류 시 원본 데이터만 유지
+            ok[i] = False
+    timings["derived"] += time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    feats_df = pd.DataFrame(features_list, columns=FEATURE_COLUMNS)
+    out = base.copy()
+    for col in FEATURE_COLUMNS:
+        if col in out.columns:
+            out[col] = feats_df[col].where(ok, out[col].values).values
+        else:
+            out[col] = feats_df[col].values
+    timings["assemble"] += time.perf_counter() - t0
+    return out
+
+def iter_featurized_chunks(df: pd.DataFrame,
+                           workers: int = None,
+                           chunk_size: int = 2000,
+                           timings: dict = None,
+                           store: PlanFeatureStore = None):
+    """
+    실행계획 프레임의 피처를 계산해 chunk_size 행씩 순서대로 반환합니다.
+
+    1. plan_xml 지문으로 고유 계획만 추림 (증강된 행은 같은 계획을 공유)
+    2. 저장소에 없는 계획만 프로세스 풀에서 계산하고 저장소에 기록
+    3. 행별 파생 피처를 붙여 청크 단위로 반환
+
+    Args:
+        df: 실행계획 데이터
+        workers: 프로세스 수 (None이면 CPU 코어 수, 1이면 현재 프로세스에서 실행)
+        chunk_size: 샤드/출력 청크 크기
+        timings: 단계별 소요 시간을 누적할 dict (선택)
+        store: 계획 피처 저장소 (None이면 이번 실행 안에서만 중복 제거)
+    """
+    workers = workers or os.cpu_count() or 1
+    timings = timings if timings is not None else {}
+    for stage in ["fingerprint", "store"] + PLAN_TIMING_STAGES + ["handoff", "derived", "assemble"]:
+        timings.setdefault(stage, 0.0)
+
+    base = df.reset_index(drop=True)
+    plan_xml = base["plan_xml"] if "plan_xml" in base.columns else pd.Series([None] * len(base))
+
+    # 1. 행별 계획 지문 (plan_xml이 없으면 빈 트리 피처를 공유하는 NULL_PLAN_KEY)
+    t0 = time.perf_counter()
+    fingerprints = [plan_fingerprint(xml) if pd.notna(xml) else NULL_PLAN_KEY for xml in plan_xml]
+    timings["fingerprint"] += time.perf_counter() - t0
+
+    first_rows = {}
+    for i, fingerprint in enumerate(fingerprints):
+        first_rows.setdefault(fingerprint, i)
+
+    # 2. 저장소 조회
+    t0 = time.perf_counter()
+    plan_feats = store.get_many(fp for fp in first_rows if fp != NULL_PLAN_KEY) if store is not None else {}
+    timings["store"] += time.perf_counter() - t0
+
+    missing = [fp for fp in first_rows if fp not in plan_feats]
+    print(f"고유 실행계획 {len(first_rows):,}개 (저장소 {len(plan_feats):,}개 재사용, 새로 계산 {len(missing):,}개)")
+
+    if missing:
+        rows = [first_rows[fp] for fp in missing]
+        plans = pd.DataFrame({
+            "fingerprint": missing,
+            "plan_xml": plan_xml.iloc[rows].values,
+            "plan_id": base["plan_id"].iloc[rows].values if "plan_id" in base.columns else ["N/A"] * len(rows),
+        })
+        computed = _compute_plan_features(plans, workers, chunk_size, timings)
+        plan_feats.update(computed)
+
+        if store is not None:
+            t0 = time.perf_counter()
+            store.put_many({fp: feats for fp, feats in computed.items() if fp != NULL_PLAN_KEY and feats is not None})
+            timings["store"] += time.perf_counter() - t0
+
+    # 3. 행 단위 조립
+    for start in range(0, len(base), chunk_size):
+        chunk = base.iloc[start:start + chunk_size].reset_index(drop=True)
+        yield _assemble_chunk(chunk, fingerprints[start:start + chunk_size], plan_feats, timings)
+
+def print_timings(timings: dict, total_elapsed: float, n_rows: int):
+    """단계별 소요 시간 출력 (parse~index는 전체 워커 CPU 시간 합계)"""
+    print("단계별 소요 시간:")
+    for stage, elapsed in timings.items():
+        print(f"  {stage:<10s} {elapsed:8.1f}s")
+    rate = n_rows / total_elapsed if total_elapsed > 0 else 0.0
+    print(f"  {'wall':<10s} {total_elapsed:8.1f}s ({rate:,.0f} plans/s)")
+
+def enhanced_featurize(df: pd.DataFrame, target_col: str, workers: int = None, chunk_size: int = 2000,
+                       store: PlanFeatureStore = None) -> pd.DataFrame:
+    """피처 엔지니어링 파이프라인"""
+    print(f"총 {len(df)}개의 실행계획에 대한 피처 엔지니어링 시작...")
+    
+    chunks = list(iter_featurized_chunks(df, workers=workers, chunk_size=chunk_size, store=store))
+    if not chunks:
+        return pd.DataFrame()
+    return pd.concat(chunks, ignore_index=True)
+
+def output_schema(df: pd.DataFrame) -> pa.Schema:
+    """출력 Parquet 스키마 (원본 컬럼 + 피처 컬럼, 이름이 겹치면 피처 타입)"""
+    feature_types = dict(FEATURE_SCHEMA)
+    base_schema = pa.Schema.from_pandas(df, preserve_index=False)
+    fields = [pa.field(field.name, feature_types.get(field.name, field.type)) for field in base_schema]
+    fields += [pa.field(name, dtype) for name, dtype in FEATURE_SCHEMA if name not in base_schema.names]
+    return pa.schema(fields)
 
 def main():
     """메인 실행 함수"""
     parser = argparse.ArgumentParser(description="Apollo.ML 피처 엔지니어링")
     parser.add_argument("--config", default="config.yaml", help="config.yaml 파일 경로")
+    parser.add_argument("--workers", type=int, default=None, help="프로세스 수 (기본값: CPU 코어 수)")
+    parser.add_argument("--chunk-size", type=int, default=2000, help="샤드 크기 (기본값: 2000행)")
+    parser.add_argument("--no-store", action="store_true", help="계획 피처 저장소를 사용하지 않고 모두 다시 계산")
     args = parser.parse_args()
     
     print("=== 피처 엔지니어링 시작 ===")
@@ -191,14 +481,34 @@ def main():
     
     input_path = Path(cfg.output_dir) / "preprocessed_data.parquet"
     df = pd.read_parquet(input_path)
-    print(f"데이터 로드 완료: {input_path} (크기: {df.shape})")
+    print(f"데이터 로드 완료: {input_path} (크기: {df.shape}, 워커 {args.workers or os.cpu_count()}개)")
     
-    df_feat = enhanced_featurize(df, cfg.train.target)
+    # 계획 지문별 피처 저장소 (이전 실행에서 계산한 계획은 다시 파싱하지 않음)
+    store = None
+    if not args.no_store:
+        store = PlanFeatureStore(path=str(Path(cfg.output_dir) / "plan_features.sqlite"),
+                                 namespace=PLAN_FEATURE_NAMESPACE)
     
+    # 청크가 끝나는 대로 Parquet에 기록 (전체 결과를 메모리에 모으지 않음)
     out_path = Path(cfg.output_dir) / "enhanced_features.parquet"
-    df_feat.to_parquet(out_path, index=False)
+    schema = output_schema(df)
+    timings = {}
+    start_time = time.perf_counter()
+    n_rows = 0
+    with pq.ParquetWriter(out_path, schema) as writer:
+        for chunk in iter_featurized_chunks(df, workers=args.workers, chunk_size=args.chunk_size,
+                                            timings=timings, store=store):
+            t0 = time.perf_counter()
+            writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+            timings["write"] = timings.get("write", 0.0) + time.perf_counter() - t0
+            n_rows += len(chunk)
+            print(f"  {n_rows:,}/{len(df):,}행 완료")
     
-    print(f"피처 엔지니어링 완료. 최종 데이터 크기: {df_feat.shape}")
+    print_timings(timings, time.perf_counter() - start_time, n_rows)
+    if store is not None:
+        store.print_stats()
+        store.close()
+    print(f"피처 엔지니어링 완료. 최종 데이터 크기: ({n_rows}, {len(schema)})")
     print(f"저장 완료: {out_path}")
     print("다음 단계: python enhanced_train.py")
 
@@ -2,41 +2,177 @@
 """
 데이터 수집 모듈
 데이터베이스에서 실행계획 데이터를 수집합니다.
+
+collected_plans 테이블(약 19만 행, plan_xml 포함)을 한 번에 읽지 않고
+청크 단위로 가져와 수집 시각(시간 단위)별로 분할된 Parquet 데이터셋에 바로 기록합니다.
+- 메모리 사용량은 청크 크기로 제한됨
+- --incremental: 마지막으로 수집한 (collected_at, query_id, plan_id) 이후 행만 추가 수집 (전체 재수집 불필요)
+  collected_at은 datetime2(7)이라 Python datetime(마이크로초)으로는 기준값이 잘리므로
+  전체 정밀도 문자열(collected_at_key)로 비교합니다.
 """
 
 import argparse
+import json
+import shutil
+import uuid
 from pathlib import Path
 from datetime import datetime  # datetime 임포트
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
 from config import load_config
-from db import connect, fetch_collected_plans
+from db import COLLECTED_AT_KEY_COLUMN, connect, iter_collected_plans
+
+# 분할 Parquet 데이터셋 (artifacts/collected_plans/collected_hour=YYYYMMDDHH/*.parquet)
+DATASET_NAME = "collected_plans"
+PARTITION_COL = "collected_hour"
+STATE_FILE = "_fetch_state.json"  # '_'로 시작하는 파일은 Parquet 데이터셋 탐색에서 제외됨
+
+# 청크마다 같은 스키마로 기록 (청크 안에서 컬럼이 전부 NULL이어도 타입 유지)
+COLLECTED_PLANS_SCHEMA = pa.schema([
+    ("collected_at", pa.timestamp("us")),
+    ("query_id", pa.int64()),
+    ("plan_id", pa.int64()),
+    ("plan_xml", pa.string()),
+    ("count_exec", pa.int64()),
+    ("est_total_subtree_cost", pa.float64()),
+    ("avg_ms", pa.float64()),
+    ("last_cpu_ms", pa.float64()),
+    ("last_reads", pa.int64()),
+    ("max_used_mem_kb", pa.int64()),
+    ("max_dop", pa.int64()),
+    ("last_exec_time", pa.timestamp("us")),
+    ("last_ms", pa.float64()),
+    (COLLECTED_AT_KEY_COLUMN, pa.string()),
+    (PARTITION_COL, pa.string()),
+])
 
 def log_message(message):
     """메시지에 타임스탬프를 추가하여 출력"""
     timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S.%f')[:-3]
     print(f"{timestamp} {message}")
 
+def _read_watermark(dataset_dir: Path):
+    """
+    데이터셋에 저장된 마지막 (collected_at_key, query_id, plan_id) 키셋
+    (상태 파일 → 없으면 키 컬럼만 스캔). 전체 정밀도 키가 없는 이전 형식 데이터셋이면 None.
+    """
+    state_path = dataset_dir / STATE_FILE
+    if state_path.exists():
+        with open(state_path, "r", encoding="utf-8") as f:
+            last_key = json.load(f).get("last_key")
+        if last_key:
+            return last_key["collected_at"], last_key["query_id"], last_key["plan_id"]
+
+    if not dataset_dir.exists():
+        return None
+    dataset = ds.dataset(dataset_dir, format="parquet", partitioning="hive")
+    if COLLECTED_AT_KEY_COLUMN not in dataset.schema.names:
+        return None
+    key_columns = [COLLECTED_AT_KEY_COLUMN, "query_id", "plan_id"]
+    keys = dataset.to_table(columns=key_columns).to_pandas().dropna(subset=[COLLECTED_AT_KEY_COLUMN])
+    if keys.empty:
+        return None
+    last = keys.sort_values(key_columns).iloc[-1]
+    return last[COLLECTED_AT_KEY_COLUMN], int(last["query_id"]), int(last["plan_id"])
+
+def _write_state(dataset_dir: Path, last_key, total_rows: int):
+    with open(dataset_dir / STATE_FILE, "w", encoding="utf-8") as f:
+        json.dump({
+            "last_key": {
+                "collected_at": last_key[0],
+                "query_id": last_key[1],
+                "plan_id": last_key[2],
+            } if last_key is not None else None,
+            "last_fetch_rows": total_rows,
+            "updated_at": datetime.now().isoformat(),
+        }, f, indent=2)
+
+def fetch_to_parquet(conn, dataset_dir: Path, chunk_size: int = 5000, since=None) -> tuple:
+    """
+    collected_plans를 청크 단위로 읽어 분할 Parquet 데이터셋에 추가 기록합니다.
+
+    Returns:
+        (기록한 행 수, 마지막 (collected_at_key, query_id, plan_id) 키셋)
+    """
+    # 이번 실행의 파일 이름 접두어 (증분 수집 시 기존 파일을 덮어쓰지 않도록)
+    run_id = uuid.uuid4().hex[:8]
+    total_rows = 0
+    last_key = None
+
+    for chunk_idx, df in enumerate(iter_collected_plans(conn, chunk_size=chunk_size, since=since)):
+        df[PARTITION_COL] = pd.to_datetime(df["collected_at"]).dt.strftime("%Y%m%d%H")
+        table = pa.Table.from_pandas(df, schema=COLLECTED_PLANS_SCHEMA, preserve_index=False)
+        pq.write_to_dataset(
+            table,
+            root_path=str(dataset_dir),
+            partition_cols=[PARTITION_COL],
+            basename_template=f"part-{run_id}-{chunk_idx:05d}-{{i}}.parquet",
+        )
+
+        total_rows += len(df)
+        # ORDER BY collected_at, query_id, plan_id 이므로 마지막 행이 다음 수집의 기준 키셋
+        last = df.iloc[-1]
+        last_key = (last[COLLECTED_AT_KEY_COLUMN], int(last["query_id"]), int(last["plan_id"]))
+        log_message(f"  청크 {chunk_idx + 1}: {len(df):,}행 기록 (누적 {total_rows:,}행, ~{last_key[0]})")
+
+    return total_rows, last_key
+
 def main():
     """메인 실행 함수"""
     parser = argparse.ArgumentParser(description="Apollo.ML 데이터 수집")
     parser.add_argument("--config", default="config.yaml", help="config.yaml 파일 경로 (기본값: config.yaml)")
+    parser.add_argument("--chunk-size", type=int, default=5000, help="한 번에 가져올 행 수 (기본값: 5000)")
+    parser.add_argument("--incremental", action="store_true",
+                        help="마지막으로 수집한 행 이후만 추가 수집 (기본값: 전체 재수집)")
     args = parser.parse_args()
-    
+
     log_message("=== 데이터 수집 시작 ===")
-    
+
     # 설정 로드
     cfg = load_config(args.config)
-    
+    dataset_dir = Path(cfg.output_dir) / DATASET_NAME
+
+    since = _read_watermark(dataset_dir) if args.incremental else None
+    if args.incremental:
+        if since:
+            log_message(f"증분 수집: (collected_at, query_id, plan_id) > {since}")
+        elif dataset_dir.exists():
+            log_message("증분 수집: 전체 정밀도 기준값이 없는 이전 형식 데이터셋 → 전체 재수집")
+        else:
+            log_message("증분 수집: 기존 데이터 없음 → 전체 수집")
+    incremental = since is not None
+
+    # 임시 디렉토리에 기록한 뒤 반영 (중간에 실패해도 기존 데이터셋은 그대로 유지)
+    staging_dir = dataset_dir.with_name(DATASET_NAME + ".tmp")
+    if staging_dir.exists():
+        shutil.rmtree(staging_dir)
+    staging_dir.mkdir(parents=True, exist_ok=True)
+
     # 데이터베이스 연결 및 데이터 수집
     with connect(cfg.db) as conn:
-        df = fetch_collected_plans(conn)
-    
-    # 결과 저장
-    out = Path(cfg.output_dir) / "collected_plans.parquet"
-    out.parent.mkdir(parents=True, exist_ok=True)
-    df.to_parquet(out, index=False)
-    
-    log_message(f"수집된 데이터 크기: {df.shape}")
-    log_message(f"저장 완료: {out}")
+        total_rows, last_key = fetch_to_parquet(conn, staging_dir, chunk_size=args.chunk_size, since=since)
+
+    if incremental:
+        # 새 파일만 기존 파티션 디렉토리로 이동
+        for path in staging_dir.rglob("*.parquet"):
+            dest = dataset_dir / path.relative_to(staging_dir)
+            dest.parent.mkdir(parents=True, exist_ok=True)
+            path.replace(dest)
+        shutil.rmtree(staging_dir)
+    else:
+        if dataset_dir.exists():
+            shutil.rmtree(dataset_dir)
+        staging_dir.rename(dataset_dir)
+
+    # 새 행이 없으면 이전 기준 키셋 유지
+    _write_state(dataset_dir, last_key or since, total_rows)
+
+    log_message(f"수집된 행 수: {total_rows:,}")
+    log_message(f"저장 완료: {dataset_dir}")
     log_message("다음 단계: python enhanced_preprocess.py")
 
 if __name__ == "__main__":
@@ -2,8 +2,16 @@
 """
 데이터 전처리 모듈
 타겟 변수 정보 누출을 방지한 안전한 전처리를 수행합니다.
+
+전처리는 단계 목록(PREPROCESS_STAGES)으로 선언하고, 각 단계가 만드는/사용하는 컬럼을 함께 적습니다.
+실행 전에 뒤에서부터 훑어 최종 피처 선택이 보존하거나 이후 단계가 사용하는 출력이 없는 단계는 건너뜁니다.
+(예: _qt/_pt 스케일링 컬럼은 피처 선택에서 모두 버려지므로 계산하지 않음)
 """
 
+import argparse
+import os
+from fnmatch import fnmatch
+import joblib
 import pandas as pd
 import numpy as np
 import networkx as nx
@@ -11,6 +19,8 @@ from datetime import datetime
 from sklearn.cluster import KMeans
 from sklearn.preprocessing import StandardScaler, QuantileTransformer, PowerTransformer
 from sklearn.impute import KNNImputer
+from sklearn.experimental import enable_iterative_imputer  # noqa: F401 (IterativeImputer 활성화)
+from sklearn.impute import IterativeImputer
 from sklearn.ensemble import IsolationForest
 from sklearn.feature_selection import SelectKBest, f_regression, RFE
 from xgboost import XGBRegressor
@@ -18,49 +28,110 @@ from scipy.stats import boxcox
 import warnings
 warnings.filterwarnings('ignore')
 
-def preprocess_data():
-    """메인 전처리 함수"""
+# 피처 선택에서 버리는 컬럼 패턴 (변환된 피처)
+SELECTION_DROP_PATTERNS = ['*_qt', '*_pt']
+
+# 학습된 전처리 변환기 저장 위치 (추론 시 같은 변환 재사용)
+TRANSFORMERS_PATH = 'artifacts/preprocess_transformers.joblib'
+
+# 결측값 대체 방식
+# - knn: 전체 행 KNN (행 수의 제곱에 비례, 작은 데이터용)
+# - knn_sampled: 표본 참조 집합에 대한 KNN (결측 행만 배치로 대체)
+# - group_median: query_id별 중앙값 (없으면 전체 중앙값)
+# - iterative: 표본 행으로 학습한 IterativeImputer
+# - auto: EXACT_KNN_MAX_ROWS 이하면 knn, 넘으면 knn_sampled
+IMPUTATION_STRATEGIES = ['auto', 'knn', 'knn_sampled', 'group_median', 'iterative']
+EXACT_KNN_MAX_ROWS = 20000
+IMPUTE_REFERENCE_ROWS = 20000  # knn_sampled/iterative 학습 표본 크기
+IMPUTE_BATCH_ROWS = 5000       # 한 번에 대체하는 결측 행 수 (메모리 상한)
+
+def is_selected_column(col: str) -> bool:
+    """피처 선택 후에도 남는 컬럼 이름(또는 패턴)인지 여부"""
+    return not any(fnmatch(col, pattern) for pattern in SELECTION_DROP_PATTERNS)
+
+class PreprocessStage:
+    """
+    전처리 단계 선언
+
+    Args:
+        name: 단계 이름 (로그용)
+        fn: fn(df, y, fitted) -> (df, y)
+        outputs: 새로 만드는 컬럼 이름/패턴 (None이면 행/값을 바꾸는 단계 → 항상 실행)
+        inputs: 이 단계가 읽는 컬럼 (앞 단계 출력이 필요한지 판단용)
+    """
+
+    def __init__(self, name, fn, outputs=None, inputs=()):
+        self.name = name
+        self.fn = fn
+        self.outputs = outputs
+        self.inputs = list(inputs)
+
+    def is_needed(self, consumed: set) -> bool:
+        if self.outputs is None:
+            return True
+        return any(is_selected_column(col) or any(fnmatch(c, col) for c in consumed) for col in self.outputs)
+
+def plan_stages(stages):
+    """
+    실행할 단계만 추립니다.
+    뒤에서부터 훑으며, 출력이 피처 선택에서 살아남거나 뒤 단계가 읽는 단계만 남깁니다.
+    """
+    consumed = set()
+    needed = []
+    for stage in reversed(stages):
+        if stage.is_needed(consumed):
+            needed.append(stage)
+            consumed.update(stage.inputs)
+    return list(reversed(needed))
+
+def run_stages(stages, df, y, fitted=None):
+    """계획된 단계만 실행합니다 (학습된 변환기는 fitted에 모음)."""
+    fitted = fitted if fitted is not None else {}
+    planned = plan_stages(stages)
+    for i, stage in enumerate(stages, start=1):
+        if stage not in planned:
+            print(f"\n{i}. {stage.name}... (건너뜀: 사용하는 출력 없음)")
+            continue
+        print(f"\n{i}. {stage.name}...")
+        df, y = stage.fn(df, y, fitted)
+    return df, y, fitted
+
+def preprocess_data(imputer: str = 'auto', impute_check_rows: int = 0):
+    """
+    메인 전처리 함수
+
+    Args:
+        imputer: 결측값 대체 방식 (IMPUTATION_STRATEGIES)
+        impute_check_rows: 정확한 KNN 결과와 비교할 결측 행 표본 크기 (0이면 비교 안 함)
+    """
     
     print("=== 데이터 전처리 시작 ===")
     
-    # 1. 원본 데이터 로드
-    df = pd.read_parquet("artifacts/collected_plans.parquet")
+    # 1. 원본 데이터 로드 (분할 Parquet 데이터셋, 없으면 예전 단일 파일)
+    # collected_at_key(수집 시각 전체 정밀도 문자열)는 행 식별자로 피처 파일까지 보존 (증분 학습 기준)
+    if os.path.isdir("artifacts/collected_plans"):
+        df = pd.read_parquet("artifacts/collected_plans")
+        df = df.drop(columns=['collected_hour', 'collected_at'], errors='ignore')
+    else:
+        df = pd.read_parquet("artifacts/collected_plans.parquet")
     print(f"원본 데이터 크기: {df.shape}")
     
     # 2. 타겟 변수 분리 (가장 먼저!)
-    print("\n1. 타겟 변수 분리...")
+    print("\n0. 타겟 변수 분리...")
     y = df['last_ms'].copy()
     # plan_xml 컬럼은 피처 엔지니어링에서 필요하므로 보존
     df_features = df.drop(['last_ms'], axis=1)
+    del df
     
-    # 3. 이상치 처리 (타겟 변수 정보 누출 방지)
-    print("\n2. 이상치 처리 (타겟 변수 정보 누출 방지)...")
-    df_clean, y = improved_outlier_handling_safe(df_features, y)
-    
-    # 4. 결측값 처리 (타겟 변수 제외)
-    print("\n3. 결측값 처리 (타겟 변수 제외)...")
-    df_clean = improved_missing_value_handling_safe(df_clean)
-    
-    # 5. 안전한 피처 엔지니어링 (타겟 변수 제외)
-    print("\n4. 안전한 피처 엔지니어링...")
-    df_clean = add_safe_domain_features(df_clean)
-    
-    # 6. 안전한 클러스터링 (타겟 변수 제외)
-    print("\n5. 안전한 클러스터링...")
-    df_clean = add_safe_clustering_features(df_clean)
-    
-    # 7. 피처 정규화
-    print("\n6. 피처 정규화...")
-    df_clean = improved_feature_scaling(df_clean)
+    # 3. 선언된 단계 중 결과가 쓰이는 단계만 실행
+    stages = build_preprocess_stages(imputer=imputer, impute_check_rows=impute_check_rows)
+    df_clean, y, fitted = run_stages(stages, df_features, y)
     
-    # 8. 피처 선택
-    print("\n7. 피처 선택...")
-    df_clean = safe_feature_selection(df_clean, y)
-    
-    # 9. 최종 데이터 저장
-    print("\n8. 전처리된 데이터 저장...")
+    # 4. 최종 데이터 저장
+    print("\n전처리된 데이터 저장...")
     df_clean['last_ms'] = y  # 타겟 변수 다시 추가
     df_clean.to_parquet('artifacts/preprocessed_data.parquet', index=False)
+    joblib.dump(fitted, TRANSFORMERS_PATH)
     
     print(f"전처리 완료! 최종 데이터 크기: {df_clean.shape}")
     print(f"저장 위치: artifacts/preprocessed_data.parquet")
@@ -159,8 +230,107 @@ def improved_outlier_handling_safe(df_features, y):
     
     return df_features_clean, y_clean
 
-def improved_missing_value_handling_safe(df):
-    """타겟 변수 제외한 결측값 처리"""
+def _sample_rows(n_rows: int, size: int, seed: int = 42) -> np.ndarray:
+    """정렬된 표본 행 인덱스 (n_rows 이하면 전체)"""
+    if n_rows <= size:
+        return np.arange(n_rows)
+    return np.sort(np.random.default_rng(seed).choice(n_rows, size, replace=False))
+
+def _fill_empty_columns(X: np.ndarray, fill_values: np.ndarray) -> np.ndarray:
+    """모두 결측인 열을 채움 (sklearn 대체기는 이런 열을 출력에서 빼버림)"""
+    empty = np.isnan(X).all(axis=0)
+    if empty.any():
+        X = X.copy()
+        X[:, empty] = fill_values[empty]
+    return X
+
+def _transform_missing_rows(imputer, X: np.ndarray, batch_rows: int = IMPUTE_BATCH_ROWS) -> np.ndarray:
+    """결측이 있는 행만 batch_rows개씩 대체합니다."""
+    out = X.copy()
+    rows = np.flatnonzero(np.isnan(X).any(axis=1))
+    for start in range(0, len(rows), batch_rows):
+        batch = rows[start:start + batch_rows]
+        out[batch] = imputer.transform(X[batch])
+    return out
+
+def _fit_reference_imputer(imputer, X: np.ndarray, reference_rows: int):
+    """표본 참조 집합으로 대체기를 학습합니다."""
+    reference = X[_sample_rows(len(X), reference_rows)]
+    global_medians = np.nan_to_num(np.nanmedian(X, axis=0))
+    return imputer.fit(_fill_empty_columns(reference, global_medians))
+
+def impute_knn(df: pd.DataFrame, cols: list) -> np.ndarray:
+    """전체 행 KNN 대체 (기존 방식)"""
+    return KNNImputer(n_neighbors=5).fit_transform(df[cols])
+
+def impute_knn_sampled(df: pd.DataFrame, cols: list, reference_rows: int = IMPUTE_REFERENCE_ROWS) -> np.ndarray:
+    """표본 참조 집합에서 이웃을 찾는 근사 KNN 대체"""
+    X = df[cols].to_numpy(dtype=float)
+    imputer = _fit_reference_imputer(KNNImputer(n_neighbors=5), X, reference_rows)
+    return _transform_missing_rows(imputer, X)
+
+def impute_group_median(df: pd.DataFrame, cols: list, group_col: str = 'query_id') -> np.ndarray:
+    """query_id별 중앙값 대체 (그룹 값이 없으면 전체 중앙값)"""
+    values = df[cols].astype(float)
+    if group_col in df.columns:
+        values = values.fillna(values.groupby(df[group_col]).transform('median'))
+    return values.fillna(values.median()).to_numpy()
+
+def impute_iterative(df: pd.DataFrame, cols: list, reference_rows: int = IMPUTE_REFERENCE_ROWS) -> np.ndarray:
+    """표본 행으로 학습한 IterativeImputer로 대체"""
+    X = df[cols].to_numpy(dtype=float)
+    imputer = _fit_reference_imputer(IterativeImputer(max_iter=10, random_state=42), X, reference_rows)
+    return _transform_missing_rows(imputer, X)
+
+IMPUTERS = {
+    'knn': impute_knn,
+    'knn_sampled': impute_knn_sampled,
+    'group_median': impute_group_median,
+    'iterative': impute_iterative,
+}
+
+def resolve_imputation_strategy(strategy: str, n_rows: int) -> str:
+    if strategy not in IMPUTATION_STRATEGIES:
+        raise ValueError(f"알 수 없는 결측값 대체 방식: {strategy} (가능: {IMPUTATION_STRATEGIES})")
+    if strategy == 'auto':
+        return 'knn' if n_rows <= EXACT_KNN_MAX_ROWS else 'knn_sampled'
+    return strategy
+
+def compare_with_exact_knn(df: pd.DataFrame, cols: list, imputed: np.ndarray, sample_rows: int = 2000) -> pd.DataFrame:
+    """
+    결측 행 표본에서 대체값을 정확한 KNN 결과(전체 행 기준)와 비교합니다.
+
+    Returns:
+        컬럼별 대체 셀 수, 평균 절대 차이, 평균 상대 차이
+    """
+    X = df[cols].to_numpy(dtype=float)
+    missing_rows = np.flatnonzero(np.isnan(X).any(axis=1))
+    if len(missing_rows) == 0:
+        return pd.DataFrame(columns=['imputed_cells', 'mae', 'mean_rel_diff'])
+    sample = missing_rows[_sample_rows(len(missing_rows), sample_rows)]
+
+    # 전체 행을 이웃 후보로 두고 표본 행만 변환 (표본 크기 × 전체 행 비용)
+    exact = _transform_missing_rows(KNNImputer(n_neighbors=5).fit(X), X[sample])
+    approx = imputed[sample]
+    mask = np.isnan(X[sample])
+
+    rows = {}
+    for j, col in enumerate(cols):
+        if not mask[:, j].any():
+            continue
+        diff = np.abs(approx[mask[:, j], j] - exact[mask[:, j], j])
+        scale = np.abs(exact[mask[:, j], j]) + 1e-6
+        rows[col] = {'imputed_cells': int(mask[:, j].sum()), 'mae': diff.mean(), 'mean_rel_diff': (diff / scale).mean()}
+    return pd.DataFrame.from_dict(rows, orient='index')
+
+def improved_missing_value_handling_safe(df, strategy: str = 'knn', check_rows: int = 0):
+    """
+    타겟 변수 제외한 결측값 처리
+
+    Args:
+        strategy: 결측값 대체 방식 (IMPUTATION_STRATEGIES)
+        check_rows: 0보다 크면 결측 행 표본에서 정확한 KNN 결과와의 차이를 출력 (knn 제외)
+    """
     
     print(f"  처리 전 결측값: {df.isnull().sum().sum()}개")
     
@@ -168,10 +338,17 @@ def improved_missing_value_handling_safe(df):
     numeric_cols = df.select_dtypes(include=[np.number]).columns.tolist()
     numeric_cols = [col for col in numeric_cols if col not in ['plan_id', 'query_id', 'target_log', 'target_boxcox']]
     
-    # 2. KNN 기반 결측값 대체 (타겟 변수 제외)
+    # 2. 결측값 대체 (타겟 변수 제외)
     if len(numeric_cols) > 0:
-        knn_imputer = KNNImputer(n_neighbors=5)
-        df[numeric_cols] = knn_imputer.fit_transform(df[numeric_cols])
+        strategy = resolve_imputation_strategy(strategy, len(df))
+        print(f"  결측값 대체 방식: {strategy}")
+        imputed = IMPUTERS[strategy](df, numeric_cols)
+        if check_rows > 0 and strategy != 'knn':
+            report = compare_with_exact_knn(df, numeric_cols, imputed, sample_rows=check_rows)
+            if not report.empty:
+                print(f"  정확한 KNN 대비 차이 (결측 행 표본 최대 {check_rows}개):")
+                print(report.to_string(float_format=lambda v: f"{v:.4f}"))
+        df[numeric_cols] = imputed
     
     # 3. 도메인 지식 기반 기본값 설정
     plan_features = ['num_nodes', 'num_edges', 'total_estimated_cost', 'num_physical_ops']
@@ -182,7 +359,7 @@ def improved_missing_value_handling_safe(df):
     # 4. 문자열 컬럼 처리
     string_cols = df.select_dtypes(include=['object']).columns
     for col in string_cols:
-        if col not in ['plan_id', 'query_id']:
+        if col not in ['plan_id', 'query_id', 'collected_at_key']:
             df[col] = df[col].fillna('unknown')
     
     print(f"  처리 후 결측값: {df.isnull().sum().sum()}개")
@@ -222,21 +399,12 @@ def add_safe_domain_features(df):
     
     return df
 
-def add_safe_clustering_features(df):
+def add_safe_clustering_features(df, fitted=None):
     """타겟 변수 제외한 안전한 클러스터링 피처 추가"""
     
-    # 클러스터링에 사용할 피처 선택 (타겟 변수 완전 제외)
-    clustering_features = [
-        'num_nodes', 'num_edges', 'num_logical_ops', 'num_physical_ops',
-        'total_estimated_cost', 'avg_ms', 'last_cpu_ms', 'last_reads',
-        'max_used_mem_kb', 'max_dop', 'tree_depth', 'join_complexity',
-        'index_usage_score', 'memory_intensity', 'operator_diversity',
-        'cpu_efficiency', 'io_efficiency', 'complexity_score', 'resource_intensity'
-    ]
-    
     # 타겟 변수 관련 피처 완전 제외
     excluded_features = ['last_ms', 'target_log', 'target_boxcox', 'cluster_avg_ms_mean', 'cluster_avg_ms_std']
-    available_features = [col for col in clustering_features if col in df.columns and col not in excluded_features]
+    available_features = [col for col in CLUSTERING_FEATURES if col in df.columns and col not in excluded_features]
     
     if len(available_features) >= 3:
         # 데이터 정규화
@@ -246,39 +414,60 @@ def add_safe_clustering_features(df):
         # K-means 클러스터링
         kmeans = KMeans(n_clusters=5, random_state=42, n_init=10)
         df['query_cluster'] = kmeans.fit_predict(X_cluster)
+        if fitted is not None:
+            fitted['clustering'] = {'features': available_features, 'scaler': scaler, 'kmeans': kmeans}
         
-        # 클러스터별 통계 (타겟 변수 완전 제외)
-        cluster_stats = df.groupby('query_cluster')[available_features].agg(['mean', 'std']).reset_index()
+        # 클러스터별 통계 (타겟 변수 완전 제외) - 한 번 계산해 행에 펼침
+        cluster_stats = df.groupby('query_cluster')[available_features].agg(['mean', 'std'])
+        per_row = cluster_stats.reindex(df['query_cluster'].values)
         
         # 클러스터 특성 추가 (타겟 변수 관련 피처 제외)
+        cluster_cols = {}
         for feature in available_features:
-            if feature not in excluded_features:
-                df[f'cluster_{feature}_mean'] = df['query_cluster'].map(cluster_stats.set_index('query_cluster')[feature]['mean'])
-                df[f'cluster_{feature}_std'] = df['query_cluster'].map(cluster_stats.set_index('query_cluster')[feature]['std'])
+            cluster_cols[f'cluster_{feature}_mean'] = per_row[(feature, 'mean')].values
+            cluster_cols[f'cluster_{feature}_std'] = per_row[(feature, 'std')].values
+        df = df.assign(**cluster_cols)
     
     return df
 
-def improved_feature_scaling(df):
-    """개선된 피처 정규화"""
+def improved_feature_scaling(df, fitted=None):
+    """개선된 피처 정규화 (변환기 하나로 여러 컬럼을 한 번에 학습)"""
     
     numeric_cols = df.select_dtypes(include=[np.number]).columns.tolist()
     numeric_cols = [col for col in numeric_cols if col not in ['plan_id', 'query_id', 'target_log', 'target_boxcox']]
+    # 상수가 아닌 경우만
+    cols = [col for col in numeric_cols if df[col].nunique() > 1]
+    if not cols:
+        return df
     
-    # 피처별 최적 스케일링 방법 적용
-    for col in numeric_cols:
-        if df[col].nunique() > 1:  # 상수가 아닌 경우만
-            # QuantileTransformer 적용
-            qt = QuantileTransformer(output_distribution='normal', random_state=42)
-            df[f'{col}_qt'] = qt.fit_transform(df[[col]])
-            
-            # PowerTransformer 적용 (Yeo-Johnson)
-            try:
-                pt = PowerTransformer(method='yeo-johnson', standardize=True)
-                df[f'{col}_pt'] = pt.fit_transform(df[[col]])
-            except:
-                df[f'{col}_pt'] = df[col]
+    # QuantileTransformer 적용 (컬럼별 변환이므로 한 번에 학습해도 결과 동일)
+    qt = QuantileTransformer(output_distribution='normal', random_state=42)
+    qt_values = qt.fit_transform(df[cols])
     
-    return df
+    # PowerTransformer 적용 (Yeo-Johnson), 실패하면 컬럼별로 재시도
+    pt = PowerTransformer(method='yeo-johnson', standardize=True)
+    try:
+        pt_values = pt.fit_transform(df[cols])
+        pt_fitted = pt
+    except Exception:
+        pt_values = np.empty((len(df), len(cols)))
+        pt_fitted = {}
+        for j, col in enumerate(cols):
+            try:
+                col_pt = PowerTransformer(method='yeo-johnson', standardize=True)
+                pt_values[:, j] = col_pt.fit_transform(df[[col]])[:, 0]
+                pt_fitted[col] = col_pt
+            except Exception:
+                pt_values[:, j] = df[col].values
+    
+    if fitted is not None:
+        fitted['scaling'] = {'features': cols, 'quantile': qt, 'power': pt_fitted}
+    
+    scaled = {}
+    for j, col in enumerate(cols):
+        scaled[f'{col}_qt'] = qt_values[:, j]
+        scaled[f'{col}_pt'] = pt_values[:, j]
+    return df.assign(**scaled)
 
 def safe_feature_selection(df, y):
     """안전한 피처 선택"""
@@ -289,7 +478,7 @@ def safe_feature_selection(df, y):
     feature_cols = [col for col in numeric_cols if col not in excluded_cols]
     
     # 원본 피처만 사용 (변환된 피처 제외)
-    original_features = [col for col in feature_cols if not col.endswith('_qt') and not col.endswith('_pt')]
+    original_features = [col for col in feature_cols if is_selected_column(col)]
     
     # plan_xml과 같은 문자열 컬럼도 보존
     string_cols = df.select_dtypes(include=['object']).columns.tolist()
@@ -303,10 +492,52 @@ def safe_feature_selection(df, y):
     
     return df_selected
 
+# 클러스터링에 사용할 피처 선택 (타겟 변수 완전 제외)
+CLUSTERING_FEATURES = [
+    'num_nodes', 'num_edges', 'num_logical_ops', 'num_physical_ops',
+    'total_estimated_cost', 'avg_ms', 'last_cpu_ms', 'last_reads',
+    'max_used_mem_kb', 'max_dop', 'tree_depth', 'join_complexity',
+    'index_usage_score', 'memory_intensity', 'operator_diversity',
+    'cpu_efficiency', 'io_efficiency', 'complexity_score', 'resource_intensity'
+]
+
+def build_preprocess_stages(imputer: str = 'auto', impute_check_rows: int = 0):
+    """전처리 단계 선언 (실행 순서대로)"""
+    return [
+        PreprocessStage("이상치 처리 (타겟 변수 정보 누출 방지)",
+                        lambda df, y, fitted: improved_outlier_handling_safe(df, y)),
+        PreprocessStage("결측값 처리 (타겟 변수 제외)",
+                        lambda df, y, fitted: (improved_missing_value_handling_safe(
+                            df, strategy=imputer, check_rows=impute_check_rows), y)),
+        PreprocessStage("안전한 피처 엔지니어링",
+                        lambda df, y, fitted: (add_safe_domain_features(df), y),
+                        outputs=['cpu_efficiency', 'io_efficiency', 'complexity_score', 'normalized_complexity',
+                                 'resource_intensity', 'is_resource_intensive',
+                                 'parallel_efficiency', 'is_parallel_efficient']),
+        PreprocessStage("안전한 클러스터링",
+                        lambda df, y, fitted: (add_safe_clustering_features(df, fitted), y),
+                        outputs=['query_cluster', 'cluster_*_mean', 'cluster_*_std'],
+                        inputs=CLUSTERING_FEATURES),
+        PreprocessStage("피처 정규화",
+                        lambda df, y, fitted: (improved_feature_scaling(df, fitted), y),
+                        outputs=['*_qt', '*_pt']),
+        PreprocessStage("피처 선택",
+                        lambda df, y, fitted: (safe_feature_selection(df, y), y)),
+        ]
+
+PREPROCESS_STAGES = build_preprocess_stages()
+
 def main():
     """메인 실행 함수"""
+    parser = argparse.ArgumentParser(description="Apollo.ML 데이터 전처리")
+    parser.add_argument("--imputer", choices=IMPUTATION_STRATEGIES, default="auto",
+                        help=f"결측값 대체 방식 (기본값: auto, {EXACT_KNN_MAX_ROWS:,}행 초과 시 knn_sampled)")
+    parser.add_argument("--impute-check-rows", type=int, default=0,
+                        help="정확한 KNN 결과와 비교할 결측 행 표본 크기 (기본값: 0, 비교 안 함)")
+    args = parser.parse_args()
+    
     try:
-        preprocessed_df = preprocess_data()
+        preprocessed_df = preprocess_data(imputer=args.imputer, impute_check_rows=args.impute_check_rows)
         print(f"\n✅ 전처리 완료!")
         print(f"다음 단계: python enhanced_featurize.py")
     except Exception as e:
@@ -1,9 +1,30 @@
 # -*- coding: utf-8 -*-
 """
 Phase 2: 고급 피처 엔지니어링 + Overfitting 방지
+
+--incremental: 저장된 모델에 새로 수집된 행(watermark 이후)만으로 부스팅 라운드를 추가합니다.
+모델 메타데이터(artifacts/model_meta.json)에 버전, 학습한 마지막 행 키(watermark), 피처 목록 해시를 기록합니다.
+watermark는 행 위치가 아니라 전처리를 거쳐도 유지되는 (collected_at_key, query_id, plan_id) 키입니다.
+(피처 파일은 매번 다시 만들어지고 이상치 제거로 행 수/순서가 바뀌므로 행 위치는 기준이 될 수 없음)
+
+--streaming: 피처 Parquet를 배치 단위로 읽어 xgboost DataIter → QuantileDMatrix로 학습합니다.
+pandas 프레임/float64 사본 없이 배치마다 float32로 스케일링해 넘기므로 메모리는 배치 크기와 양자화된 행렬로 제한됩니다.
+(--external-memory: 양자화된 행렬도 디스크 캐시에 두는 외부 메모리 DMatrix 사용)
 """
 
+import argparse
+import copy
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import joblib
 import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import xgboost as xgb
+import yaml
 import numpy as np
 import networkx as nx
 from datetime import datetime
@@ -13,10 +34,152 @@ from sklearn.model_selection import train_test_split, cross_val_score, TimeSerie
 from sklearn.metrics import mean_squared_error, mean_absolute_error, r2_score
 from sklearn.feature_selection import SelectKBest, f_regression, RFE
 from xgboost import XGBRegressor
+
+from config import load_config
 import warnings
 warnings.filterwarnings('ignore')
 
-def phase2_overfit_prevention():
+# 안정성 우선 모델 설정 (이전 설정으로 복원)
+MODEL_PARAMS = dict(
+    n_estimators=300,  # 감소
+    max_depth=5,       # 감소
+    learning_rate=0.05,  # 감소
+    subsample=0.8,
+    colsample_bytree=0.8,
+    reg_alpha=0.2,     # L1 정규화 강화
+    reg_lambda=0.2,    # L2 정규화 강화
+    min_child_weight=10,  # 최소 샘플 수 제한 강화
+    random_state=42,
+    n_jobs=-1
+)
+
+# config.yaml에 model 섹션이 있으면 MODEL_PARAMS 대신 사용 (enhanced_tune.py가 기록)
+MODEL_CONFIG_FIELDS = ['n_estimators', 'max_depth', 'learning_rate', 'subsample', 'colsample_bytree',
+                       'reg_alpha', 'reg_lambda', 'min_child_weight', 'random_state', 'n_jobs']
+
+FEATURES_PATH = 'artifacts/enhanced_features.parquet'
+STREAM_BATCH_ROWS = 50000
+VAL_SIZE = 0.2
+
+MODEL_PATH = 'artifacts/model.joblib'
+SCALER_PATH = 'artifacts/scaler.joblib'
+# 증분 학습 동안 새 행까지 반영한 스케일러 통계 (모델 입력 스케일러와 별도)
+RUNNING_SCALER_PATH = 'artifacts/scaler_running.joblib'
+MODEL_META_PATH = 'artifacts/model_meta.json'
+
+# 증분 학습 기준 키 (enhanced_fetch의 수집 키셋과 같은 순서, collected_at_key는 고정 폭 문자열)
+WATERMARK_COLUMNS = ['collected_at_key', 'query_id', 'plan_id']
+
+# 누적 통계의 평균이 학습 스케일러 기준 이만큼(표준편차 단위) 움직이면 전체 재학습 권장
+SCALER_DRIFT_WARN = 0.5
+MODEL_HISTORY_LIMIT = 20
+
+def load_model_params(config_path: str = 'config.yaml') -> dict:
+    """config.yaml의 model 설정 (model 섹션이 없으면 MODEL_PARAMS)"""
+    if not config_path or not os.path.exists(config_path):
+        return dict(MODEL_PARAMS)
+    with open(config_path, 'r', encoding='utf-8') as f:
+        if 'model' not in (yaml.safe_load(f) or {}):
+            return dict(MODEL_PARAMS)
+    model_cfg = load_config(config_path).model
+    return {field: getattr(model_cfg, field) for field in MODEL_CONFIG_FIELDS}
+
+def load_train_split(config_path: str = 'config.yaml') -> tuple:
+    """
+    config.yaml의 train 섹션 검증 분할 설정 (test_size, random_state)
+    학습/탐색/평가가 모두 이 값으로 split_holdout을 호출해 같은 검증 분할을 씁니다.
+    """
+    train_cfg = load_config(config_path).train
+    return train_cfg.test_size, train_cfg.random_state
+
+def split_holdout(X, y, test_size: float = VAL_SIZE, random_state: int = 42):
+    """훈련/검증 분할 (enhanced_tune은 검증 부분을 탐색에서 제외하므로 반드시 같은 인자로 호출)"""
+    return train_test_split(X, y, test_size=test_size, random_state=random_state)
+
+def select_feature_cols(df: pd.DataFrame) -> list:
+    """학습 피처 컬럼 (수치형, 식별자/타겟/문자열 제외)"""
+    numeric_cols = df.select_dtypes(include=[np.number]).columns.tolist()
+    feature_cols = [col for col in numeric_cols if col not in ['plan_id', 'query_id', 'last_ms']]
+    
+    # 문자열 컬럼 제외 (스케일링할 수 없음)
+    string_cols = df.select_dtypes(include=['object']).columns.tolist()
+    return [col for col in feature_cols if col not in string_cols]
+
+def feature_list_hash(feature_cols: list) -> str:
+    """피처 목록(순서 포함)의 해시"""
+    return hashlib.sha1("\n".join(feature_cols).encode('utf-8')).hexdigest()[:16]
+
+def data_watermark(keys: pd.DataFrame):
+    """키 컬럼 프레임의 마지막 (collected_at_key, query_id, plan_id) (키 컬럼이 없으면 None)"""
+    if any(col not in keys.columns for col in WATERMARK_COLUMNS):
+        return None
+    keys = keys[WATERMARK_COLUMNS].dropna()
+    if keys.empty:
+        return None
+    last = keys.sort_values(WATERMARK_COLUMNS).iloc[-1]
+    return {'collected_at': str(last['collected_at_key']), 'query_id': int(last['query_id']),
+            'plan_id': int(last['plan_id'])}
+
+def read_data_watermark(path: str = FEATURES_PATH):
+    """피처 Parquet의 키 컬럼만 읽어 마지막 키를 반환합니다 (스트리밍 학습도 전체 프레임 없이 계산)."""
+    schema = ds.dataset(path, format='parquet').schema
+    if any(col not in schema.names for col in WATERMARK_COLUMNS):
+        return None
+    return data_watermark(pd.read_parquet(path, columns=WATERMARK_COLUMNS))
+
+def rows_after_watermark(df: pd.DataFrame, watermark: dict) -> pd.Series:
+    """(collected_at_key, query_id, plan_id)가 watermark보다 큰 행 마스크"""
+    key, query_id, plan_id = df['collected_at_key'], df['query_id'], df['plan_id']
+    same_key = key == watermark['collected_at']
+    return (key > watermark['collected_at']) | (same_key & (query_id > watermark['query_id'])) \
+        | (same_key & (query_id == watermark['query_id']) & (plan_id > watermark['plan_id']))
+
+def load_model_meta(path: str = MODEL_META_PATH):
+    """모델 메타데이터 (없으면 None)"""
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def _dump_atomic(obj, path: str):
+    """임시 파일에 쓴 뒤 교체 (학습 중에도 환경이 반쯤 쓰인 파일을 읽지 않도록)"""
+    tmp_path = f"{path}.tmp"
+    joblib.dump(obj, tmp_path)
+    os.replace(tmp_path, path)
+
+def save_model_artifacts(results: dict, meta: dict):
+    """모델/스케일러/메타데이터 저장 (메타데이터를 마지막에 써서 버전이 보이면 모델도 준비된 상태)"""
+    _dump_atomic(results['model'], MODEL_PATH)
+    _dump_atomic(results['scaler'], SCALER_PATH)
+    _dump_atomic(results['running_scaler'], RUNNING_SCALER_PATH)
+    
+    tmp_path = f"{MODEL_META_PATH}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(meta, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, MODEL_META_PATH)
+
+def build_model_meta(results: dict, prev_meta: dict, mode: str, watermark, n_rows: int, n_new_rows: int) -> dict:
+    """버전이 붙은 모델 메타데이터"""
+    version = (prev_meta or {}).get('version', 0) + 1
+    entry = {
+        'version': version,
+        'mode': mode,
+        'trained_at': datetime.now().isoformat(),
+        'watermark': watermark,
+        'n_rows': n_rows,
+        'n_new_rows': n_new_rows,
+        'num_boosted_rounds': results['model'].get_booster().num_boosted_rounds(),
+        'scaler_drift': results.get('scaler_drift', 0.0),
+    }
+    history = (prev_meta or {}).get('history', []) if mode == 'incremental' else []
+    return {
+        **entry,
+        'feature_hash': feature_list_hash(results['feature_cols']),
+        'feature_cols': results['feature_cols'],
+        'history': (history + [entry])[-MODEL_HISTORY_LIMIT:],
+    }
+
+def phase2_overfit_prevention(model_params=None, test_size: float = VAL_SIZE, random_state: int = 42):
     """Phase 2: 전처리된 데이터로 모델 훈련"""
     
     print("=== Phase 2: 모델 훈련 ===")
@@ -31,47 +194,31 @@ def phase2_overfit_prevention():
     
     # 2. 모델 훈련
     print("\n1. 모델 훈련...")
-    results = train_overfit_prevention_model(df)
+    results = train_overfit_prevention_model(df, model_params=model_params,
+                                             test_size=test_size, random_state=random_state)
     
     return results
 
 # 전처리된 데이터를 사용하므로 추가 전처리 함수들은 제거됨
 
-def train_overfit_prevention_model(df):
+def train_overfit_prevention_model(df, model_params=None, test_size: float = VAL_SIZE, random_state: int = 42):
     """Overfitting 방지 모델 훈련"""
     
     # 피처 선택 (수치형 컬럼만)
-    numeric_cols = df.select_dtypes(include=[np.number]).columns.tolist()
-    feature_cols = [col for col in numeric_cols if col not in ['plan_id', 'query_id', 'last_ms']]
-    
-    # 문자열 컬럼 제외 (스케일링할 수 없음)
-    string_cols = df.select_dtypes(include=['object']).columns.tolist()
-    feature_cols = [col for col in feature_cols if col not in string_cols]
+    feature_cols = select_feature_cols(df)
     
     X = df[feature_cols]
     y = df['last_ms']
     
     # 훈련/검증 분할
-    X_train, X_val, y_train, y_val = train_test_split(X, y, test_size=0.2, random_state=42)
+    X_train, X_val, y_train, y_val = split_holdout(X, y, test_size=test_size, random_state=random_state)
     
     # 스케일링
     scaler = StandardScaler()
     X_train_scaled = scaler.fit_transform(X_train)
     X_val_scaled = scaler.transform(X_val)
     
-    # 안정성 우선 모델 설정 (이전 설정으로 복원)
-    model = XGBRegressor(
-        n_estimators=300,  # 감소
-        max_depth=5,       # 감소
-        learning_rate=0.05,  # 감소
-        subsample=0.8,
-        colsample_bytree=0.8,
-        reg_alpha=0.2,     # L1 정규화 강화
-        reg_lambda=0.2,    # L2 정규화 강화
-        min_child_weight=10,  # 최소 샘플 수 제한 강화
-        random_state=42,
-        n_jobs=-1
-    )
+    model = XGBRegressor(**(model_params or MODEL_PARAMS))
     
     # 훈련
     print("  모델 훈련 중...")
@@ -92,6 +239,7 @@ def train_overfit_prevention_model(df):
     return {
         'model': model,
         'scaler': scaler,
+        'running_scaler': copy.deepcopy(scaler),
         'feature_importance': feature_importance,
         'feature_cols': feature_cols,
         'X_processed': pd.DataFrame(X_scaled, columns=feature_cols),
@@ -102,27 +250,336 @@ def train_overfit_prevention_model(df):
         'y_val': y_val
     }
 
+def select_feature_cols_from_schema(schema: pa.Schema) -> list:
+    """Parquet 스키마 기준 학습 피처 컬럼 (select_feature_cols와 같은 규칙)"""
+    return [field.name for field in schema
+            if (pa.types.is_integer(field.type) or pa.types.is_floating(field.type))
+            and field.name not in ['plan_id', 'query_id', 'last_ms']]
+
+def _val_mask(batch_idx: int, n_rows: int, seed: int = 42) -> np.ndarray:
+    """배치별 검증 행 마스크 (배치 번호로 시드를 정해 반복자를 다시 돌려도 같은 분할)"""
+    return np.random.default_rng([seed, batch_idx]).random(n_rows) < VAL_SIZE
+
+def iter_feature_batches(path: str, feature_cols: list, part: str = 'train', batch_rows: int = STREAM_BATCH_ROWS):
+    """
+    피처 Parquet를 배치 단위로 읽어 (float32 X, float32 y)를 반환합니다.
+
+    Args:
+        part: 'train', 'val', 'all'
+    """
+    dataset = ds.dataset(path, format='parquet')
+    columns = feature_cols + ['last_ms']
+    for batch_idx, batch in enumerate(dataset.to_batches(columns=columns, batch_size=batch_rows)):
+        if batch.num_rows == 0:
+            continue
+        # 열마다 float32 행렬에 바로 채움 (float64 중간 행렬 없음, NULL → NaN)
+        X = np.empty((batch.num_rows, len(feature_cols)), dtype=np.float32)
+        for j in range(len(feature_cols)):
+            X[:, j] = batch.column(j).to_numpy(zero_copy_only=False)
+        y = batch.column(len(feature_cols)).to_numpy(zero_copy_only=False).astype(np.float32)
+        
+        if part != 'all':
+            mask = _val_mask(batch_idx, batch.num_rows)
+            if part == 'train':
+                mask = ~mask
+            X, y = X[mask], y[mask]
+        if len(y) > 0:
+            yield X, y
+
+class ParquetBatchIter(xgb.DataIter):
+    """스케일링한 Parquet 배치를 xgboost에 넘기는 데이터 반복자"""
+
+    def __init__(self, path: str, feature_cols: list, scaler, part: str = 'train',
+                 batch_rows: int = STREAM_BATCH_ROWS, cache_prefix: str = None):
+        self._path = path
+        self._feature_cols = feature_cols
+        self._scaler = scaler
+        self._part = part
+        self._batch_rows = batch_rows
+        self._batches = None
+        super().__init__(cache_prefix=cache_prefix)
+
+    def reset(self):
+        self._batches = None
+
+    def next(self, input_data) -> int:
+        if self._batches is None:
+            self._batches = iter_feature_batches(self._path, self._feature_cols, self._part, self._batch_rows)
+        try:
+            X, y = next(self._batches)
+        except StopIteration:
+            return 0
+        input_data(data=self._scaler.transform(X), label=y)
+        return 1
+
+def booster_params(model_params=None) -> dict:
+    """MODEL_PARAMS 형식 설정을 xgb.train 파라미터로 변환 (스트리밍 학습은 hist 필요)"""
+    model_params = model_params or MODEL_PARAMS
+    return {
+        'objective': 'reg:squarederror',
+        'tree_method': 'hist',
+        'max_depth': model_params['max_depth'],
+        'eta': model_params['learning_rate'],
+        'subsample': model_params['subsample'],
+        'colsample_bytree': model_params['colsample_bytree'],
+        'alpha': model_params['reg_alpha'],
+        'lambda': model_params['reg_lambda'],
+        'min_child_weight': model_params['min_child_weight'],
+        'seed': model_params['random_state'],
+    }
+
+def train_streaming_model(path: str = FEATURES_PATH, batch_rows: int = STREAM_BATCH_ROWS,
+                          external_memory: bool = False, model_params=None):
+    """
+    피처 Parquet를 배치로 읽어 QuantileDMatrix(또는 외부 메모리 DMatrix)로 학습합니다.
+
+    1. 훈련 행으로 스케일러 통계를 partial_fit (1회 순회)
+    2. 반복자가 배치마다 float32로 스케일링해 xgboost에 전달
+    """
+    feature_cols = select_feature_cols_from_schema(ds.dataset(path, format='parquet').schema)
+    
+    print("  스케일러 통계 계산 중 (훈련 행)...")
+    scaler = StandardScaler()
+    n_train = 0
+    for X, _ in iter_feature_batches(path, feature_cols, 'train', batch_rows):
+        scaler.partial_fit(X)
+        n_train += len(X)
+    n_rows = ds.dataset(path, format='parquet').count_rows()
+    
+    print(f"  {'외부 메모리 DMatrix' if external_memory else 'QuantileDMatrix'} 생성 중...")
+    cache_dir = tempfile.mkdtemp(prefix="apollo_xgb_cache_") if external_memory else None
+    train_iter = ParquetBatchIter(path, feature_cols, scaler, 'train', batch_rows,
+                                  cache_prefix=os.path.join(cache_dir, 'train') if cache_dir else None)
+    val_iter = ParquetBatchIter(path, feature_cols, scaler, 'val', batch_rows,
+                                cache_prefix=os.path.join(cache_dir, 'val') if cache_dir else None)
+    if external_memory:
+        dtrain = xgb.DMatrix(train_iter)
+        dval = xgb.DMatrix(val_iter)
+    else:
+        dtrain = xgb.QuantileDMatrix(train_iter)
+        dval = xgb.QuantileDMatrix(val_iter, ref=dtrain)
+    
+    print("  모델 훈련 중...")
+    model_params = model_params or MODEL_PARAMS
+    booster = xgb.train(booster_params(model_params), dtrain, num_boost_round=model_params['n_estimators'],
+                        evals=[(dval, 'val')], verbose_eval=False)
+    if cache_dir:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+    
+    # 환경/평가 코드가 쓰는 XGBRegressor 형태로 저장
+    model = XGBRegressor(**model_params)
+    model.load_model(bytearray(booster.save_raw()))
+    
+    feature_importance = pd.DataFrame({
+        'feature': feature_cols,
+        'importance': model.feature_importances_
+    }).sort_values('importance', ascending=False)
+    
+    print(f"  훈련 완료! 사용된 피처 수: {len(feature_cols)}")
+    print(f"  상위 5개 피처: {feature_importance.head()['feature'].tolist()}")
+    
+    return {
+        'model': model,
+        'scaler': scaler,
+        'running_scaler': copy.deepcopy(scaler),
+        'feature_importance': feature_importance,
+        'feature_cols': feature_cols,
+        'n_rows': n_rows,
+        'n_train': n_train,
+        'n_val': dval.num_row(),
+    }
+
+def compare_streaming_with_dense(path: str = FEATURES_PATH, n_rows: int = 20000, batch_rows: int = 5000):
+    """
+    앞쪽 n_rows행 표본에서 스트리밍 학습과 기존(pandas) 학습 결과를 비교합니다.
+    (분할 방식이 달라 같은 모델은 아니므로 표본 전체 예측 지표를 비교)
+    """
+    sample = ds.dataset(path, format='parquet').head(n_rows).to_pandas()
+    tmp_dir = tempfile.mkdtemp(prefix="apollo_train_check_")
+    try:
+        sample_path = os.path.join(tmp_dir, 'sample.parquet')
+        sample.to_parquet(sample_path, index=False)
+        
+        print(f"표본 {len(sample)}행: 기존 학습...")
+        dense = train_overfit_prevention_model(sample)
+        print(f"표본 {len(sample)}행: 스트리밍 학습...")
+        streaming = train_streaming_model(sample_path, batch_rows=batch_rows)
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+    
+    if dense['feature_cols'] != streaming['feature_cols']:
+        print(f"⚠️ 피처 목록이 다릅니다: {set(dense['feature_cols']) ^ set(streaming['feature_cols'])}")
+        return None
+    
+    X = sample[dense['feature_cols']]
+    y = sample['last_ms']
+    pred_dense = dense['model'].predict(dense['scaler'].transform(X))
+    pred_streaming = streaming['model'].predict(streaming['scaler'].transform(X.to_numpy(dtype=np.float32)))
+    
+    report = pd.DataFrame({
+        'mae': [mean_absolute_error(y, pred_dense), mean_absolute_error(y, pred_streaming)],
+        'r2': [r2_score(y, pred_dense), r2_score(y, pred_streaming)],
+    }, index=['dense', 'streaming'])
+    print(report.to_string(float_format=lambda v: f"{v:.4f}"))
+    print(f"예측 차이: 평균 절대 {np.mean(np.abs(pred_dense - pred_streaming)):.4f}, "
+          f"상관계수 {np.corrcoef(pred_dense, pred_streaming)[0, 1]:.4f}")
+    return report
+
+def train_incremental_model(df, model, scaler, running_scaler, meta, rounds=50):
+    """
+    저장된 모델에 watermark 키 이후 행만으로 부스팅 라운드를 추가합니다.
+
+    기존 트리는 학습 당시 스케일러로 변환된 입력에 맞춰져 있으므로 모델 입력 스케일러는 그대로 두고,
+    새 행은 running_scaler에만 partial_fit으로 반영해 분포 변화(scaler_drift)를 추적합니다.
+
+    Returns:
+        결과 dict (새 행이 없으면 None)
+    """
+    feature_cols = select_feature_cols(df)
+    if feature_list_hash(feature_cols) != meta['feature_hash']:
+        raise ValueError("피처 목록이 저장된 모델과 다릅니다. 증분 학습 대신 전체 재학습이 필요합니다.")
+    
+    watermark = meta.get('watermark')
+    if not watermark:
+        raise ValueError("모델 메타데이터에 행 키 watermark가 없습니다. 전체 재학습이 필요합니다.")
+    if any(col not in df.columns for col in WATERMARK_COLUMNS):
+        raise ValueError(f"피처 데이터에 {WATERMARK_COLUMNS} 컬럼이 없습니다. 전체 재학습이 필요합니다.")
+    df_new = df[rows_after_watermark(df, watermark)]
+    if df_new.empty:
+        return None
+    print(f"  새 행: {len(df_new)}개 (watermark {watermark['collected_at']} 이후)")
+    
+    X_new = df_new[feature_cols]
+    y_new = df_new['last_ms']
+    
+    # 새 행 일부를 검증용으로 분리 (너무 적으면 전부 학습)
+    if len(df_new) >= 10:
+        X_train, X_val, y_train, y_val = train_test_split(X_new, y_new, test_size=0.2, random_state=42)
+    else:
+        X_train, X_val, y_train, y_val = X_new, X_new.iloc[:0], y_new, y_new.iloc[:0]
+    
+    X_train_scaled = scaler.transform(X_train)
+    if len(X_val) > 0:
+        mae_before = mean_absolute_error(y_val, model.predict(scaler.transform(X_val)))
+    
+    # 기존 부스터에 라운드 추가
+    print(f"  부스팅 라운드 {rounds}개 추가 중...")
+    model.set_params(n_estimators=rounds)
+    model.fit(X_train_scaled, y_train, xgb_model=model.get_booster())
+    
+    if len(X_val) > 0:
+        mae_after = mean_absolute_error(y_val, model.predict(scaler.transform(X_val)))
+        print(f"  새 행 검증 MAE: {mae_before:.2f} → {mae_after:.2f}")
+    
+    # 스케일러 통계 갱신 (재학습 없이 누적)
+    running_scaler.partial_fit(X_new)
+    scale = np.where(scaler.scale_ > 0, scaler.scale_, 1.0)
+    scaler_drift = float(np.max(np.abs(running_scaler.mean_ - scaler.mean_) / scale))
+    print(f"  스케일러 평균 이동: 최대 {scaler_drift:.3f} 표준편차")
+    if scaler_drift > SCALER_DRIFT_WARN:
+        print(f"  ⚠️ 입력 분포가 많이 바뀌었습니다. 전체 재학습을 권장합니다 (--incremental 없이 실행).")
+    
+    X_scaled = scaler.transform(df[feature_cols])
+    feature_importance = pd.DataFrame({
+        'feature': feature_cols,
+        'importance': model.feature_importances_
+    }).sort_values('importance', ascending=False)
+    
+    return {
+        'model': model,
+        'scaler': scaler,
+        'running_scaler': running_scaler,
+        'scaler_drift': scaler_drift,
+        'feature_importance': feature_importance,
+        'feature_cols': feature_cols,
+        'X_processed': pd.DataFrame(X_scaled, columns=feature_cols),
+        'y_processed': pd.Series(df['last_ms'], name='last_ms'),
+        'X_train': X_train,
+        'X_val': X_val,
+        'y_train': y_train,
+        'y_val': y_val,
+        'n_new_rows': len(df_new),
+    }
+
+def phase2_incremental(rounds=50):
+    """저장된 모델을 새 행으로 이어서 학습 (모델/메타데이터가 없으면 None)"""
+    
+    print("=== Phase 2: 증분 모델 훈련 ===")
+    
+    meta = load_model_meta()
+    if meta is None or not os.path.exists(MODEL_PATH) or not os.path.exists(SCALER_PATH):
+        print("저장된 모델 메타데이터가 없습니다. 전체 학습을 진행합니다.")
+        return None, None
+    
+    df = pd.read_parquet(FEATURES_PATH)
+    print(f"피처 엔지니어링된 데이터 크기: {df.shape} (모델 v{meta['version']}, watermark {meta.get('watermark')})")
+    
+    model = joblib.load(MODEL_PATH)
+    scaler = joblib.load(SCALER_PATH)
+    running_scaler = joblib.load(RUNNING_SCALER_PATH) if os.path.exists(RUNNING_SCALER_PATH) else copy.deepcopy(scaler)
+    
+    results = train_incremental_model(df, model, scaler, running_scaler, meta, rounds=rounds)
+    return results, meta
+
 def main():
     """메인 실행 함수"""
-    results = phase2_overfit_prevention()
+    parser = argparse.ArgumentParser(description="Apollo.ML 모델 훈련")
+    parser.add_argument("--config", default="config.yaml", help="config.yaml 파일 경로 (기본값: config.yaml)")
+    parser.add_argument("--incremental", action="store_true",
+                        help="저장된 모델에 새로 수집된 행만으로 부스팅 라운드 추가")
+    parser.add_argument("--rounds", type=int, default=50, help="증분 학습 시 추가할 라운드 수 (기본값: 50)")
+    parser.add_argument("--streaming", action="store_true",
+                        help="피처 Parquet를 배치로 읽어 QuantileDMatrix로 학습 (전체 프레임을 메모리에 올리지 않음)")
+    parser.add_argument("--external-memory", action="store_true", help="스트리밍 학습 시 외부 메모리 DMatrix 사용")
+    parser.add_argument("--batch-rows", type=int, default=STREAM_BATCH_ROWS,
+                        help=f"스트리밍 배치 크기 (기본값: {STREAM_BATCH_ROWS})")
+    parser.add_argument("--check-rows", type=int, default=0,
+                        help="앞쪽 N행 표본에서 스트리밍 학습과 기존 학습을 비교만 하고 종료")
+    args = parser.parse_args()
+    
+    if args.check_rows > 0:
+        compare_streaming_with_dense(n_rows=args.check_rows, batch_rows=max(1, args.check_rows // 4))
+        return
+    
+    results, prev_meta, mode = None, None, 'full'
+    if args.streaming or args.external_memory:
+        print("=== Phase 2: 스트리밍 모델 훈련 ===")
+        prev_meta = load_model_meta()
+        results = train_streaming_model(batch_rows=args.batch_rows, external_memory=args.external_memory,
+                                        model_params=load_model_params(args.config))
+    elif args.incremental:
+        results, prev_meta = phase2_incremental(rounds=args.rounds)
+        if results is None and prev_meta is not None:
+            print("새로 수집된 행이 없습니다. 모델을 그대로 유지합니다.")
+            return
+        mode = 'incremental' if results is not None else 'full'
+    if results is None:
+        prev_meta = load_model_meta()
+        test_size, random_state = load_train_split(args.config)
+        results = phase2_overfit_prevention(model_params=load_model_params(args.config),
+                                            test_size=test_size, random_state=random_state)
     
     print(f"\n=== Phase 2 모델 훈련 완료 ===")
     print(f"사용된 피처 수: {len(results['feature_cols'])}")
-    print(f"훈련 데이터 크기: {results['X_train'].shape}")
-    print(f"검증 데이터 크기: {results['X_val'].shape}")
+    n_train = results['n_train'] if 'n_train' in results else len(results['X_train'])
+    n_val = results['n_val'] if 'n_val' in results else len(results['X_val'])
+    print(f"훈련 데이터 크기: ({n_train}, {len(results['feature_cols'])})")
+    print(f"검증 데이터 크기: ({n_val}, {len(results['feature_cols'])})")
     
     # 모델 저장
-    import joblib
-    joblib.dump(results['model'], 'artifacts/model.joblib')
-    joblib.dump(results['scaler'], 'artifacts/scaler.joblib')
+    n_rows = results['n_rows'] if 'n_rows' in results else len(results['y_processed'])
+    meta = build_model_meta(results, prev_meta, mode, watermark=read_data_watermark(), n_rows=n_rows,
+                            n_new_rows=results.get('n_new_rows', n_rows))
+    save_model_artifacts(results, meta)
     results['feature_importance'].to_csv('artifacts/model_importance.csv', index=False)
     
-    # 처리된 피처 데이터도 저장 (평가용)
-    results['X_processed'].to_parquet('artifacts/processed_features.parquet', index=False)
-    results['y_processed'].to_frame().to_parquet('artifacts/processed_target.parquet', index=False)
+    print(f"\n모델 저장 완료: artifacts/model.joblib (v{meta['version']}, {mode}, 부스팅 라운드 {meta['num_boosted_rounds']})")
     
-    print(f"\n모델 저장 완료: artifacts/model.joblib")
-    print(f"처리된 피처 데이터 저장 완료: artifacts/processed_features.parquet")
+    # 처리된 피처 데이터도 저장 (평가용, 스트리밍 학습은 전체 행렬을 만들지 않으므로 생략)
+    if 'X_processed' in results:
+        results['X_processed'].to_parquet('artifacts/processed_features.parquet', index=False)
+        results['y_processed'].to_frame().to_parquet('artifacts/processed_target.parquet', index=False)
+        print(f"처리된 피처 데이터 저장 완료: artifacts/processed_features.parquet")
     print(f"평가를 실행하려면: python enhanced_evaluate.py")
 
 if __name__ == "__main__":
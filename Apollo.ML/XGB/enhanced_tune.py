@@ -0,0 +1,224 @@
+# -*- coding: utf-8 -*-
+"""
+하이퍼파라미터 탐색 모듈
+ModelConfig 필드를 successive halving으로 탐색하고 최적 설정을 config.yaml에 기록합니다.
+
+- 후보 설정을 무작위로 뽑아 적은 부스팅 라운드로 평가한 뒤, 상위 1/eta만 다음 단계(라운드 eta배)로 올림
+- 각 시도는 튜닝 검증 분할에서 xgboost 조기 종료 (최적 라운드 수가 n_estimators가 됨)
+- 튜닝 분할은 enhanced_train의 훈련 부분에서만 나눔
+  (enhanced_train이 보고하는 검증 분할로 순위를 매기면 보고 지표가 낙관적으로 치우치므로 탐색에 쓰지 않음)
+- 같은 단계의 시도는 프로세스 풀에서 병렬 실행 (데이터는 워커마다 한 번만 전달)
+- 모든 시도는 artifacts/tuning_trials.jsonl에 기록
+"""
+
+import argparse
+import json
+import math
+import os
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+import yaml
+from sklearn.model_selection import train_test_split
+from sklearn.preprocessing import StandardScaler
+
+from config import load_config
+from enhanced_train import (FEATURES_PATH, MODEL_CONFIG_FIELDS, VAL_SIZE, booster_params, load_train_split,
+                            select_feature_cols, split_holdout)
+
+TRIALS_LOG_PATH = 'artifacts/tuning_trials.jsonl'
+
+# 탐색 범위 (로그 척도 여부)
+SEARCH_SPACE = {
+    'max_depth': ('int', 3, 10),
+    'learning_rate': ('log', 0.01, 0.3),
+    'subsample': ('float', 0.5, 1.0),
+    'colsample_bytree': ('float', 0.5, 1.0),
+    'reg_alpha': ('log', 1e-3, 10.0),
+    'reg_lambda': ('log', 1e-3, 10.0),
+    'min_child_weight': ('log', 1.0, 50.0),
+}
+
+EARLY_STOPPING_ROUNDS = 50
+
+# enhanced_train 훈련 부분 중 튜닝 검증(순위/조기 종료)에 쓰는 비율
+TUNE_VAL_SIZE = 0.2
+
+# 워커 프로세스 전역 (initializer에서 한 번만 설정)
+_worker_data = {}
+
+def sample_config(rng: np.random.Generator) -> dict:
+    """탐색 범위에서 설정 하나를 뽑습니다."""
+    config = {}
+    for name, (kind, low, high) in SEARCH_SPACE.items():
+        if kind == 'int':
+            config[name] = int(rng.integers(low, high + 1))
+        elif kind == 'log':
+            config[name] = float(math.exp(rng.uniform(math.log(low), math.log(high))))
+        else:
+            config[name] = float(rng.uniform(low, high))
+    return config
+
+def _init_worker(X_train, y_train, X_val, y_val, nthread):
+    """워커마다 DMatrix를 한 번 만들어 둠"""
+    _worker_data['dtrain'] = xgb.DMatrix(X_train, label=y_train, nthread=nthread)
+    _worker_data['dval'] = xgb.DMatrix(X_val, label=y_val, nthread=nthread)
+    _worker_data['nthread'] = nthread
+
+def _run_trial(task):
+    """설정 하나를 budget 라운드까지 조기 종료와 함께 학습합니다."""
+    trial_id, config, budget, random_state = task
+    params = booster_params({**config, 'random_state': random_state})
+    params['eval_metric'] = 'rmse'
+    params['nthread'] = _worker_data['nthread']
+
+    start = time.perf_counter()
+    booster = xgb.train(
+        params, _worker_data['dtrain'], num_boost_round=budget,
+        evals=[(_worker_data['dval'], 'val')],
+        early_stopping_rounds=EARLY_STOPPING_ROUNDS, verbose_eval=False,
+    )
+    return {
+        'trial_id': trial_id,
+        'config': config,
+        'budget': budget,
+        'val_rmse': float(booster.best_score),
+        'best_iteration': int(booster.best_iteration),
+        'elapsed': time.perf_counter() - start,
+    }
+
+def load_tuning_data(path: str = FEATURES_PATH, test_size: float = VAL_SIZE, random_state: int = 42,
+                     tune_val_size: float = TUNE_VAL_SIZE):
+    """
+    enhanced_train과 같은 피처/분할/스케일링으로 float32 튜닝 학습·검증 배열을 만듭니다.
+
+    enhanced_train과 같은 split_holdout(test_size, random_state)으로 검증 부분을 먼저 떼어 버리고,
+    남은 훈련 부분을 다시 tune_val_size로 나눕니다 (최종 검증 분할은 탐색에 쓰지 않음).
+    """
+    df = pd.read_parquet(path)
+    feature_cols = select_feature_cols(df)
+    X_fit, _, y_fit, _ = split_holdout(df[feature_cols], df['last_ms'], test_size=test_size, random_state=random_state)
+    del df
+    X_train, X_val, y_train, y_val = train_test_split(
+        X_fit, y_fit, test_size=tune_val_size, random_state=random_state)
+    del X_fit, y_fit
+
+    scaler = StandardScaler()
+    X_train = scaler.fit_transform(X_train).astype(np.float32)
+    X_val = scaler.transform(X_val).astype(np.float32)
+    return X_train, y_train.to_numpy(np.float32), X_val, y_val.to_numpy(np.float32), feature_cols
+
+def successive_halving(data, n_trials: int = 27, min_rounds: int = 100, max_rounds: int = 2000,
+                       eta: int = 3, workers: int = None, random_state: int = 42,
+                       log_path: str = TRIALS_LOG_PATH):
+    """
+    successive halving 탐색
+
+    Args:
+        data: (X_train, y_train, X_val, y_val) - 튜닝 분할 (load_tuning_data)
+        n_trials: 처음 뽑을 후보 설정 수
+        min_rounds / max_rounds: 첫 단계 / 마지막 단계 부스팅 라운드 수
+        eta: 단계마다 남기는 비율의 역수이자 라운드 증가 배수
+
+    Returns:
+        최고 시도 결과 dict
+    """
+    rng = np.random.default_rng(random_state)
+    candidates = [(trial_id, sample_config(rng)) for trial_id in range(n_trials)]
+
+    workers = workers or os.cpu_count() or 1
+    nthread = max(1, (os.cpu_count() or 1) // workers)
+    run_id = uuid.uuid4().hex[:8]
+    os.makedirs(os.path.dirname(log_path) or '.', exist_ok=True)
+
+    budget = min_rounds
+    rung = 0
+    best = None
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(*data, nthread)) as pool:
+        while candidates:
+            budget = min(budget, max_rounds)
+            print(f"\n[단계 {rung}] 후보 {len(candidates)}개, 최대 {budget} 라운드")
+            tasks = [(trial_id, config, budget, random_state) for trial_id, config in candidates]
+            results = sorted(pool.map(_run_trial, tasks), key=lambda r: r['val_rmse'])
+
+            with open(log_path, 'a', encoding='utf-8') as f:
+                for result in results:
+                    f.write(json.dumps({'run_id': run_id, 'rung': rung, 'timestamp': datetime.now().isoformat(),
+                                        **result}, ensure_ascii=False) + "\n")
+            for result in results[:3]:
+                print(f"  trial {result['trial_id']:3d}: val RMSE {result['val_rmse']:.4f} "
+                      f"(best_iteration {result['best_iteration']}, {result['elapsed']:.1f}s)")
+
+            best = results[0]
+            if budget >= max_rounds or len(results) == 1:
+                break
+            keep = max(1, len(results) // eta)
+            candidates = [(r['trial_id'], r['config']) for r in results[:keep]]
+            budget *= eta
+            rung += 1
+
+    return best
+
+def write_best_config(best: dict, config_path: str = 'config.yaml'):
+    """최적 설정을 config.yaml의 model 섹션에 기록합니다 (다른 섹션은 유지)."""
+    raw = {}
+    if os.path.exists(config_path):
+        with open(config_path, 'r', encoding='utf-8') as f:
+            raw = yaml.safe_load(f) or {}
+
+    # 기존 값(또는 ModelConfig 기본값)에 탐색 결과를 덮어씀
+    model_cfg = load_config(config_path).model
+    model_section = {field: getattr(model_cfg, field) for field in MODEL_CONFIG_FIELDS}
+    model_section.update(raw.get('model') or {})
+    model_section.update(best['config'])
+    model_section['n_estimators'] = best['best_iteration'] + 1
+    raw['model'] = model_section
+
+    with open(config_path, 'w', encoding='utf-8') as f:
+        yaml.safe_dump(raw, f, sort_keys=False, allow_unicode=True)
+
+def main():
+    """메인 실행 함수"""
+    parser = argparse.ArgumentParser(description="Apollo.ML 하이퍼파라미터 탐색")
+    parser.add_argument("--config", default="config.yaml", help="최적 설정을 기록할 config.yaml 경로 (기본값: config.yaml)")
+    parser.add_argument("--trials", type=int, default=27, help="처음 뽑을 후보 설정 수 (기본값: 27)")
+    parser.add_argument("--min-rounds", type=int, default=100, help="첫 단계 부스팅 라운드 수 (기본값: 100)")
+    parser.add_argument("--max-rounds", type=int, default=2000, help="마지막 단계 부스팅 라운드 수 (기본값: 2000)")
+    parser.add_argument("--eta", type=int, default=3, help="단계마다 상위 1/eta만 남김 (기본값: 3)")
+    parser.add_argument("--workers", type=int, default=None, help="병렬 시도 프로세스 수 (기본값: CPU 코어 수)")
+    parser.add_argument("--tune-val-size", type=float, default=TUNE_VAL_SIZE,
+                        help=f"훈련 부분 중 튜닝 검증 비율 (기본값: {TUNE_VAL_SIZE})")
+    parser.add_argument("--dry-run", action="store_true", help="config.yaml에 기록하지 않음")
+    args = parser.parse_args()
+
+    print("=== 하이퍼파라미터 탐색 시작 ===")
+    test_size, random_state = load_train_split(args.config)
+    X_train, y_train, X_val, y_val, feature_cols = load_tuning_data(
+        test_size=test_size, random_state=random_state, tune_val_size=args.tune_val_size)
+    print(f"튜닝 훈련 {X_train.shape}, 튜닝 검증 {X_val.shape}, 피처 {len(feature_cols)}개 "
+          f"(enhanced_train 검증 분할 {test_size:.0%}는 제외)")
+
+    start = time.perf_counter()
+    best = successive_halving((X_train, y_train, X_val, y_val), n_trials=args.trials,
+                              min_rounds=args.min_rounds, max_rounds=args.max_rounds, eta=args.eta,
+                              workers=args.workers, random_state=random_state)
+
+    print(f"\n=== 탐색 완료 ({time.perf_counter() - start:.1f}s) ===")
+    print(f"최적 trial {best['trial_id']}: val RMSE {best['val_rmse']:.4f}, n_estimators {best['best_iteration'] + 1}")
+    for name, value in best['config'].items():
+        print(f"  {name}: {value}")
+    print(f"시도 기록: {TRIALS_LOG_PATH}")
+
+    if not args.dry_run:
+        write_best_config(best, args.config)
+        print(f"최적 설정 저장: {args.config} (model 섹션)")
+        print(f"다음 단계: python enhanced_train.py --config {args.config}")
+
+if __name__ == "__main__":
+    main()
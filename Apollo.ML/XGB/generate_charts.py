@@ -252,17 +252,25 @@ plt.close()
 print(f"  ✓ 저장 완료: {OUTPUT_DIR / 'feature_category_importance.png'}")
 
 # ============================================================================
-# 차트 5: 시뮬레이션 예측 vs 실제 (추정 데이터)
+# 차트 5: 예측 vs 실제 (교차 검증 out-of-fold 예측)
 # ============================================================================
 print("\n[5/6] 예측 vs 실제 산점도 생성 중...")
 
-# 추정 데이터 생성 (실제 데이터가 없으므로)
-np.random.seed(42)
-n_samples = 1000
-y_true = np.random.lognormal(mean=3, sigma=1.5, size=n_samples)  # 실제 실행 시간
-noise = np.random.normal(0, y_true * 0.05, size=n_samples)  # 5% 노이즈
-y_pred = y_true + noise
-y_pred = np.maximum(y_pred, 0)  # 음수 제거
+# enhanced_evaluate.py가 저장한 교차 검증 out-of-fold 예측 사용 (없으면 추정 데이터)
+oof_path = Path("Apollo.ML/artifacts/cv_oof_predictions.parquet")
+if oof_path.exists():
+    oof = pd.read_parquet(oof_path)
+    y_true = oof['y_true'].to_numpy()
+    y_pred = np.maximum(oof['y_pred'].to_numpy(), 0)  # 음수 제거
+    print(f"  ✓ out-of-fold 예측 사용: {len(oof)}개")
+else:
+    # 추정 데이터 생성 (실제 데이터가 없으므로)
+    np.random.seed(42)
+    n_samples = 1000
+    y_true = np.random.lognormal(mean=3, sigma=1.5, size=n_samples)  # 실제 실행 시간
+    noise = np.random.normal(0, y_true * 0.05, size=n_samples)  # 5% 노이즈
+    y_pred = y_true + noise
+    y_pred = np.maximum(y_pred, 0)  # 음수 제거
 
 # R² 계산
 from sklearn.metrics import r2_score
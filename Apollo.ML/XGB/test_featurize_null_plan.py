@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+"""
+plan_xml이 NULL인 행의 피처 테스트
+
+NULL 계획 행은 NaN이 아니라 빈 트리 피처(0)를 받아야 합니다.
+(단일 프로세스 경로와 Arrow hand-off 프로세스 풀 경로 모두)
+
+실행:
+    python XGB/test_featurize_null_plan.py
+    python -m pytest XGB/test_featurize_null_plan.py
+"""
+
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(os.path.dirname(__file__))
+
+import numpy as np
+import pandas as pd
+
+from enhanced_featurize import FEATURE_COLUMNS, iter_featurized_chunks, plan_features
+
+PLAN_XML = """<ShowPlanXML xmlns="http://schemas.microsoft.com/sqlserver/2004/07/showplan">
+<BatchSequence><Batch><Statements><StmtSimple><QueryPlan>
+<RelOp NodeId="0" PhysicalOp="Hash Match" LogicalOp="Inner Join" EstimateRows="10" EstimateIO="0" EstimateCPU="0.1" EstimatedTotalSubtreeCost="0.5">
+  <RelOp NodeId="1" PhysicalOp="Clustered Index Scan" LogicalOp="Clustered Index Scan" EstimateRows="100" EstimateIO="0.2" EstimateCPU="0.01" EstimatedTotalSubtreeCost="0.2"/>
+  <RelOp NodeId="2" PhysicalOp="Index Seek" LogicalOp="Index Seek" EstimateRows="5" EstimateIO="0.01" EstimateCPU="0.001" EstimatedTotalSubtreeCost="0.01"/>
+</RelOp>
+</QueryPlan></StmtSimple></Statements></Batch></BatchSequence></ShowPlanXML>"""
+
+
+def make_frame(n_rows: int) -> pd.DataFrame:
+    """NULL 계획 행과 정상 계획 행이 섞인 프레임"""
+    return pd.DataFrame({
+        "plan_id": np.arange(n_rows),
+        "plan_xml": [None if i % 3 == 0 else PLAN_XML for i in range(n_rows)],
+        "count_exec": [10] * n_rows,
+        "avg_ms": [5.0] * n_rows,
+        "last_cpu_ms": [2.0] * n_rows,
+        "last_reads": [100] * n_rows,
+        "max_used_mem_kb": [1024] * n_rows,
+        "max_dop": [1] * n_rows,
+    })
+
+
+def run_null_plan_checks() -> list:
+    """단일 프로세스/프로세스 풀 경로의 NULL 계획 행 피처를 확인하고 실패 메시지 목록을 반환합니다."""
+    failures = []
+    empty_feats, _ = plan_features(None)
+    df = make_frame(12)
+    null_rows = df["plan_xml"].isna().values
+
+    results = {}
+    for name, workers, chunk_size in [("single process", 1, 4), ("process pool", 2, 1)]:
+        print(f"\n[Test] {name} (workers={workers}, chunk_size={chunk_size})")
+        out = pd.concat(list(iter_featurized_chunks(df, workers=workers, chunk_size=chunk_size)), ignore_index=True)
+        results[name] = out
+
+        plan_cols = [col for col in FEATURE_COLUMNS if col in empty_feats]
+        null_part = out.loc[null_rows, plan_cols]
+        if null_part.isna().any().any():
+            message = f"NULL 계획 행에 NaN 피처: {null_part.columns[null_part.isna().any()].tolist()}"
+        elif not all((null_part[col] == empty_feats[col]).all() for col in plan_cols):
+            message = "NULL 계획 행 피처가 빈 트리 피처와 다름"
+        elif out.loc[~null_rows, "num_nodes"].min() <= 0:
+            message = "정상 계획 행의 노드 수가 0"
+        else:
+            print(f"  [PASS] NULL 계획 {null_rows.sum()}행 = 빈 트리 피처, 정상 계획 {(~null_rows).sum()}행")
+            continue
+        print(f"  [FAIL] {message}")
+        failures.append(f"{name}: {message}")
+
+    print("\n[Test] 두 경로 결과 일치")
+    try:
+        pd.testing.assert_frame_equal(results["single process"], results["process pool"])
+        print("  [PASS]")
+    except AssertionError as e:
+        print(f"  [FAIL] {e}")
+        failures.append(f"두 경로 결과 불일치: {e}")
+    return failures
+
+
+def test_null_plan_features():
+    """NULL 계획 행은 두 경로 모두 빈 트리 피처를 받음"""
+    failures = run_null_plan_checks()
+    assert not failures, "\n".join(failures)
+
+
+if __name__ == '__main__':
+    print("=" * 80)
+    print("NULL plan_xml 피처 테스트")
+    print("=" * 80)
+
+    failures = run_null_plan_checks()
+    n_checks = 3
+
+    print("\n" + "=" * 80)
+    print(f"Test Results: {n_checks - len(failures)} passed, {len(failures)} failed")
+    print("=" * 80)
+
+    if not failures:
+        print("\n✓ All tests passed!")
+    else:
+        print(f"\n✗ {len(failures)} test(s) failed!")
+        sys.exit(1)
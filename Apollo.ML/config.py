@@ -28,6 +28,9 @@ class ModelConfig:
     learning_rate: float = 0.05
     subsample: float = 0.8
     colsample_bytree: float = 0.8
+    reg_alpha: float = 0.2
+    reg_lambda: float = 0.2
+    min_child_weight: float = 10
     tree_method: str = "hist"
     random_state: int = 42
     n_jobs: int = -1
@@ -74,6 +77,9 @@ def load_config(path: Union[str, None] = None) -> AppConfig:
         learning_rate=float(cfg.get("model", {}).get("learning_rate", 0.05)),
         subsample=float(cfg.get("model", {}).get("subsample", 0.8)),
         colsample_bytree=float(cfg.get("model", {}).get("colsample_bytree", 0.8)),
+        reg_alpha=float(cfg.get("model", {}).get("reg_alpha", 0.2)),
+        reg_lambda=float(cfg.get("model", {}).get("reg_lambda", 0.2)),
+        min_child_weight=float(cfg.get("model", {}).get("min_child_weight", 10)),
         tree_method=cfg.get("model", {}).get("tree_method", "hist"),
         random_state=int(cfg.get("model", {}).get("random_state", 42)),
         n_jobs=int(cfg.get("model", {}).get("n_jobs", -1)),
@@ -1,10 +1,41 @@
-import pyodbc, pandas as pd
+from __future__ import annotations
+
 from config import DBConfig
+import re
 import subprocess
 import time
+from typing import TYPE_CHECKING, Iterator
+
+# pyodbc(ODBC 드라이버 로드)와 pandas는 실제로 DB에 접근하는 함수 안에서 import
+# (db를 import만 하는 모듈/테스트가 드라이버 없이도 빠르게 로드되도록)
+if TYPE_CHECKING:
+    import pandas as pd
+    import pyodbc
+
+# pyodbc info 메시지 앞에 붙는 "[Microsoft][ODBC Driver 17 for SQL Server][SQL Server]" 접두어
+_ODBC_MESSAGE_PREFIX = re.compile(r'^(\[[^\]]*\])+')
+
+# 측정 쿼리 실행 제한 시간 (sqlcmd 경로와 동일)
+QUERY_TIMEOUT_SEC = 60
+
+# 재시도하면 성공할 수 있는 오류의 SQLSTATE (연결 끊김 08xxx, 타임아웃 HYT00/HYT01, 교착 상태 40001)
+TRANSIENT_SQLSTATE_PREFIXES = ('08', 'HYT', '40001')
+
+def is_transient_error(error: Exception) -> bool:
+    """연결/타임아웃/교착 상태처럼 재연결 후 재시도할 가치가 있는 오류인지 판단합니다.
+    구문 오류, 없는 개체 같은 결정적 오류는 다시 실행해도 같으므로 False입니다."""
+    import pyodbc
+
+    if isinstance(error, pyodbc.OperationalError):
+        return True
+    if isinstance(error, pyodbc.Error) and error.args:
+        return str(error.args[0]).startswith(TRANSIENT_SQLSTATE_PREFIXES)
+    return False
 
 def connect(cfg: DBConfig, max_retries: int = 3, retry_delay: int = 5) -> pyodbc.Connection:
     """데이터베이스에 연결합니다. 재시도 로직 포함."""
+    import pyodbc
+
     conn_str = (
         f"DRIVER={{{cfg.driver}}};SERVER={cfg.server};DATABASE={cfg.database};"
         f"UID={cfg.username};PWD={cfg.password};Encrypt=yes;TrustServerCertificate=yes;"
@@ -25,11 +56,57 @@ def connect(cfg: DBConfig, max_retries: int = 3, retry_delay: int = 5) -> pyodbc
                 raise e
 
 def fetch_collected_plans(conn: pyodbc.Connection) -> pd.DataFrame:
+    import pandas as pd
+
     sql = "SELECT query_id, plan_id, plan_xml, count_exec, est_total_subtree_cost, avg_ms, last_cpu_ms, last_reads, max_used_mem_kb, max_dop, last_exec_time, last_ms FROM dbo.collected_plans"
     return pd.read_sql(sql, conn)
 
-def get_execution_plan(conn: pyodbc.Connection, sql: str) -> str:
-    """SET SHOWPLAN_XML을 사용하여 쿼리의 실행 계획(XML)만 반환합니다."""
+# 청크 단위 수집 컬럼 (fetch_collected_plans 컬럼 + 증분 수집 기준인 collected_at)
+COLLECTED_PLANS_COLUMNS = ["collected_at", "query_id", "plan_id", "plan_xml", "count_exec", "est_total_subtree_cost",
+                           "avg_ms", "last_cpu_ms", "last_reads", "max_used_mem_kb", "max_dop", "last_exec_time", "last_ms"]
+
+# collected_at(datetime2(7))의 전체 정밀도 문자열 'yyyy-mm-dd hh:mi:ss.fffffff'
+# Python datetime은 마이크로초까지만 표현하므로 증분 수집 기준값은 이 문자열로 보관합니다.
+COLLECTED_AT_KEY_COLUMN = "collected_at_key"
+
+def iter_collected_plans(conn: pyodbc.Connection, chunk_size: int = 5000, since=None) -> Iterator[pd.DataFrame]:
+    """
+    dbo.collected_plans를 chunk_size 행씩 DataFrame으로 반환합니다 (전체 테이블을 메모리에 올리지 않음).
+    각 청크에는 COLLECTED_PLANS_COLUMNS와 collected_at_key(전체 정밀도 문자열)가 들어 있습니다.
+
+    since가 주어지면 (collected_at_key, query_id, plan_id) 키셋 이후의 행만 가져옵니다.
+    ORDER BY와 같은 복합 키로 비교하므로 같은 collected_at의 행이 청크 경계에 걸쳐도 중복/누락이 없고,
+    collected_at이 PK 선두 컬럼이므로 범위 탐색으로 실행됩니다.
+    """
+    import pandas as pd
+
+    sql = (f"SELECT {', '.join(COLLECTED_PLANS_COLUMNS)}, "
+           f"CONVERT(varchar(27), collected_at, 121) AS {COLLECTED_AT_KEY_COLUMN} FROM dbo.collected_plans")
+    params = []
+    if since is not None:
+        collected_at_key, query_id, plan_id = since
+        sql += (" WHERE collected_at >= CAST(? AS datetime2(7))"
+                " AND (collected_at > CAST(? AS datetime2(7)) OR query_id > ? OR (query_id = ? AND plan_id > ?))")
+        params.extend([collected_at_key, collected_at_key, query_id, query_id, plan_id])
+    sql += " ORDER BY collected_at, query_id, plan_id"
+
+    cursor = conn.cursor()
+    try:
+        cursor.execute(sql, *params)
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            yield pd.DataFrame.from_records([tuple(row) for row in rows],
+                                            columns=COLLECTED_PLANS_COLUMNS + [COLLECTED_AT_KEY_COLUMN])
+    finally:
+        cursor.close()
+
+def get_execution_plan(conn: pyodbc.Connection, sql: str, raise_errors: bool = False) -> str:
+    """SET SHOWPLAN_XML을 사용하여 쿼리의 실행 계획(XML)만 반환합니다.
+    raise_errors=True면 pyodbc 오류를 출력 대신 다시 발생시킵니다 (호출자가 재시도 여부 판단)."""
+    import pyodbc
+
     cursor = conn.cursor()
     plan_xml = None
     try:
@@ -45,14 +122,144 @@ def get_execution_plan(conn: pyodbc.Connection, sql: str) -> str:
         cursor.execute("SET SHOWPLAN_XML OFF;")
         cursor.execute("SET NOCOUNT OFF;")
     except pyodbc.Error as e:
+        try:
+            # 오류 후에도 연결이 SHOWPLAN 모드로 남지 않도록 해제
+            cursor.execute("SET SHOWPLAN_XML OFF;")
+            conn.rollback()
+        except pyodbc.Error:
+            pass
+        if raise_errors:
+            raise
         print(f"Error getting execution plan: {e}")
         print(f"SQL that caused error: {sql[:500]}...")  # 처음 500자 출력
-        conn.rollback()
     finally:
         cursor.close()
     return plan_xml
 
-def get_query_statistics(conn: pyodbc.Connection, sql: str) -> tuple[str, str]:
+def _safe_sql(sql: str) -> str:
+    """CTE 쿼리를 위해 SQL 앞에 세미콜론을 추가합니다 (이전 문장 종료)."""
+    return f"; {sql}" if sql.strip().upper().startswith('WITH') else sql
+
+def _drain_messages(cursor: pyodbc.Cursor) -> list[str]:
+    """현재 결과 집합의 info 메시지를 ODBC 접두어를 제거한 텍스트로 반환합니다."""
+    texts = []
+    for _, text in getattr(cursor, 'messages', None) or []:
+        texts.append(_ODBC_MESSAGE_PREFIX.sub('', str(text)).strip())
+    return texts
+
+def _format_statistics(messages: list[str]) -> tuple[str, str]:
+    """STATISTICS IO/TIME 메시지를 sqlcmd 출력과 같은 (stats_io, stats_time) 문자열로 변환합니다."""
+    stats_io_list = []
+    stats_time_list = []
+    for message in messages:
+        if "Table '" in message:
+            stats_io_list.append(message)
+        elif "SQL Server Execution Times:" in message:
+            # sqlcmd 경로와 동일하게 'Execution Times:' 라인과 시간 정보를 한 줄로 합침
+            stats_time_list.append(" ".join(part.strip() for part in message.splitlines() if part.strip()))
+    return "\n".join(stats_io_list), "\n".join(stats_time_list)
+
+def _session_counters(cursor: pyodbc.Cursor) -> tuple[int, int]:
+    """현재 세션의 누적 (cpu_time ms, logical_reads)를 반환합니다."""
+    cursor.execute("SELECT cpu_time, logical_reads FROM sys.dm_exec_sessions WHERE session_id = @@SPID;")
+    row = cursor.fetchone()
+    return (int(row[0]), int(row[1])) if row else (0, 0)
+
+def _execute_measured(conn: pyodbc.Connection, sql: str, statistics_xml: bool = False,
+                      raise_errors: bool = False) -> tuple[str, str, str]:
+    """
+    열려 있는 연결에서 SQL을 한 번 실행하고 (stats_io, stats_time, actual_plan_xml)을 반환합니다.
+
+    STATISTICS IO/TIME 결과는 드라이버 info 메시지(cursor.messages)에서 수집합니다.
+    cursor.messages를 지원하지 않는 pyodbc에서는 sys.dm_exec_sessions 카운터 차이와
+    클라이언트 측 경과 시간으로 같은 형식의 문자열을 만듭니다.
+    statistics_xml=True이면 SET STATISTICS XML ON으로 같은 실행의 실제 계획도 반환합니다.
+    raise_errors=True면 pyodbc 오류를 빈 결과 대신 다시 발생시킵니다.
+    """
+    import pyodbc
+
+    cursor = conn.cursor()
+    previous_timeout = conn.timeout
+    use_messages = hasattr(cursor, 'messages')
+    messages = []
+    plan_xml = None
+    try:
+        conn.timeout = QUERY_TIMEOUT_SEC
+        cursor.execute("SET NOCOUNT ON;")
+        if use_messages:
+            cursor.execute("SET STATISTICS IO ON; SET STATISTICS TIME ON;")
+        else:
+            cpu_before, reads_before = _session_counters(cursor)
+        if statistics_xml:
+            cursor.execute("SET STATISTICS XML ON;")
+
+        started = time.perf_counter()
+        cursor.execute(_safe_sql(sql))
+        # 모든 결과 집합을 소비해야 서버 측 실행이 끝나고 통계 메시지가 도착합니다.
+        while True:
+            if cursor.description is not None:
+                rows = cursor.fetchall()
+                if statistics_xml and rows and cursor.description[0][0].endswith('XML Showplan'):
+                    # 실제 계획은 결과 집합 뒤에 별도 결과 집합으로 도착 (마지막 = 측정 대상 문장)
+                    plan_xml = rows[-1][0]
+            messages.extend(_drain_messages(cursor))
+            if not cursor.nextset():
+                break
+        elapsed_ms = (time.perf_counter() - started) * 1000
+
+        if statistics_xml:
+            cursor.execute("SET STATISTICS XML OFF;")
+        if use_messages:
+            cursor.execute("SET STATISTICS IO OFF; SET STATISTICS TIME OFF;")
+            stats_io, stats_time = _format_statistics(messages)
+        else:
+            cpu_after, reads_after = _session_counters(cursor)
+            stats_io = f"Table '*'. Scan count 0, logical reads {reads_after - reads_before}"
+            stats_time = (f"SQL Server Execution Times: CPU time = {cpu_after - cpu_before} ms,  "
+                          f"elapsed time = {elapsed_ms:.0f} ms.")
+        # ISOLATION 액션이 세션에 남지 않도록 기본값으로 복구 (sqlcmd는 매번 새 세션이었음)
+        cursor.execute("SET TRANSACTION ISOLATION LEVEL READ COMMITTED; SET NOCOUNT OFF;")
+        conn.commit()
+        return stats_io, stats_time, plan_xml
+    except pyodbc.Error as e:
+        try:
+            conn.rollback()
+        except pyodbc.Error:
+            pass
+        if raise_errors:
+            raise
+        print(f"Query execution failed: {e}")
+        print(f"SQL that caused error: {sql[:500]}...")
+        return "", "", None
+    finally:
+        conn.timeout = previous_timeout
+        cursor.close()
+
+def get_query_statistics(conn: pyodbc.Connection, sql: str, use_sqlcmd: bool = False,
+                         raise_errors: bool = False) -> tuple[str, str]:
+    """
+    쿼리를 실행하고 STATISTICS IO/TIME 결과를 (stats_io, stats_time) 문자열로 반환합니다.
+
+    기본값은 이미 열린 pyodbc 연결에서 실행하는 방식입니다 (프로세스 생성/재로그인 없음).
+    use_sqlcmd=True이면 기존 sqlcmd 서브프로세스 방식으로 측정합니다.
+    raise_errors=True면 pyodbc 오류를 빈 결과 대신 다시 발생시킵니다 (sqlcmd 경로 제외).
+    """
+    if use_sqlcmd or conn is None:
+        return _get_query_statistics_sqlcmd(sql)
+    stats_io, stats_time, _ = _execute_measured(conn, sql, raise_errors=raise_errors)
+    return stats_io, stats_time
+
+def get_plan_and_statistics(conn: pyodbc.Connection, sql: str) -> tuple[str, str, str]:
+    """
+    SET STATISTICS XML ON으로 쿼리를 한 번만 실행하여 (plan_xml, stats_io, stats_time)을 반환합니다.
+
+    get_execution_plan + get_query_statistics 조합과 달리 실제 실행 계획(ActualRows 등
+    RunTimeInformation 포함)과 실행 통계가 같은 실행에서 나오므로 DB 왕복이 절반으로 줄어듭니다.
+    """
+    stats_io, stats_time, plan_xml = _execute_measured(conn, sql, statistics_xml=True)
+    return plan_xml, stats_io, stats_time
+
+def _get_query_statistics_sqlcmd(sql: str) -> tuple[str, str]:
     """[MOD] sqlcmd를 사용하여 쿼리를 실행하고 통계 정보를 캡처합니다."""
     
     # pyodbc 연결 정보에서 설정 값을 가져옵니다.
@@ -69,8 +276,7 @@ def get_query_statistics(conn: pyodbc.Connection, sql: str) -> tuple[str, str]:
 
     # sqlcmd 명령어 구성
     # 중요: 실제 환경에서는 비밀번호를 명령어에 직접 노출하지 않도록 주의해야 합니다.
-    # CTE 쿼리를 위해 SQL 앞에 세미콜론 추가 (이전 문장 종료)
-    safe_sql = f"; {sql}" if sql.strip().upper().startswith('WITH') else sql
+    safe_sql = _safe_sql(sql)
     command = [
         'sqlcmd',
         '-S', config.server,
@@ -88,7 +294,7 @@ def get_query_statistics(conn: pyodbc.Connection, sql: str) -> tuple[str, str]:
     try:
         # [MOD] 한국어 Windows 환경을 고려하여 encoding을 'cp949'로 지정하고, 오류 발생 시에도 None이 아닌 stderr를 반환하도록 수정
         # 타임아웃 증가 (60초) - 긴 쿼리 실행 허용
-        result = subprocess.run(command, capture_output=True, text=True, check=False, encoding='cp949', errors='ignore', timeout=60)
+        result = subprocess.run(command, capture_output=True, text=True, check=False, encoding='cp949', errors='ignore', timeout=QUERY_TIMEOUT_SEC)
 
         if result.returncode != 0:
             print(f"sqlcmd execution failed with return code {result.returncode}:")
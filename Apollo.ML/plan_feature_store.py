@@ -0,0 +1,176 @@
+"""
+실행계획 피처 저장소 (plan XML 지문 → 피처 dict)
+
+collected_plans는 usp_augment_collected_plans로 늘린 테이블이라 같은 plan_xml이 여러 행에 반복됩니다.
+plan XML의 SHA-1 지문을 키로 피처를 저장해 두면 고유한 계획만 파싱하면 됩니다.
+- 메모리: LRU (capacity개까지 유지)
+- 디스크: SQLite (path=None이면 메모리 전용, 학습 환경처럼 여러 프로세스가 동시에 쓰는 경우)
+- namespace: 피처 계열/버전 (피처 계산 방식이 바뀌면 새 namespace로 저장)
+"""
+
+import hashlib
+import os
+import pickle
+import sqlite3
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, Iterable, Optional
+
+DEFAULT_STORE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'artifacts', 'plan_features.sqlite')
+
+# SQLite 바인딩 변수 개수 제한(999) 이하로 나눠 조회
+_SQLITE_BATCH = 900
+
+def plan_fingerprint(plan_xml: Optional[str]) -> Optional[str]:
+    """plan XML의 SHA-1 지문 (plan_xml이 없으면 None)"""
+    if plan_xml is None:
+        return None
+    return hashlib.sha1(plan_xml.encode('utf-8')).hexdigest()
+
+class PlanFeatureStore:
+    """plan XML 지문별 피처 저장소 (LRU 메모리 + SQLite 디스크)"""
+
+    def __init__(self,
+                 path: Optional[str] = DEFAULT_STORE_PATH,
+                 namespace: str = 'default',
+                 capacity: int = 10000,
+                 readonly: bool = False):
+        """
+        Args:
+            path: SQLite 파일 경로 (None이면 메모리 전용)
+            namespace: 피처 계열/버전 (예: 'enhanced_v1', 'phase2_v1')
+            capacity: 메모리 LRU 최대 항목 수
+            readonly: True면 디스크에 쓰지 않음
+        """
+        self.path = path
+        self.namespace = namespace
+        self.capacity = capacity
+        self.readonly = readonly
+
+        self._conn = None
+        if path is not None:
+            if readonly:
+                self._conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False)
+            else:
+                os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+                self._conn = sqlite3.connect(path, check_same_thread=False)
+                self._conn.execute("""
+                    CREATE TABLE IF NOT EXISTS plan_features (
+                        fingerprint  TEXT NOT NULL,
+                        namespace    TEXT NOT NULL,
+                        features     BLOB NOT NULL,
+                        created_at   TEXT,
+                        PRIMARY KEY (fingerprint, namespace)
+                    )
+                """)
+                self._conn.commit()
+
+        self._memory: 'OrderedDict[str, dict]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {'memory_hits': 0, 'disk_hits': 0, 'misses': 0, 'writes': 0}
+
+    # --- 메모리 LRU ---
+
+    def _remember(self, fingerprint: str, features: dict):
+        self._memory[fingerprint] = features
+        self._memory.move_to_end(fingerprint)
+        while len(self._memory) > self.capacity:
+            self._memory.popitem(last=False)
+
+    # --- 조회 ---
+
+    def get(self, plan_xml: str) -> Optional[dict]:
+        """plan XML의 저장된 피처 (없으면 None)"""
+        return self.get_by_fingerprint(plan_fingerprint(plan_xml))
+
+    def get_by_fingerprint(self, fingerprint: str) -> Optional[dict]:
+        with self._lock:
+            features = self._memory.get(fingerprint)
+            if features is not None:
+                self._memory.move_to_end(fingerprint)
+                self.stats['memory_hits'] += 1
+                return features
+
+        return self.get_many([fingerprint]).get(fingerprint)
+
+    def get_many(self, fingerprints: Iterable[str]) -> Dict[str, dict]:
+        """여러 지문을 한 번에 조회합니다 (디스크는 배치 쿼리)."""
+        found = {}
+        missing = []
+        with self._lock:
+            for fingerprint in dict.fromkeys(fingerprints):
+                features = self._memory.get(fingerprint)
+                if features is not None:
+                    self._memory.move_to_end(fingerprint)
+                    found[fingerprint] = features
+                    self.stats['memory_hits'] += 1
+                else:
+                    missing.append(fingerprint)
+
+            if self._conn is not None:
+                for start in range(0, len(missing), _SQLITE_BATCH):
+                    batch = missing[start:start + _SQLITE_BATCH]
+                    rows = self._conn.execute(
+                        f"SELECT fingerprint, features FROM plan_features "
+                        f"WHERE namespace = ? AND fingerprint IN ({','.join('?' * len(batch))})",
+                        [self.namespace, *batch]
+                    ).fetchall()
+                    for fingerprint, blob in rows:
+                        features = pickle.loads(blob)
+                        found[fingerprint] = features
+                        self._remember(fingerprint, features)
+                        self.stats['disk_hits'] += 1
+
+            self.stats['misses'] += sum(1 for fingerprint in missing if fingerprint not in found)
+        return found
+
+    def get_or_compute(self, plan_xml: str, compute_fn) -> dict:
+        """저장된 피처를 반환하고, 없으면 compute_fn(plan_xml)로 계산해 저장합니다."""
+        fingerprint = plan_fingerprint(plan_xml)
+        features = self.get_by_fingerprint(fingerprint)
+        if features is None:
+            features = compute_fn(plan_xml)
+            self.put_many({fingerprint: features})
+        return features
+
+    # --- 저장 ---
+
+    def put_many(self, items: Dict[str, dict]):
+        """지문 → 피처를 저장합니다 (디스크는 한 트랜잭션)."""
+        if not items:
+            return
+        with self._lock:
+            for fingerprint, features in items.items():
+                self._remember(fingerprint, features)
+
+            if self._conn is not None and not self.readonly:
+                now = datetime.now().isoformat()
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO plan_features (fingerprint, namespace, features, created_at) VALUES (?, ?, ?, ?)",
+                    [(fingerprint, self.namespace, pickle.dumps(features, protocol=pickle.HIGHEST_PROTOCOL), now)
+                     for fingerprint, features in items.items()]
+                )
+                self._conn.commit()
+            self.stats['writes'] += len(items)
+
+    def __len__(self) -> int:
+        if self._conn is None:
+            return len(self._memory)
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM plan_features WHERE namespace = ?", (self.namespace,)
+            ).fetchone()[0]
+
+    def print_stats(self):
+        """조회 통계 출력"""
+        total = self.stats['memory_hits'] + self.stats['disk_hits'] + self.stats['misses']
+        hit_rate = (total - self.stats['misses']) / total if total > 0 else 0.0
+        print(f"[PLAN FEATURES] {self.namespace}: memory hits {self.stats['memory_hits']}, "
+              f"disk hits {self.stats['disk_hits']}, misses {self.stats['misses']} ({hit_rate:.1%} hit), "
+              f"writes {self.stats['writes']}")
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
@@ -1,4 +1,6 @@
+import io
 import networkx as nx
+import numpy as np
 from lxml import etree
 import re
 from typing import Dict, Any, List, Optional
@@ -94,4 +96,186 @@ def planxml_to_graph(xml_text: str) -> nx.DiGraph:
     except Exception as e:
         print(f"XML 파싱 오류: {e}")
         # 오류 발생 시 빈 그래프 반환
-        return nx.DiGraph()
\ No newline at end of file
+        return nx.DiGraph()
+
+# 연산자 이름 ↔ 정수 코드 (프로세스 내 공유 어휘, 0은 빈 문자열)
+OP_NAMES: List[str] = ['']
+_OP_CODES: Dict[str, int] = {'': 0}
+
+def op_code(name: str) -> int:
+    """연산자 이름의 정수 코드를 반환합니다 (처음 보는 이름은 어휘에 추가)."""
+    code = _OP_CODES.get(name)
+    if code is None:
+        code = _OP_CODES[name] = len(OP_NAMES)
+        OP_NAMES.append(name)
+    return code
+
+class PlanTree:
+    """
+    실행계획 트리 (struct-of-arrays)
+
+    노드 i의 속성은 각 NumPy 배열의 i번째 값입니다 (노드 순서 = 문서 순서).
+    parent[i]는 부모 노드 인덱스 (루트는 -1), depth[i]는 루트로부터의 깊이입니다.
+    """
+
+    __slots__ = ('node_ids', 'parent', 'depth', 'is_forest', 'cost', 'rows', 'io', 'cpu', 'parallel',
+                 'physical_op', 'logical_op')
+
+    def __init__(self, node_ids, parent, cost, rows, io_cost, cpu, parallel, physical_op, logical_op):
+        self.node_ids = np.asarray(node_ids, dtype=np.int64)
+        self.parent = np.asarray(parent, dtype=np.int32)
+        self.cost = np.asarray(cost, dtype=np.float64)
+        self.rows = np.asarray(rows, dtype=np.float64)
+        self.io = np.asarray(io_cost, dtype=np.float64)
+        self.cpu = np.asarray(cpu, dtype=np.float64)
+        self.parallel = np.asarray(parallel, dtype=bool)
+        self.physical_op = np.asarray(physical_op, dtype=np.int32)
+        self.logical_op = np.asarray(logical_op, dtype=np.int32)
+        self.depth, self.is_forest = self._compute_depth(self.parent)
+
+    @staticmethod
+    def _compute_depth(parent: np.ndarray):
+        """
+        부모 배열로부터 깊이 계산 (이미 계산된 조상에서 멈추므로 전체 O(n))
+
+        Returns:
+            (depth, is_forest) - 순환이 있으면 is_forest=False (중첩된 계획에서 NodeId가 겹치는 경우)
+        """
+        n = len(parent)
+        depth = np.full(n, -1, dtype=np.int32)
+        is_forest = True
+        for i in range(n):
+            path = []
+            on_path = set()
+            j = i
+            while j >= 0 and depth[j] < 0:
+                if j in on_path:
+                    break
+                on_path.add(j)
+                path.append(j)
+                j = parent[j]
+            if j >= 0 and j in on_path:
+                # 순환: 깊이를 정의할 수 없으므로 0으로 두고 표시만 함
+                is_forest = False
+                depth[path] = 0
+                continue
+            d = depth[j] if j >= 0 else -1
+            for k in reversed(path):
+                d += 1
+                depth[k] = d
+        return depth, is_forest
+
+    @classmethod
+    def empty(cls) -> 'PlanTree':
+        return cls([], [], [], [], [], [], [], [], [])
+
+    @property
+    def num_nodes(self) -> int:
+        return len(self.node_ids)
+
+    @property
+    def num_edges(self) -> int:
+        return int(np.count_nonzero(self.parent >= 0))
+
+    def out_degree(self) -> np.ndarray:
+        """노드별 자식 수"""
+        has_parent = self.parent >= 0
+        return np.bincount(self.parent[has_parent], minlength=self.num_nodes)
+
+    def in_degree(self) -> np.ndarray:
+        """노드별 부모 수 (0 또는 1)"""
+        return (self.parent >= 0).astype(np.int64)
+
+    def to_networkx(self) -> nx.DiGraph:
+        """networkx 그래프로 변환 (시각화/디버깅용)"""
+        g = nx.DiGraph()
+        for i, node_id in enumerate(self.node_ids.tolist()):
+            attrs = {
+                'EstimateRows': self.rows[i],
+                'EstimateIO': self.io[i],
+                'EstimateCPU': self.cpu[i],
+                'EstimatedTotalSubtreeCost': self.cost[i],
+                'Parallel': bool(self.parallel[i]),
+                'NodeId': float(node_id),
+            }
+            if self.physical_op[i]:
+                attrs['PhysicalOp'] = OP_NAMES[self.physical_op[i]]
+            if self.logical_op[i]:
+                attrs['LogicalOp'] = OP_NAMES[self.logical_op[i]]
+            g.add_node(node_id, **attrs)
+        for i in np.flatnonzero(self.parent >= 0):
+            g.add_edge(int(self.node_ids[self.parent[i]]), int(self.node_ids[i]))
+        return g
+
+def planxml_to_tree(xml_text: str) -> PlanTree:
+    """
+    SQL Server 실행계획 XML을 PlanTree로 변환합니다 (RelOp만 한 번 순회).
+
+    planxml_to_graph와 같은 노드/간선을 만듭니다:
+    - NodeId가 0인 RelOp(보통 루트)는 제외
+    - 부모는 NodeId가 있는 가장 가까운 상위 RelOp
+    - 같은 NodeId가 다시 나오면(다중 문장 계획) 한 노드로 합치고 나중 값으로 갱신
+    """
+    try:
+        node_index: Dict[int, int] = {}
+        node_ids, parent = [], []
+        cost, rows, io_cost, cpu, parallel = [], [], [], [], []
+        physical_op, logical_op = [], []
+
+        # 상위 RelOp 스택 (노드가 아닌 RelOp는 None)
+        ancestors: List[Optional[int]] = []
+
+        for event, relop in etree.iterparse(io.BytesIO(xml_text.encode("utf-8")), events=('start', 'end'), tag='{*}RelOp'):
+            if event == 'end':
+                ancestors.pop()
+                relop.clear()
+                continue
+
+            node_id = int(extract_numeric_value(relop.get('NodeId', '0')))
+            # 부모로 연결할 수 있는 RelOp인지 (네임스페이스가 있는 RelOp + NodeId 속성)
+            is_parent_candidate = relop.tag.endswith('}RelOp') and bool(relop.get('NodeId')) and node_id != 0
+
+            if node_id != 0:
+                parent_ix = -1
+                for ancestor in reversed(ancestors):
+                    if ancestor is not None:
+                        parent_ix = ancestor
+                        break
+
+                values = (
+                    extract_numeric_value(relop.get('EstimatedTotalSubtreeCost', '0')),
+                    extract_numeric_value(relop.get('EstimateRows', '0')),
+                    extract_numeric_value(relop.get('EstimateIO', '0')),
+                    extract_numeric_value(relop.get('EstimateCPU', '0')),
+                    relop.get('Parallel', 'false').lower() == 'true',
+                )
+                physical = relop.get('PhysicalOp', '')
+                logical = relop.get('LogicalOp', '')
+
+                ix = node_index.get(node_id)
+                if ix is None:
+                    ix = node_index[node_id] = len(node_ids)
+                    node_ids.append(node_id)
+                    parent.append(parent_ix)
+                    for column, value in zip((cost, rows, io_cost, cpu, parallel), values):
+                        column.append(value)
+                    physical_op.append(op_code(physical))
+                    logical_op.append(op_code(logical))
+                else:
+                    # 같은 NodeId: 나중 RelOp 값으로 갱신 (연산자 이름은 있을 때만)
+                    parent[ix] = parent_ix
+                    for column, value in zip((cost, rows, io_cost, cpu, parallel), values):
+                        column[ix] = value
+                    if physical:
+                        physical_op[ix] = op_code(physical)
+                    if logical:
+                        logical_op[ix] = op_code(logical)
+
+            ancestors.append(node_index[node_id] if is_parent_candidate else None)
+
+        return PlanTree(node_ids, parent, cost, rows, io_cost, cpu, parallel, physical_op, logical_op)
+
+    except Exception as e:
+        print(f"XML 파싱 오류: {e}")
+        # 오류 발생 시 빈 트리 반환
+        return PlanTree.empty()
@@ -0,0 +1,59 @@
+import numpy as np
+from typing import Dict, Any
+
+from plan_graph import PlanTree
+
+def tree_metrics(tree: PlanTree) -> Dict[str, Any]:
+    """
+    실행계획 트리의 모양 특성을 한 번의 상향(bottom-up) 순회로 계산합니다.
+
+    - max_depth: 가장 깊은 노드의 깊이
+    - mean_leaf_depth: 리프 깊이 평균 (루트→리프 경로 길이 평균)
+    - num_leaves, max_fanout, avg_fanout: 리프 수, 최대/평균 자식 수 (평균은 내부 노드 기준)
+    - diameter: 방향을 무시한 가장 긴 경로의 간선 수
+
+    순환이 있는 트리(중첩 계획의 NodeId 중복)는 깊이/지름을 정의할 수 없어 0으로 둡니다.
+    """
+    n = tree.num_nodes
+    if n == 0:
+        return {"max_depth": 0, "mean_leaf_depth": 0.0, "num_leaves": 0,
+                "max_fanout": 0, "avg_fanout": 0.0, "diameter": 0}
+
+    fanout = tree.out_degree()
+    is_leaf = fanout == 0
+    internal_fanout = fanout[~is_leaf]
+
+    metrics = {
+        "max_depth": 0,
+        "mean_leaf_depth": 0.0,
+        "num_leaves": int(np.count_nonzero(is_leaf)),
+        "max_fanout": int(fanout.max()),
+        "avg_fanout": float(internal_fanout.mean()) if len(internal_fanout) else 0.0,
+        "diameter": 0,
+    }
+    if not tree.is_forest:
+        return metrics
+
+    leaf_depths = tree.depth[is_leaf]
+    metrics["max_depth"] = int(tree.depth.max())
+    metrics["mean_leaf_depth"] = float(np.mean(leaf_depths))
+
+    # 깊은 노드부터 처리하면 자식이 항상 부모보다 먼저 끝남
+    # first/second: 노드 아래로 내려가는 가장 긴 가지 두 개의 길이
+    parent = tree.parent.tolist()
+    first = [0] * n
+    second = [0] * n
+    diameter = 0
+    for i in np.argsort(tree.depth, kind='stable')[::-1].tolist():
+        diameter = max(diameter, first[i] + second[i])
+        p = parent[i]
+        if p >= 0:
+            branch = first[i] + 1
+            if branch > first[p]:
+                second[p] = first[p]
+                first[p] = branch
+            elif branch > second[p]:
+                second[p] = branch
+    metrics["diameter"] = diameter
+
+    return metrics